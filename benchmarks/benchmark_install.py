@@ -0,0 +1,246 @@
+"""
+Benchmarks for the install pipeline, run against a generated wheelhouse, fake python installations and
+package trees so that results are reproducible between computers and runs.
+
+    python benchmarks/benchmark_install.py run --output baseline.json
+    python benchmarks/benchmark_install.py run --output current.json
+    python benchmarks/benchmark_install.py compare baseline.json current.json --threshold 0.2
+
+The venv creation and installation stages run the real batch files and are only timed when
+--run-batch-files is given (Windows).
+
+The wheel metadata and resolution caches are kept in the work directory, never in the home directory.
+"resolve" and "plan" run without caches, "resolve_cached" times a resolution found in a warm cache.
+"""
+import argparse
+import datetime
+import json
+import pathlib
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import zipfile
+
+ROOT_DIRECTORY = pathlib.Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIRECTORY / 'src'))
+# Appended since previous_versions/sharktools_install.py would shadow the sharktools_install package
+sys.path.append(str(ROOT_DIRECTORY / 'previous_versions'))
+
+
+def create_wheel(path: pathlib.Path, name: str, version: str, requires: list[str] | None = None,
+                 nr_files: int = 5, file_size: int = 1000) -> pathlib.Path:
+    """Writes a small but valid pure python wheel"""
+    dist_info = f'{name}-{version}.dist-info'
+    metadata = [f'Metadata-Version: 2.1', f'Name: {name}', f'Version: {version}']
+    metadata.extend(f'Requires-Dist: {req}' for req in requires or [])
+    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(f'{name}/__init__.py', '')
+        for i in range(nr_files):
+            zf.writestr(f'{name}/module_{i}.py', '#' * file_size)
+        zf.writestr(f'{dist_info}/METADATA', '\n'.join(metadata) + '\n')
+        zf.writestr(f'{dist_info}/WHEEL', 'Wheel-Version: 1.0\nRoot-Is-Purelib: true\nTag: py3-none-any\n')
+        zf.writestr(f'{dist_info}/RECORD', '')
+    return path
+
+
+def create_wheelhouse(directory: pathlib.Path, nr_plugins: int = 10, nr_versions: int = 10,
+                      nr_dependencies: int = 20) -> pathlib.Path:
+    directory.mkdir(parents=True, exist_ok=True)
+    dependencies = [f'dependency_{i}' for i in range(nr_dependencies)]
+    for dep in dependencies:
+        create_wheel(directory / f'{dep}-1.0.0-py3-none-any.whl', dep, '1.0.0')
+    for p in range(nr_plugins):
+        name = f'SHARKtools_plugin_{p}'
+        for v in range(nr_versions):
+            version = f'1.{v}.0'
+            create_wheel(directory / f'{name}-{version}-py3-none-any.whl', name, version,
+                         requires=dependencies[p % nr_dependencies:p % nr_dependencies + 3])
+    return directory
+
+
+def create_fake_python(root: pathlib.Path, version: str = '3.11.4', nr_other_directories: int = 50) -> pathlib.Path:
+    """Creates a directory looking like a python installation among other directories, as on C:/"""
+    root.mkdir(parents=True, exist_ok=True)
+    for i in range(nr_other_directories):
+        (root / f'Program_{i}').mkdir(exist_ok=True)
+    major_minor = '.'.join(version.split('.')[:2])
+    python_dir = root / f'Python{major_minor.replace(".", "")}'
+    (python_dir / 'Scripts').mkdir(parents=True, exist_ok=True)
+    (python_dir / 'Scripts' / f'pip{major_minor}.exe').touch()
+    (python_dir / 'python.exe').touch()
+    with open(python_dir / 'NEWS.txt', 'w') as fid:
+        fid.write('+++++++++++\nPython News\n+++++++++++\n\n')
+        fid.write(f"What's New in Python {version} final?\n")
+    return python_dir / 'python.exe'
+
+
+def create_package_tree(directory: pathlib.Path, nr_packages: int = 50, nr_files: int = 100,
+                        file_size: int = 2000) -> pathlib.Path:
+    """Creates a site-packages like tree with tests, examples, stubs and compiled files in each package"""
+    for p in range(nr_packages):
+        package = directory / f'package_{p}'
+        for sub in ['', 'tests', 'examples', '__pycache__']:
+            (package / sub).mkdir(parents=True, exist_ok=True)
+        for i in range(nr_files):
+            sub = ['', 'tests', 'examples'][i % 3]
+            (package / sub / f'module_{i}.py').write_text('#' * file_size)
+            (package / f'module_{i}.pyi').write_text('')
+            (package / '__pycache__' / f'module_{i}.cpython-310.pyc').write_text('#' * file_size)
+        dist_info = directory / f'package_{p}-1.0.dist-info'
+        dist_info.mkdir(exist_ok=True)
+        (dist_info / 'METADATA').write_text(f'Metadata-Version: 2.1\nName: package_{p}\nVersion: 1.0\n')
+    return directory
+
+
+def time_function(func, repeat: int, setup=None) -> dict:
+    times = []
+    for _ in range(repeat):
+        args = setup() if setup else ()
+        t0 = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - t0)
+    return dict(min=min(times), median=statistics.median(times), mean=statistics.mean(times), repeat=repeat)
+
+
+def run_benchmarks(work_directory: pathlib.Path, repeat: int = 5, nr_plugins: int = 10, nr_versions: int = 10,
+                   nr_packages: int = 50, nr_files: int = 100, run_batch_files: bool = False) -> dict:
+    from sharktools_install import slim
+    from sharktools_install.install_sharktools import InstallSHARKtools
+
+    wheel_directory = create_wheelhouse(work_directory / 'wheels', nr_plugins=nr_plugins, nr_versions=nr_versions)
+    python_root = work_directory / 'python_root'
+    python_exe = create_fake_python(python_root)
+    install_root = work_directory / 'installs'
+    install_root.mkdir()
+
+    def get_installer(cache_directory=None):
+        inst = InstallSHARKtools(wheel_directory=wheel_directory, python_search_roots=[python_root],
+                                 cache_directory=cache_directory)
+        inst.set_install_root_directory(install_root)
+        inst.create_staging_directory()
+        inst.set_plugins(**{plugin: inst.get_plugin_versions(plugin)[-1] for plugin in inst.plugins
+                            if plugin.startswith('SHARKtools_')})
+        return inst
+
+    def create_plan(inst):
+        inst._create_batch_environment_file()
+        inst._resolve_install_set()
+        inst._create_batch_install_plugins_file()
+        inst._create_run_files()
+
+    cache_directory = work_directory / 'cache'
+    get_installer(cache_directory).resolve()
+
+    stages = {}
+    stages['discovery'] = time_function(
+        lambda: InstallSHARKtools(wheel_directory=wheel_directory, python_search_roots=[python_root],
+                                  cache_directory=None), repeat)
+    stages['resolve'] = time_function(lambda inst: inst.resolve(), repeat, setup=lambda: (get_installer(),))
+    stages['resolve_cached'] = time_function(lambda inst: inst.resolve(), repeat,
+                                             setup=lambda: (get_installer(cache_directory),))
+    stages['plan'] = time_function(create_plan, repeat, setup=lambda: (get_installer(),))
+    stages['installer_create_batch_file'] = time_function(
+        lambda inst: inst.create_batch_file(), repeat,
+        setup=lambda: (_get_config_installer(work_directory, python_exe, wheel_directory),))
+    package_number = iter(range(repeat))
+    stages['slim'] = time_function(
+        lambda path: slim.slim_site_packages(path, python_tag='cpython-311'), repeat,
+        setup=lambda: (create_package_tree(work_directory / f'site_packages_{next(package_number)}',
+                                           nr_packages=nr_packages, nr_files=nr_files),))
+    if run_batch_files:
+        inst = get_installer()
+        create_plan(inst)
+        stages['venv'] = time_function(inst._run_batch_environment_file, 1)
+        stages['install'] = time_function(inst._run_batch_install_plugins_file, 1)
+
+    return dict(
+        created=datetime.datetime.now().isoformat(timespec='seconds'),
+        platform=platform.platform(),
+        python=platform.python_version(),
+        parameters=dict(repeat=repeat, nr_plugins=nr_plugins, nr_versions=nr_versions,
+                        nr_packages=nr_packages, nr_files=nr_files),
+        stages=stages,
+    )
+
+
+def _get_config_installer(work_directory: pathlib.Path, python_exe: pathlib.Path, wheel_directory: pathlib.Path):
+    import yaml
+    from install_from_config.installer import Installer
+
+    install_root = work_directory / 'config_install'
+    config = dict(
+        path_to_python=str(python_exe),
+        install_root_directory=str(install_root),
+        virtual_environment_path='venv',
+        repos=[f'https://github.com/sharksmhi/package_{i}.git' for i in range(20)],
+        requirements=[f'requirement_{i}' for i in range(20)],
+        wheels=[path.name for path in sorted(wheel_directory.glob('dependency_*.whl'))],
+        wheels_directory=str(wheel_directory),
+        main_file='SHARKtools/main.py',
+        install_file_name=str(install_root / 'install.bat'),
+        run_file_name=str(install_root / 'run.bat'),
+    )
+    config_path = work_directory / 'config.yaml'
+    with open(config_path, 'w') as fid:
+        yaml.safe_dump(config, fid)
+    return Installer(config_path)
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.2) -> list[str]:
+    """Returns the stages where the median time has increased more than threshold (fraction)"""
+    regressions = []
+    for stage, result in current['stages'].items():
+        base = baseline['stages'].get(stage)
+        if not base:
+            continue
+        change = (result['median'] - base['median']) / base['median'] if base['median'] else 0
+        line = f'{stage:>30}: {base["median"] * 1000:10.2f} ms -> {result["median"] * 1000:10.2f} ms ({change:+.0%})'
+        print(line)
+        if change > threshold:
+            regressions.append(stage)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Prestandatester för installationen')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    run_parser = subparsers.add_parser('run')
+    run_parser.add_argument('--output', type=pathlib.Path, default=None)
+    run_parser.add_argument('--repeat', type=int, default=5)
+    run_parser.add_argument('--nr-plugins', type=int, default=10)
+    run_parser.add_argument('--nr-versions', type=int, default=10)
+    run_parser.add_argument('--nr-packages', type=int, default=50)
+    run_parser.add_argument('--nr-files', type=int, default=100)
+    run_parser.add_argument('--run-batch-files', action='store_true')
+    compare_parser = subparsers.add_parser('compare')
+    compare_parser.add_argument('baseline', type=pathlib.Path)
+    compare_parser.add_argument('current', type=pathlib.Path)
+    compare_parser.add_argument('--threshold', type=float, default=0.2)
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        with tempfile.TemporaryDirectory() as tmp:
+            result = run_benchmarks(pathlib.Path(tmp), repeat=args.repeat, nr_plugins=args.nr_plugins,
+                                    nr_versions=args.nr_versions, nr_packages=args.nr_packages,
+                                    nr_files=args.nr_files, run_batch_files=args.run_batch_files)
+        content = json.dumps(result, indent=4)
+        if args.output:
+            args.output.write_text(content)
+        print(content)
+        return 0
+
+    with open(args.baseline) as fid:
+        baseline = json.load(fid)
+    with open(args.current) as fid:
+        current = json.load(fid)
+    regressions = compare(baseline, current, threshold=args.threshold)
+    if regressions:
+        print(f'Försämring över {args.threshold:.0%}: {", ".join(regressions)}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
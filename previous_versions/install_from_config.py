@@ -1,6 +1,10 @@
+import atexit
 import json
+import os
 import re
 import sys
+import threading
+import time
 import tkinter as tk
 from pathlib import Path
 from tkinter import filedialog
@@ -11,6 +15,7 @@ import datetime
 
 import screeninfo
 
+from install_from_config.config import ConfigError
 from install_from_config.installer import Installer
 from install_from_config.backup import Backup
 
@@ -69,6 +74,7 @@ class MainApp(tk.Tk):
     def _quit_toolbox(self):
         self._saves.save_selection()
         self._saves.set('geometry', self.geometry())
+        self._saves.flush()
         self.destroy()  # Closes window
         self.quit()  # Terminates program
 
@@ -165,7 +171,11 @@ class MainApp(tk.Tk):
         config_file = self._stringvar_config_file.get()
         if not config_file or not Path(config_file).exists():
             return
-        self._installer = Installer(config_file)
+        try:
+            self._installer = Installer(config_file)
+        except ConfigError as e:
+            messagebox.showerror('Konfigurationsfil', e)
+            return
         self._update_notebook()
         self._load_backuper()
 
@@ -298,32 +308,133 @@ class NotebookWidget(ttk.Notebook):
 
 
 class Saves:
+    """
+    Settings stored in install_from_config_saves.json. Changes are kept in memory and written together
+    a moment after the last change (and at exit). Only the changed keys are written: the file is read
+    again, the changes are merged into it and the result is written to a temporary file that replaces
+    the old one. A lock file makes the read-merge-write safe if several installer windows are open.
+    """
+    flush_delay = 1.
+    lock_timeout = 5.
+    # A lock file older than this is left from a crashed program
+    stale_lock_age = 30.
 
     def __init__(self):
         self.file_path = Path(DIRECTORY, 'install_from_config_saves.json')
         self.data = {}
+        self._changed = {}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._timer = None
         self._load()
+        atexit.register(self.flush)
+
+    @property
+    def _lock_file_path(self):
+        return self.file_path.with_name(f'{self.file_path.name}.lock')
+
+    def _read_file(self):
+        if not self.file_path.exists():
+            return {}
+        try:
+            with open(self.file_path) as fid:
+                return json.load(fid)
+        except ValueError:
+            return {}
 
     def _load(self):
         """
         Loads dict from json
         :return:
         """
-        if self.file_path.exists():
-            with open(self.file_path) as fid:
-                self.data = json.load(fid)
+        self.data = self._read_file()
+
+    def _acquire_file_lock(self):
+        start = time.time()
+        while True:
+            try:
+                os.close(os.open(self._lock_file_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return True
+            except FileExistsError:
+                try:
+                    if time.time() - self._lock_file_path.stat().st_mtime > self.stale_lock_age:
+                        self._lock_file_path.unlink()
+                        continue
+                except FileNotFoundError:
+                    continue
+            if time.time() - start > self.lock_timeout:
+                return False
+            time.sleep(0.05)
 
     def _save(self):
         """
-        Writes information to json file.
+        Merges the changes into the json file and writes it via a temporary file.
         :return:
         """
-        with open(self.file_path, 'w') as fid:
-            json.dump(self.data, fid, indent=4, sort_keys=True)
+        # One save at a time, so flush waits for a save the timer has already started
+        with self._save_lock:
+            with self._lock:
+                changed = self._changed
+                self._changed = {}
+            if not changed:
+                return
+            # Settings are not worth hanging the program for, so they are saved also without the lock
+            locked = self._acquire_file_lock()
+            try:
+                data = self._read_file()
+                for (key, item), value in changed.items():
+                    if item is None:
+                        data[key] = value
+                    else:
+                        if not isinstance(data.get(key), dict):
+                            data[key] = {}
+                        data[key][item] = value
+                tmp_path = self.file_path.with_name(f'{self.file_path.name}.{os.getpid()}.tmp')
+                with open(tmp_path, 'w') as fid:
+                    json.dump(data, fid, indent=4, sort_keys=True)
+                os.replace(tmp_path, self.file_path)
+            finally:
+                if locked:
+                    self._lock_file_path.unlink(missing_ok=True)
+            with self._lock:
+                # Keep changes from other windows, but not over our own unsaved changes
+                for (key, item), value in self._changed.items():
+                    if item is None:
+                        data[key] = value
+                    else:
+                        data.setdefault(key, {})[item] = value
+                self.data = data
+
+    def _schedule_save(self):
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.flush_delay, self._save)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Writes pending changes now. Returns when they are written, also if the timer is writing them"""
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+        self._save()
 
     def set(self, key, value):
-        self.data[key] = value
-        self._save()
+        with self._lock:
+            self.data[key] = value
+            self._changed[(key, None)] = value
+        self._schedule_save()
+
+    def set_item(self, key, item, value):
+        """Sets data[key][item]. Only the item is written, so other items changed elsewhere are kept"""
+        with self._lock:
+            if not isinstance(self.data.get(key), dict):
+                self.data[key] = {}
+            self.data[key][item] = value
+            self._changed[(key, item)] = value
+        self._schedule_save()
 
     def get(self, key, default=''):
         return self.data.get(key, default)
@@ -345,18 +456,18 @@ class SaveSelection:
         return data.get(key)
 
     def set(self, key, value):
-        data = self._saves.get(self._saves_id_key, {})
-        data[key] = value
-        self._saves.set(self._saves_id_key, data)
+        self._saves.set_item(self._saves_id_key, key, value)
 
     def save_selection(self):
-        data = {}
         for name, comp in self._component_to_store.items():
             try:
-                data[name] = comp.get()
+                value = comp.get()
             except AttributeError:
-                data[name] = comp
-        self._saves.set(self._saves_id_key, data)
+                value = comp
+            self._saves.set_item(self._saves_id_key, name, value)
+
+    def flush(self):
+        self._saves.flush()
 
     def load_selection(self, **kwargs):
         data = self._saves.get(self._saves_id_key, {})
@@ -0,0 +1,211 @@
+import hashlib
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+
+if getattr(sys, 'frozen', False):
+    DIRECTORY = Path(sys.executable).parent
+elif __file__:
+    DIRECTORY = Path(__file__).parent
+
+CACHE_DIRECTORY = Path(DIRECTORY, '_config_cache')
+
+# Parsed configs kept for the lifetime of the process, keyed by file hash
+_memory_cache = {}
+
+
+class ConfigError(Exception):
+    def __init__(self, errors):
+        self.errors = list(errors)
+        super().__init__('Errors in config file:\n' + '\n'.join(self.errors))
+
+
+class InstallerConfig:
+    """Typed and validated content of an installer config file"""
+
+    def __init__(self, data, config_file=None):
+        self.data = data
+        self.config_file = config_file
+        self.python_path = None
+        self.install_root_directory = None
+        self.venv_path = None
+        self.wheels_directory = None
+        self.wheels = []
+        self.repos = []
+        self.requirements = []
+        self.main_file_path = None
+        self._errors = []
+        self._validate()
+
+    def _validate(self):
+        self._val_python_path()
+        self._val_install_root_directory()
+        self._val_requirements()
+        self._val_wheels_directory()
+        self._val_wheels()
+        self._val_repos()
+        self._val_venv_path()
+        self._val_main_file_path()
+        if self._errors:
+            raise ConfigError(self._errors)
+
+    def _get(self, key, types, default=None):
+        value = self.data.get(key, default)
+        if value is None:
+            self._errors.append(f'{key}: missing')
+            return
+        if not isinstance(value, types):
+            self._errors.append(f'{key}: invalid type ({type(value).__name__})')
+            return
+        return value
+
+    def _val_python_path(self):
+        value = self._get('path_to_python', str)
+        if value is None:
+            return
+        self.python_path = Path(value)
+        if not self.python_path.exists():
+            self._errors.append(f'path_to_python: cant find {self.python_path}')
+
+    def _val_install_root_directory(self):
+        value = self._get('install_root_directory', str)
+        if value is None:
+            return
+        self.install_root_directory = Path(value)
+        if not self.install_root_directory.is_absolute():
+            self._errors.append(f'install_root_directory: needs to be absolute ({value})')
+
+    def _val_requirements(self):
+        self.requirements = self._get('requirements', list, default=[]) or []
+
+    def _val_wheels_directory(self):
+        value = self._get('wheels_directory', str, default='wheels')
+        if value is None:
+            return
+        self.wheels_directory = Path(value)
+        if not self.wheels_directory.is_absolute():
+            self.wheels_directory = Path(DIRECTORY, self.wheels_directory)
+
+    def _val_wheels(self):
+        self.wheels = []
+        for value in self._get('wheels', list, default=[]) or []:
+            path = Path(value)
+            if not path.is_absolute() and self.wheels_directory:
+                path = Path(self.wheels_directory, path)
+            if not path.exists():
+                self._errors.append(f'wheels: cant find wheel file {path}')
+                continue
+            self.wheels.append(path)
+
+    def _val_repos(self):
+        self.repos = []
+        for item in self._get('repos', list, default=[]) or []:
+            if type(item) == list:
+                if len(item) != 2:
+                    self._errors.append(f'repos: should be [subdirectory, url]: {item}')
+                    continue
+                subdir, url = item
+            else:
+                subdir, url = '', item
+            if not str(url).endswith('.git'):
+                self._errors.append(f'repos: not a valid repo: {url}')
+                continue
+            self.repos.append((subdir, url))
+
+    def _val_venv_path(self):
+        value = self._get('virtual_environment_path', str)
+        if value is None:
+            return
+        self.venv_path = Path(value)
+        if not self.venv_path.is_absolute() and self.install_root_directory:
+            self.venv_path = Path(self.install_root_directory, self.venv_path)
+
+    def _val_main_file_path(self):
+        value = self._get('main_file', str)
+        if value is None or not self.install_root_directory:
+            return
+        self.main_file_path = Path(self.install_root_directory, value)
+
+
+def get_file_hash(path):
+    with open(path, 'rb') as fid:
+        return hashlib.sha256(fid.read()).hexdigest()
+
+
+def load_config_data(path, use_cache=True):
+    """Returns the parsed content of the yaml file. Cached in memory and on disk by file hash"""
+    path = Path(path)
+    if not use_cache:
+        with open(path) as fid:
+            return yaml.safe_load(fid) or {}
+    file_hash = get_file_hash(path)
+    if file_hash in _memory_cache:
+        return _memory_cache[file_hash]
+    cache_path = Path(CACHE_DIRECTORY, f'{file_hash}.json')
+    data = None
+    if cache_path.exists():
+        try:
+            with open(cache_path) as fid:
+                data = json.load(fid)
+        except (OSError, ValueError):
+            logger.warning(f'Could not read cached config: {cache_path}')
+    if data is None:
+        with open(path) as fid:
+            data = yaml.safe_load(fid) or {}
+        _save_cache(cache_path, data)
+    _memory_cache[file_hash] = data
+    return data
+
+
+def _save_cache(cache_path, data):
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as fid:
+            json.dump(data, fid)
+        tmp_path.replace(cache_path)
+    except (OSError, TypeError):
+        # Yaml content that can't be stored as json is simply not cached on disk
+        logger.warning(f'Could not save cached config: {cache_path}')
+
+
+def load_config(path, use_cache=True):
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(path)
+    return InstallerConfig(load_config_data(path, use_cache=use_cache), config_file=path)
+
+
+def benchmark_load_config_data(path, repeat=100):
+    """Returns the mean parse time in milliseconds for yaml, disk cache and memory cache"""
+    result = {}
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        load_config_data(path, use_cache=False)
+    result['yaml'] = (time.perf_counter() - t0) / repeat * 1000
+
+    load_config_data(path)
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        _memory_cache.clear()
+        load_config_data(path)
+    result['disk_cache'] = (time.perf_counter() - t0) / repeat * 1000
+
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        load_config_data(path)
+    result['memory_cache'] = (time.perf_counter() - t0) / repeat * 1000
+    return result
+
+
+if __name__ == '__main__':
+    config_path = sys.argv[1] if len(sys.argv) > 1 else Path(DIRECTORY, 'config.yaml')
+    for name, ms in benchmark_load_config_data(config_path).items():
+        print(f'{name:>15}: {ms:.3f} ms')
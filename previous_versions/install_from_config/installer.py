@@ -1,9 +1,11 @@
-import yaml
 from pathlib import Path
 import sys
 import logging
 import subprocess
 
+import module_index
+from install_from_config.config import load_config
+
 logger = logging.getLogger(__name__)
 
 
@@ -15,6 +17,7 @@ elif __file__:
 
 class Installer:
     _config = None
+    _config_model = None
     _requirements = None
     _wheels = None
     _wheels_dir = None
@@ -50,68 +53,22 @@ class Installer:
         return self._config.copy()
         
     def _load_config_file(self):
-        with open(self._config_file) as fid:
-            self._config = yaml.safe_load(fid)
+        self._config_model = load_config(self._config_file)
+        self._config = self._config_model.data
 
     def _extract_data(self):
-        self._ext_python_path()
-        self._ext_install_root_directory()
-        self._ext_requirements()
-        self._ext_wheels_dir()
-        self._ext_wheels()
-        self._ext_repos()
-        self._ext_venv_path()
-        self._ext_main_file_path()
-
-    def _ext_python_path(self):
-        self._python_path = Path(self._config.get('path_to_python'))
-        if not self._python_path.exists():
-            raise FileNotFoundError(f'Python path: {self._python_path}')
-
-    def _ext_install_root_directory(self):
-        self._install_root_directory = Path(self._config.get('install_root_directory'))
-        if not self._install_root_directory.is_absolute():
-            raise Exception('Install root directory needs to be absolute')
+        """All values are validated in one pass when loading the config"""
+        model = self._config_model
+        self._python_path = model.python_path
+        self._install_root_directory = model.install_root_directory
         if not self._install_root_directory.exists():
             self._install_root_directory.mkdir(parents=True, exist_ok=True)
-
-    def _ext_requirements(self):
-        self._requirements = self._config.get('requirements')
-
-    def _ext_wheels(self):
-        self._wheels = []
-        for path in self._config.get('wheels'):
-            path = Path(path)
-            if not path.is_absolute():
-                path = Path(self._wheels_dir, path)
-            if not path.exists():
-                raise FileNotFoundError(f'Cant find wheel file: {path}')
-            self._wheels.append(path)
-
-    def _ext_wheels_dir(self):
-        self._wheels_dir = Path(self._config.get('wheels_directory', 'wheels'))
-        if not self._wheels_dir.is_absolute():
-            self._wheels_dir = Path(DIRECTORY, self._wheels_dir)
-
-    def _ext_repos(self):
-        def check_url(p):
-            if not p.endswith('.git'):
-                raise Exception(f'Not a valid repo: {p}')
-            return p
-        self._repos = []
-        for url in self._config.get('repos'):
-            if type(url) == list:
-                self._repos.append((url[0], check_url(url[1])))
-            else:
-                self._repos.append(('', check_url(url)))
-
-    def _ext_venv_path(self):
-        self._venv_path = Path(self._config.get('virtual_environment_path'))
-        if not self._venv_path.is_absolute():
-            self._venv_path = Path(self._install_root_directory, self._venv_path)
-
-    def _ext_main_file_path(self):
-        self._main_file_path = Path(self._install_root_directory, self._config.get('main_file'))
+        self._requirements = model.requirements
+        self._wheels_dir = model.wheels_directory
+        self._wheels = model.wheels
+        self._repos = model.repos
+        self._venv_path = model.venv_path
+        self._main_file_path = model.main_file_path
 
     def _create_batch_lines(self):
         self._batch_lines = []
@@ -236,9 +193,7 @@ class Installer:
             local_path = Path(self._install_root_directory, path.stem)
             local_paths.append(str(local_path))
 
-        file_path = Path(self._venv_path, 'Lib', 'site-packages', '.pth')
-        with open(file_path, 'w') as fid:
-            fid.write('\n'.join(local_paths))
+        module_index.write_import_accelerator(Path(self._venv_path, 'Lib', 'site-packages'), local_paths)
 
     def create_run_file(self):
         path = self._get_path_from_config('run_file_name', 'run.bat', root_directory=self._install_root_directory)
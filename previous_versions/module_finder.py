@@ -0,0 +1,62 @@
+"""
+Finder for the modules in the index written by module_index.write_import_accelerator.
+
+This file is copied to site-packages as _sharktools_finder and imported from the .pth file at every
+interpreter startup. Keep it small: only os, sys and importlib.util may be imported. The index is a python
+module with a dict literal, so no json parsing is needed, and the standard library modules are left out
+of it at install time.
+"""
+import importlib.util
+import os
+import sys
+
+INDEX_MODULE_NAME = '_sharktools_module_index'
+
+
+class IndexFinder:
+
+    def __init__(self, index):
+        self._index = index
+
+    def find_spec(self, fullname, path=None, target=None):
+        # Submodules are found through the __path__ of their parent package
+        if '.' in fullname:
+            return None
+        location = self._index.get(fullname)
+        if not location:
+            return None
+        if os.path.isdir(location):
+            init_file = os.path.join(location, '__init__.py')
+            if not os.path.exists(init_file):
+                return None
+            return importlib.util.spec_from_file_location(fullname, init_file,
+                                                          submodule_search_locations=[location])
+        if not os.path.exists(location):
+            return None
+        return importlib.util.spec_from_file_location(fullname, location)
+
+
+def get_installed_names(directory):
+    """Top level names in directory (packages, modules, extension modules and dist-info directories)"""
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return set()
+    return {name.split('.')[0].split('-')[0] for name in names}
+
+
+def install():
+    """Called from the .pth file at interpreter startup"""
+    try:
+        index = dict(__import__(INDEX_MODULE_NAME).INDEX)
+    except (ImportError, AttributeError, SyntaxError):
+        return
+    # Packages installed by pip after the index was written come first on sys.path
+    for name in get_installed_names(os.path.dirname(os.path.abspath(__file__))):
+        index.pop(name, None)
+    finder = IndexFinder(index)
+    for nr, meta_path_finder in enumerate(sys.meta_path):
+        if getattr(meta_path_finder, '__name__', None) == 'PathFinder':
+            sys.meta_path.insert(nr, finder)
+            return
+    sys.meta_path.append(finder)
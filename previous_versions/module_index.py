@@ -0,0 +1,92 @@
+"""
+Index of the top level modules in the source checkouts listed in the .pth file of a venv.
+
+At install time create_module_index maps each module name to its location and write_import_accelerator
+writes the index to site-packages together with a copy of module_finder. A line in the .pth file then
+installs module_finder.IndexFinder in sys.meta_path just before PathFinder, so our own packages are found
+with one dict lookup instead of probing every directory in sys.path. Built-in, frozen and standard library modules and
+modules in site-packages (also those installed after the index was written) are left out of the index,
+so they are found as before, when the .pth directories came last on sys.path. Modules missing in the
+index (ex. added by a later git pull) are still found the normal way since the directories are kept in
+the .pth file.
+
+The standard library names are excluded here, at install time, so the finder does not have to list the
+standard library at every startup. This file may only use the standard library.
+"""
+import os
+import shutil
+import sys
+import sysconfig
+
+import module_finder
+
+FINDER_MODULE_NAME = '_sharktools_finder'
+INDEX_MODULE_NAME = module_finder.INDEX_MODULE_NAME
+# Written by earlier versions
+OLD_INDEX_FILE_NAME = '_sharktools_module_index.json'
+# site.addsitedir skips .pth files with names starting with a dot (python 3.13)
+PTH_FILE_NAME = 'sharktools.pth'
+
+
+def get_stdlib_names():
+    """sys.stdlib_module_names leaves out some packages in the standard library directory, ex. test"""
+    names = set(sys.stdlib_module_names) | set(sys.builtin_module_names)
+    names.update(module_finder.get_installed_names(sysconfig.get_paths()['stdlib']))
+    return names
+
+
+def create_module_index(directories, exclude=()):
+    """Returns dict with module name as key and path to package directory or module file as value"""
+    index = {}
+    for directory in directories:
+        directory = str(directory)
+        if not os.path.isdir(directory):
+            continue
+        for entry in os.scandir(directory):
+            if entry.is_dir():
+                name = entry.name
+                if not os.path.exists(os.path.join(entry.path, '__init__.py')):
+                    continue
+            elif entry.name.endswith('.py'):
+                name = entry.name[:-3]
+            else:
+                continue
+            if not name.isidentifier() or name in exclude:
+                continue
+            # First directory wins, as on sys.path
+            index.setdefault(name, entry.path)
+    return index
+
+
+def write_index_module(path, index):
+    """Writes the index as a dict literal, imported by the finder without parsing json at startup"""
+    lines = ['# Written by module_index.write_import_accelerator', 'INDEX = {']
+    lines.extend(f'    {name!r}: {location!r},' for name, location in sorted(index.items()))
+    lines.append('}')
+    with open(path, 'w', encoding='utf-8') as fid:
+        fid.write('\n'.join(lines) + '\n')
+
+
+def write_import_accelerator(site_packages, directories, pth_file_name=PTH_FILE_NAME):
+    """Writes the .pth file, the module index and the finder module to site_packages"""
+    site_packages = str(site_packages)
+    directories = [str(directory) for directory in directories]
+    # Modules installed in site-packages are found before the .pth directories and must stay that way
+    exclude = module_finder.get_installed_names(site_packages) | get_stdlib_names()
+    index = create_module_index(directories, exclude=exclude)
+
+    write_index_module(os.path.join(site_packages, f'{INDEX_MODULE_NAME}.py'), index)
+    shutil.copy2(os.path.abspath(module_finder.__file__), os.path.join(site_packages, f'{FINDER_MODULE_NAME}.py'))
+
+    lines = list(directories)
+    lines.append(f'import {FINDER_MODULE_NAME}; {FINDER_MODULE_NAME}.install()')
+    with open(os.path.join(site_packages, pth_file_name), 'w') as fid:
+        fid.write('\n'.join(lines))
+    # Written by earlier versions and skipped by python 3.13
+    old_pth_path = os.path.join(site_packages, '.pth')
+    if pth_file_name != '.pth' and os.path.exists(old_pth_path):
+        os.remove(old_pth_path)
+    old_index_path = os.path.join(site_packages, OLD_INDEX_FILE_NAME)
+    if os.path.exists(old_index_path):
+        os.remove(old_index_path)
+    return index
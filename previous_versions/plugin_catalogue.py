@@ -0,0 +1,171 @@
+import json
+import logging
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+if getattr(sys, 'frozen', False):
+    THIS_FILE_PATH = Path(sys.executable)
+elif __file__:
+    THIS_FILE_PATH = Path(__file__)
+
+logger = logging.getLogger(__name__)
+
+API_URL = 'https://api.github.com'
+ORGANISATION = 'sharksmhi'
+DEFAULT_TTL = 24 * 60 * 60
+
+
+class PluginCatalogue:
+    """
+    Keeps a json cache of the available SHARKtools plugins and their released versions.
+    The cache is read at once and refreshed in a background thread when older than ttl seconds,
+    so creating the catalogue never waits for the network.
+
+    The repository list and the releases of each plugin are requested with their own ETags. The releases
+    are checked also when the repository list is not modified, since new versions don't change the list.
+    """
+
+    def __init__(self, cache_file_path=None, fallback_file_path=None, ttl=DEFAULT_TTL, api_url=API_URL,
+                 timeout=10):
+        self.cache_file_path = Path(cache_file_path or Path(THIS_FILE_PATH.parent, 'plugin_catalogue.json'))
+        self.fallback_file_path = Path(fallback_file_path or Path(THIS_FILE_PATH.parent, 'plugins'))
+        self.ttl = ttl
+        self.api_url = api_url.rstrip('/')
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self._refresh_thread = None
+        self._data = dict(updated=0, etag=None, release_etags={}, plugins={})
+        self._load()
+
+    @property
+    def plugins(self):
+        with self._lock:
+            return sorted(self._data['plugins'])
+
+    @property
+    def age(self):
+        return time.time() - self._data['updated']
+
+    @property
+    def is_stale(self):
+        return self.age > self.ttl
+
+    def get_metadata(self, plugin):
+        """
+        Returns dict with keys "versions" (newest first) and "wheels".
+        "wheels" maps version to a list of dicts with keys "name", "url" and "size".
+        """
+        with self._lock:
+            return json.loads(json.dumps(self._data['plugins'].get(plugin, {})))
+
+    def refresh_in_background(self, force=False, on_done=None):
+        """Starts a refresh in a daemon thread if the cache is stale. Returns the thread or None"""
+        if not force and not self.is_stale:
+            return
+        if self._refresh_thread and self._refresh_thread.is_alive():
+            return self._refresh_thread
+        self._refresh_thread = threading.Thread(target=self._refresh, kwargs=dict(on_done=on_done), daemon=True)
+        self._refresh_thread.start()
+        return self._refresh_thread
+
+    def refresh(self):
+        self._refresh()
+
+    def _refresh(self, on_done=None):
+        try:
+            self._update_from_github()
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            logger.warning(f'Could not refresh plugin catalogue: {e}')
+            return
+        if on_done:
+            on_done(self)
+
+    def _update_from_github(self):
+        url = f'{self.api_url}/orgs/{ORGANISATION}/repos?per_page=100'
+        etag = self._data.get('etag')
+        status, headers, content = self._request(url, etag=etag)
+        if status == 304:
+            logger.info('Plugin list not modified')
+            names = self.plugins
+        else:
+            etag = headers.get('ETag')
+            names = sorted(set(repo['name'] for repo in json.loads(content)
+                               if re.fullmatch('SHARKtools_[a-zA-Z0-9_]+', repo['name'])))
+            # Remove SHARKtools_install (this program)
+            if 'SHARKtools_install' in names:
+                names.remove('SHARKtools_install')
+        plugins = {}
+        release_etags = {}
+        for name in names:
+            plugins[name], release_etags[name] = self._get_release_metadata(name)
+        with self._lock:
+            self._data = dict(updated=time.time(), etag=etag, release_etags=release_etags, plugins=plugins)
+        self._save()
+
+    def _get_release_metadata(self, plugin):
+        """Returns the metadata and the ETag of the releases. The cached metadata is kept if not modified"""
+        url = f'{self.api_url}/repos/{ORGANISATION}/{plugin}/releases'
+        with self._lock:
+            etag = self._data.get('release_etags', {}).get(plugin)
+        cached = self.get_metadata(plugin)
+        try:
+            status, headers, content = self._request(url, etag=etag if cached else None)
+        except (urllib.error.URLError, OSError, ValueError):
+            logger.warning(f'Could not get releases for plugin {plugin}')
+            return cached or dict(versions=[], wheels={}), etag
+        if status == 304:
+            return cached, etag
+        versions = []
+        wheels = {}
+        for release in json.loads(content):
+            version = release['tag_name'].lstrip('v')
+            versions.append(version)
+            wheels[version] = [dict(name=asset['name'], url=asset['browser_download_url'], size=asset['size'])
+                               for asset in release.get('assets', []) if asset['name'].endswith('.whl')]
+        return dict(versions=versions, wheels=wheels), headers.get('ETag')
+
+    def _request(self, url, etag=None):
+        request = urllib.request.Request(url, headers={'Accept': 'application/vnd.github+json'})
+        if etag:
+            request.add_header('If-None-Match', etag)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as resp:
+                return resp.status, resp.headers, resp.read().decode('UTF-8')
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                return 304, e.headers, ''
+            raise
+
+    def _load(self):
+        if self.cache_file_path.exists():
+            try:
+                with open(self.cache_file_path) as fid:
+                    self._data = json.load(fid)
+                return
+            except (OSError, ValueError):
+                logger.warning(f'Could not read plugin catalogue: {self.cache_file_path}')
+        self._load_fallback()
+
+    def _load_fallback(self):
+        """Uses the plain list of plugin names from older versions of the installer"""
+        if not self.fallback_file_path.exists():
+            return
+        with open(self.fallback_file_path) as fid:
+            names = [line.strip() for line in fid if line.strip()]
+        self._data['plugins'] = {name: dict(versions=[], wheels={}) for name in names}
+
+    def _save(self):
+        with self._lock:
+            content = json.dumps(self._data, indent=4, sort_keys=True)
+        tmp_path = self.cache_file_path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as fid:
+            fid.write(content)
+        tmp_path.replace(self.cache_file_path)
+        with open(self.fallback_file_path, 'w') as fid:
+            fid.write('\n'.join(self.plugins))
@@ -16,6 +16,8 @@ import yaml
 from pathlib import Path
 
 import exceptions
+import module_index
+from plugin_catalogue import PluginCatalogue
 
 if getattr(sys, 'frozen', False):
     # THIS_FILE_PATH = Path(os.path.dirname(sys.executable))
@@ -298,9 +300,7 @@ class Project(object):
                 continue
             lines.append(str(path))
 
-        file_path = Path(self.venv_directory, 'Lib', 'site-packages', '.pth')
-        with open(file_path, 'w') as fid:
-            fid.write('\n'.join(lines))
+        module_index.write_import_accelerator(Path(self.venv_directory, 'Lib', 'site-packages'), lines)
 
     def _get_wheel_rel_path_for_package(self, package):
         path = self._get_wheel_path_for_package(package)
@@ -661,16 +661,14 @@ class Project(object):
         return self._python_path
 
     def _find_plugins(self):
-        try:
-            resp = urllib.request.urlopen(r'https://github.com/orgs/sharksmhi/repositories')
-            data = resp.read().decode('UTF-8')
-            self.available_plugins = sorted(set(re.findall('SHARKtools_[a-zA-Z0-9_]+', data)))
-            # Remove SHARKtools_install (this program)
-            if 'SHARKtools_install' in self.available_plugins:
-                self.available_plugins.pop(self.available_plugins.index('SHARKtools_install'))
-            self._save_plugins()
-        except:
-            self._load_plugins()
+        """Plugins are taken from the cached catalogue. A stale catalogue is refreshed in the background"""
+        self.plugin_catalogue = PluginCatalogue(fallback_file_path=Path(THIS_FILE_PATH.parent, 'plugins'))
+        self.available_plugins = self.plugin_catalogue.plugins
+        self.plugin_catalogue.refresh_in_background(on_done=self._on_plugin_catalogue_refreshed)
+
+    def _on_plugin_catalogue_refreshed(self, catalogue):
+        self.available_plugins = catalogue.plugins
+        self.logger.info(f'Plugin catalogue refreshed: {len(self.available_plugins)} plugins')
 
     def _find_python_exe(self):
         self._python_path = None
@@ -707,23 +705,6 @@ class Project(object):
                 return True
         return False
 
-    def _save_plugins(self):
-        with open(Path(THIS_FILE_PATH.parent, 'plugins'), 'w') as fid:
-            fid.write('\n'.join(self.available_plugins))
-
-    def _load_plugins(self):
-        self.available_plugins = []
-        with open(Path(THIS_FILE_PATH.parent, 'plugins')) as fid:
-            for line in fid:
-                line = line.strip()
-                if line:
-                    self.available_plugins.append(line)
-        self.available_plugins = sorted(self.available_plugins)
-        if self.available_plugins:
-            return True
-        else:
-            return False
-
     def _download_main_program_from_github(self):
         self._check_path(self.temp_program_dir)
         url = r'https://github.com/sharksmhi/SHARKtools/zipball/master/'
@@ -0,0 +1,243 @@
+import argparse
+import concurrent.futures
+import json
+import logging
+import os
+import pathlib
+import shutil
+import zipfile
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = '_bundle.json'
+
+# Files with these suffixes are searched for absolute paths to the install directory
+TEXT_SUFFIXES = ['', '.bat', '.cfg', '.csh', '.fish', '.json', '.nu', '.ps1', '.pth', '.py', '.txt']
+# .exe launchers of pip and console scripts (distlib) hold the path to python.exe in a shebang line
+LAUNCHER_SUFFIXES = ['.exe']
+MAX_TEXT_FILE_SIZE = 1_000_000
+
+
+def get_path_variants(path: pathlib.Path) -> list[str]:
+    variants = [str(path), path.as_posix(), str(path).replace('/', '\\')]
+    return sorted(set(variants), key=len, reverse=True)
+
+
+def _get_shebang_span(data: bytes) -> tuple[int, int] | None:
+    """
+    A distlib launcher is the launcher exe, a shebang line and a zip archive with the script. Returns start
+    and end of the shebang line, found as the launcher does: just before the start of the zip archive.
+    """
+    eocd = data.rfind(b'PK\x05\x06')
+    if eocd < 0 or len(data) < eocd + 22:
+        return None
+    cdir_size = int.from_bytes(data[eocd + 12:eocd + 16], 'little')
+    cdir_offset = int.from_bytes(data[eocd + 16:eocd + 20], 'little')
+    zip_start = eocd - cdir_size - cdir_offset
+    if zip_start <= 0:
+        return None
+    start = data.rfind(b'#!', 0, zip_start)
+    if start < 0 or b'\n' in data[start:zip_start - 1]:
+        return None
+    return start, zip_start
+
+
+def _read_shebang(path: pathlib.Path) -> str | None:
+    try:
+        data = path.read_bytes()
+    except OSError:
+        return None
+    span = _get_shebang_span(data)
+    if not span:
+        return None
+    return data[span[0]:span[1]].decode('utf-8', errors='replace')
+
+
+def _contains_path(path: pathlib.Path, variants: list[str]) -> bool:
+    suffix = path.suffix.lower()
+    if suffix not in TEXT_SUFFIXES and suffix not in LAUNCHER_SUFFIXES:
+        return False
+    if path.stat().st_size > MAX_TEXT_FILE_SIZE:
+        return False
+    if suffix in LAUNCHER_SUFFIXES:
+        content = _read_shebang(path) or ''
+    else:
+        try:
+            content = path.read_text(encoding='utf-8')
+        except (UnicodeDecodeError, OSError):
+            return False
+    return any(variant in content for variant in variants)
+
+
+def export_bundle(install_directory: pathlib.Path | str, archive_path: pathlib.Path | str) -> pathlib.Path:
+    """
+    Packs a finished install directory into one zip archive. Text files holding the absolute path to the
+    install directory (activate scripts, bat files, .pth files etc.) are listed in the archive manifest
+    and rewritten when the bundle is unpacked.
+    """
+    install_directory = pathlib.Path(install_directory).resolve()
+    archive_path = pathlib.Path(archive_path)
+    if not install_directory.is_dir():
+        raise NotADirectoryError(install_directory)
+    variants = get_path_variants(install_directory)
+    fixup_files = []
+    with zipfile.ZipFile(archive_path, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+        for root, _, files in os.walk(install_directory):
+            for name in files:
+                path = pathlib.Path(root, name)
+                rel_path = path.relative_to(install_directory).as_posix()
+                if _contains_path(path, variants):
+                    fixup_files.append(rel_path)
+                zf.write(path, rel_path)
+        manifest = dict(source_directory=str(install_directory),
+                        source_variants=variants,
+                        fixup_files=fixup_files)
+        zf.writestr(MANIFEST_NAME, json.dumps(manifest, indent=4))
+    logger.info(f'Bundle created: {archive_path} ({len(fixup_files)} files to fix at unpack)')
+    return archive_path
+
+
+def _get_target_path(target_directory: pathlib.Path, name: str) -> pathlib.Path:
+    """
+    Path of the archive member name in target_directory. The name is checked as a Windows path, since
+    Windows also treats backslashes as separators and drive letters as roots, and the resolved path must
+    be inside target_directory.
+    """
+    windows_path = pathlib.PureWindowsPath(name)
+    if windows_path.anchor or '..' in windows_path.parts:
+        raise ValueError(f'Ogiltig sökväg i arkivet: {name}')
+    target_path = target_directory.joinpath(*name.split('/')).resolve()
+    if target_path == target_directory or not target_path.is_relative_to(target_directory):
+        raise ValueError(f'Ogiltig sökväg i arkivet: {name}')
+    return target_path
+
+
+def _extract_members(archive_path: pathlib.Path, names: list[str], target_directory: pathlib.Path) -> int:
+    nr_bytes = 0
+    with zipfile.ZipFile(archive_path) as zf:
+        for name in names:
+            target_path = _get_target_path(target_directory, name)
+            target_path.parent.mkdir(parents=True, exist_ok=True)
+            with zf.open(name) as src, open(target_path, 'wb') as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+            nr_bytes += zf.getinfo(name).file_size
+    return nr_bytes
+
+
+def _split_by_size(infos: list[zipfile.ZipInfo], nr_chunks: int) -> list[list[str]]:
+    chunks = [[] for _ in range(nr_chunks)]
+    sizes = [0] * nr_chunks
+    for info in sorted(infos, key=lambda i: i.compress_size, reverse=True):
+        index = sizes.index(min(sizes))
+        chunks[index].append(info.filename)
+        sizes[index] += info.compress_size
+    return [chunk for chunk in chunks if chunk]
+
+
+def unpack_bundle(archive_path: pathlib.Path | str, target_directory: pathlib.Path | str,
+                  workers: int | None = None) -> pathlib.Path:
+    """
+    Extracts a bundle created with export_bundle to target_directory using several threads, each streaming
+    its own share of the archive members. Absolute paths are then rewritten to point at target_directory.
+    """
+    archive_path = pathlib.Path(archive_path)
+    target_directory = pathlib.Path(target_directory).resolve()
+    if target_directory.exists() and any(target_directory.iterdir()):
+        raise FileExistsError(f'Målmappen är inte tom: {target_directory}')
+    target_directory.mkdir(parents=True, exist_ok=True)
+
+    with zipfile.ZipFile(archive_path) as zf:
+        manifest = json.loads(zf.read(MANIFEST_NAME))
+        infos = [info for info in zf.infolist() if not info.is_dir() and info.filename != MANIFEST_NAME]
+    # Guard against paths pointing outside the target directory before anything is extracted
+    for name in [info.filename for info in infos] + manifest['fixup_files']:
+        _get_target_path(target_directory, name)
+
+    workers = workers or min(8, os.cpu_count() or 1)
+    chunks = _split_by_size(infos, workers)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_extract_members, archive_path, chunk, target_directory) for chunk in chunks]
+        nr_bytes = sum(future.result() for future in futures)
+
+    _fix_paths(target_directory, manifest)
+    logger.info(f'Bundle unpacked to {target_directory} ({nr_bytes / 1e6:.1f} MB)')
+    return target_directory
+
+
+def _get_new_variants(old_variants: list[str], target_directory: pathlib.Path) -> dict[str, str]:
+    new_variants = {}
+    for variant in old_variants:
+        if '\\' in variant:
+            new_variants[variant] = str(target_directory).replace('/', '\\')
+        else:
+            new_variants[variant] = target_directory.as_posix()
+    return new_variants
+
+
+def _rewrite_launcher(path: pathlib.Path, new_variants: dict[str, str]) -> None:
+    """Only the shebang line is rewritten. The zip archive after it is located relative to its own end"""
+    data = path.read_bytes()
+    span = _get_shebang_span(data)
+    if not span:
+        return
+    shebang = data[span[0]:span[1]].decode('utf-8')
+    for old, new in new_variants.items():
+        shebang = shebang.replace(old, new)
+    path.write_bytes(data[:span[0]] + shebang.encode('utf-8') + data[span[1]:])
+
+
+def _rewrite_file(path: pathlib.Path, new_variants: dict[str, str]) -> None:
+    """Line endings are kept as they are, ex. LF in the bash activate script of a venv on Windows"""
+    if path.suffix.lower() in LAUNCHER_SUFFIXES:
+        _rewrite_launcher(path, new_variants)
+        return
+    with open(path, encoding='utf-8', newline='') as fid:
+        content = fid.read()
+    for old, new in new_variants.items():
+        content = content.replace(old, new)
+    path.write_text(content, encoding='utf-8', newline='')
+
+
+def _fix_paths(target_directory: pathlib.Path, manifest: dict) -> None:
+    new_variants = _get_new_variants(manifest['source_variants'], target_directory)
+    for rel_path in manifest['fixup_files']:
+        _rewrite_file(_get_target_path(target_directory, rel_path), new_variants)
+
+
+def relocate(directory: pathlib.Path | str, old_directory: pathlib.Path | str,
+             patterns: list[str]) -> list[pathlib.Path]:
+    """
+    Rewrites absolute paths to old_directory in the text files of directory matching the glob patterns,
+    after directory has been moved from old_directory. Returns the rewritten files.
+    """
+    directory = pathlib.Path(directory).resolve()
+    old_variants = get_path_variants(pathlib.Path(old_directory))
+    new_variants = _get_new_variants(old_variants, directory)
+    rewritten = []
+    for pattern in patterns:
+        for path in directory.glob(pattern):
+            if path.is_file() and _contains_path(path, old_variants):
+                _rewrite_file(path, new_variants)
+                rewritten.append(path)
+    return rewritten
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Packa eller packa upp en SHARKtools-installation')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    export_parser = subparsers.add_parser('export', help='Packa en installationsmapp till ett arkiv')
+    export_parser.add_argument('install_directory')
+    export_parser.add_argument('archive_path')
+    unpack_parser = subparsers.add_parser('unpack', help='Packa upp ett arkiv till en ny mapp')
+    unpack_parser.add_argument('archive_path')
+    unpack_parser.add_argument('target_directory')
+    unpack_parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+    if args.command == 'export':
+        export_bundle(args.install_directory, args.archive_path)
+    else:
+        unpack_bundle(args.archive_path, args.target_directory, workers=args.workers)
+
+
+if __name__ == '__main__':
+    main()
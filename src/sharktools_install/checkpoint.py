@@ -0,0 +1,86 @@
+"""
+Checkpoints of completed install steps. Each record holds a fingerprint of what the step used, so a rerun
+can skip the step as long as the fingerprint is the same.
+"""
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import threading
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_FILE_NAME = 'checkpoints.json'
+
+
+def get_fingerprint(*parts) -> str:
+    """Parts must be json serializable (paths are converted to strings)"""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def get_file_fingerprint(*paths: pathlib.Path) -> str:
+    """Fingerprint of name, size and modification time of the files. Missing files are included as missing"""
+    items = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            items.append([str(path), stat.st_size, stat.st_mtime_ns])
+        except FileNotFoundError:
+            items.append([str(path), None, None])
+    return get_fingerprint(items)
+
+
+class Checkpoints:
+
+    def __init__(self, path: pathlib.Path | str):
+        self._path = pathlib.Path(path)
+        self._lock = threading.Lock()
+        self._data = dict(install_key=None, steps={})
+        self._load()
+
+    @property
+    def path(self) -> pathlib.Path:
+        return self._path
+
+    @property
+    def install_key(self) -> str | None:
+        return self._data['install_key']
+
+    @install_key.setter
+    def install_key(self, key: str) -> None:
+        with self._lock:
+            if key != self._data['install_key']:
+                # Checkpoints from another selection are of no use
+                self._data = dict(install_key=key, steps={})
+            self._save()
+
+    def is_valid(self, step: str, fingerprint: str) -> bool:
+        with self._lock:
+            return self._data['steps'].get(step, {}).get('fingerprint') == fingerprint
+
+    def save(self, step: str, fingerprint: str) -> None:
+        with self._lock:
+            self._data['steps'][step] = dict(fingerprint=fingerprint)
+            self._save()
+
+    def _save(self) -> None:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._path.with_suffix(f'.{os.getpid()}.tmp')
+        tmp_path.write_text(json.dumps(self._data, indent=4), encoding='utf-8')
+        os.replace(tmp_path, self._path)
+
+    def _load(self) -> None:
+        if not self._path.exists():
+            return
+        try:
+            self._data = json.loads(self._path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            logger.warning(f'Could not read checkpoints: {self._path}')
+
+
+def read_install_key(path: pathlib.Path | str) -> str | None:
+    try:
+        return json.loads(pathlib.Path(path).read_text(encoding='utf-8')).get('install_key')
+    except (OSError, ValueError):
+        return None
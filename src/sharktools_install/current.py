@@ -0,0 +1,138 @@
+"""
+Points out the active installation under the install root. The name of the active installation is kept in
+current.txt and the one before it in previous.txt. start_sharktools.bat in the install root reads
+current.txt, so shortcuts to it always start the active installation. Switching or rolling back only
+rewrites the pointer files.
+
+    python -m sharktools_install.current C:/sharktools_installs show
+    python -m sharktools_install.current C:/sharktools_installs switch SHARKtools_20240612
+    python -m sharktools_install.current C:/sharktools_installs rollback
+"""
+import argparse
+import logging
+import os
+import pathlib
+import subprocess
+
+logger = logging.getLogger(__name__)
+
+CURRENT_FILE_NAME = 'current.txt'
+PREVIOUS_FILE_NAME = 'previous.txt'
+LINK_NAME = 'current'
+LAUNCHER_NAME = 'start_sharktools.bat'
+
+
+def _read_pointer(path: pathlib.Path) -> pathlib.Path | None:
+    try:
+        name = path.read_text(encoding='utf-8').strip()
+    except FileNotFoundError:
+        return None
+    if not name:
+        return None
+    return path.parent / name
+
+
+def _write_pointer(path: pathlib.Path, install_directory: pathlib.Path) -> None:
+    """Written to a temporary file and replaced, so a reader never sees a half written file"""
+    tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+    tmp_path.write_text(install_directory.name, encoding='utf-8')
+    os.replace(tmp_path, path)
+
+
+def get_current(root_directory: pathlib.Path | str) -> pathlib.Path | None:
+    return _read_pointer(pathlib.Path(root_directory) / CURRENT_FILE_NAME)
+
+
+def get_previous(root_directory: pathlib.Path | str) -> pathlib.Path | None:
+    return _read_pointer(pathlib.Path(root_directory) / PREVIOUS_FILE_NAME)
+
+
+def _check_install_directory(root_directory: pathlib.Path, install_directory: pathlib.Path) -> None:
+    if install_directory.name in ('', '.', '..') or install_directory.parent.resolve() != root_directory.resolve():
+        raise ValueError(f'{install_directory} ligger inte i {root_directory}')
+    if not (install_directory / LAUNCHER_NAME).exists():
+        raise NotADirectoryError(f'Ingen installation i {install_directory}')
+
+
+def set_current(root_directory: pathlib.Path | str, install_directory: pathlib.Path | str) -> None:
+    """
+    Makes install_directory the active installation. The active one so far can be rolled back to.
+    install_directory is a path to an installation in root_directory or just its name.
+    """
+    root_directory = pathlib.Path(root_directory)
+    install_directory = pathlib.Path(install_directory)
+    if not install_directory.is_absolute() and len(install_directory.parts) == 1:
+        install_directory = root_directory / install_directory
+    _check_install_directory(root_directory, install_directory)
+    current = get_current(root_directory)
+    if current and current.name != install_directory.name:
+        _write_pointer(root_directory / PREVIOUS_FILE_NAME, current)
+    _write_pointer(root_directory / CURRENT_FILE_NAME, install_directory)
+    _update_link(root_directory, install_directory)
+    logger.info(f'Current installation is {install_directory.name}')
+
+
+def rollback(root_directory: pathlib.Path | str) -> pathlib.Path:
+    """Switches back to the previous installation. Rolling back twice returns to where you started"""
+    previous = get_previous(root_directory)
+    if not previous:
+        raise FileNotFoundError('Det finns ingen tidigare installation att gå tillbaka till')
+    set_current(root_directory, previous)
+    return previous
+
+
+def _update_link(root_directory: pathlib.Path, install_directory: pathlib.Path) -> None:
+    """
+    The link "current" is only for convenience (ex. in the explorer), the launcher uses current.txt.
+    A junction is used on Windows since symlinks need extra privileges there.
+    """
+    link = root_directory / LINK_NAME
+    try:
+        if os.name == 'nt':
+            if link.exists() or link.is_symlink():
+                # Removes the junction, not the installation it points to
+                os.rmdir(link)
+            subprocess.run(['cmd', '/c', 'mklink', '/J', str(link), str(install_directory)],
+                           check=True, capture_output=True)
+        else:
+            tmp_link = root_directory / f'.{LINK_NAME}_{os.getpid()}'
+            tmp_link.symlink_to(install_directory.name, target_is_directory=True)
+            os.replace(tmp_link, link)
+    except (OSError, subprocess.CalledProcessError) as e:
+        logger.warning(f'Could not update link {link}: {e}')
+
+
+def write_launcher(root_directory: pathlib.Path | str) -> pathlib.Path:
+    """Writes start_sharktools.bat in the install root. It never has to change"""
+    path = pathlib.Path(root_directory) / LAUNCHER_NAME
+    lines = []
+    lines.append('@echo off')
+    lines.append(f'set /p CURRENT=<"%~dp0{CURRENT_FILE_NAME}"')
+    lines.append(f'call "%~dp0%CURRENT%\\{LAUNCHER_NAME}" %*')
+    with open(path, 'w') as fid:
+        fid.write('\n'.join(lines))
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Välj vilken SHARKtools-installation som startas')
+    parser.add_argument('root_directory', type=pathlib.Path)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('show')
+    switch_parser = subparsers.add_parser('switch')
+    switch_parser.add_argument('install_name')
+    subparsers.add_parser('rollback')
+    args = parser.parse_args()
+    if args.command == 'switch':
+        set_current(args.root_directory, args.install_name)
+    elif args.command == 'rollback':
+        rollback(args.root_directory)
+    current = get_current(args.root_directory)
+    previous = get_previous(args.root_directory)
+    print(f'Aktuell: {current.name if current else "-"}')
+    print(f'Föregående: {previous.name if previous else "-"}')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,191 @@
+"""
+Compares two installations from their dist-info directories and file manifests, without starting python
+in any of them.
+
+    python -m sharktools_install.diff C:/sharktools_installs/SHARKtools_20240612 C:/sharktools_installs/SHARKtools_20240619
+"""
+import argparse
+import json
+import pathlib
+
+from sharktools_install import bundle
+from sharktools_install import inventory
+from sharktools_install import manifest
+from sharktools_install.requirements import canonical_name
+
+# Keys written at install time that differ between otherwise identical installations
+GENERATED_JSON_KEYS = {'plugins.json': ['created']}
+
+
+class DiffResult:
+
+    def __init__(self, old_directory: pathlib.Path, new_directory: pathlib.Path):
+        self.old_directory = old_directory
+        self.new_directory = new_directory
+        self.added_packages: list[dict] = []
+        self.removed_packages: list[dict] = []
+        self.changed_packages: list[tuple[dict, dict]] = []
+        self.added_files: list[str] = []
+        self.removed_files: list[str] = []
+        self.changed_files: list[str] = []
+        # Differ only in the path of the installation itself (ex. activate scripts and launchers)
+        self.path_only_files: list[str] = []
+        self.missing_manifests: list[pathlib.Path] = []
+        # Distribution of each file in the venv, taken from the manifests
+        self.file_distributions: dict[str, str] = {}
+
+    @property
+    def identical(self) -> bool:
+        return not (self.added_packages or self.removed_packages or self.changed_packages
+                    or self.added_files or self.removed_files or self.changed_files)
+
+    def _get_file_lines(self, title: str, paths: list[str]) -> list[str]:
+        if not paths:
+            return []
+        lines = [f'{title} ({len(paths)}):']
+        per_distribution = {}
+        for path in paths:
+            distribution = self.file_distributions.get(path)
+            if distribution:
+                per_distribution[distribution] = per_distribution.get(distribution, 0) + 1
+            else:
+                lines.append(f'    {path}')
+        lines.extend(f'    {nr} filer i {distribution}' for distribution, nr in sorted(per_distribution.items()))
+        return lines
+
+    def get_report(self) -> list[str]:
+        lines = [f'Jämför {self.old_directory} med {self.new_directory}']
+        if self.added_packages:
+            lines.append(f'Nya paket ({len(self.added_packages)}):')
+            lines.extend(f'    {dist["name"]} {dist["version"]}' for dist in self.added_packages)
+        if self.removed_packages:
+            lines.append(f'Borttagna paket ({len(self.removed_packages)}):')
+            lines.extend(f'    {dist["name"]} {dist["version"]}' for dist in self.removed_packages)
+        if self.changed_packages:
+            lines.append(f'Ändrade paket ({len(self.changed_packages)}):')
+            for old, new in self.changed_packages:
+                if old['version'] != new['version']:
+                    lines.append(f'    {new["name"]} {old["version"]} -> {new["version"]}')
+                else:
+                    lines.append(f'    {new["name"]} {new["version"]} (andra filer)')
+        lines.extend(self._get_file_lines('Nya filer', self.added_files))
+        lines.extend(self._get_file_lines('Borttagna filer', self.removed_files))
+        lines.extend(self._get_file_lines('Ändrade filer', self.changed_files))
+        lines.extend(self._get_file_lines('Skiljer sig bara i installationens sökväg', self.path_only_files))
+        for path in self.missing_manifests:
+            lines.append(f'Manifest saknas för {path}, filer jämförs inte')
+        if self.identical:
+            lines.append('Inga skillnader')
+        return lines
+
+    def to_dict(self) -> dict:
+        return dict(
+            old_directory=str(self.old_directory),
+            new_directory=str(self.new_directory),
+            added_packages=self.added_packages,
+            removed_packages=self.removed_packages,
+            changed_packages=[dict(old=old, new=new) for old, new in self.changed_packages],
+            added_files=self.added_files,
+            removed_files=self.removed_files,
+            changed_files=self.changed_files,
+            path_only_files=self.path_only_files,
+        )
+
+
+def _get_site_packages(install_directory: pathlib.Path) -> pathlib.Path:
+    return install_directory / 'venv' / 'Lib' / 'site-packages'
+
+
+def _package_changed(old: dict, new: dict) -> bool:
+    return any(old[key] != new[key] for key in ['version', 'wheel', 'nr_files', 'size'])
+
+
+def diff_packages(old_site_packages: pathlib.Path, new_site_packages: pathlib.Path, result: DiffResult) -> None:
+    old = {canonical_name(dist['name']): dist for dist in inventory.read_distributions(old_site_packages)}
+    new = {canonical_name(dist['name']): dist for dist in inventory.read_distributions(new_site_packages)}
+    result.added_packages = [new[key] for key in sorted(new.keys() - old.keys())]
+    result.removed_packages = [old[key] for key in sorted(old.keys() - new.keys())]
+    result.changed_packages = [(old[key], new[key]) for key in sorted(old.keys() & new.keys())
+                               if _package_changed(old[key], new[key])]
+
+
+def diff_files(old_files: dict, new_files: dict, result: DiffResult) -> None:
+    """Files are compared by size and hash as recorded in the manifests"""
+    result.added_files = sorted(new_files.keys() - old_files.keys())
+    result.removed_files = sorted(old_files.keys() - new_files.keys())
+    result.changed_files = sorted(
+        path for path in old_files.keys() & new_files.keys()
+        if old_files[path]['size'] != new_files[path]['size']
+        or old_files[path].get('hash') != new_files[path].get('hash'))
+    for files in [old_files, new_files]:
+        result.file_distributions.update(
+            {path: entry['distribution'] for path, entry in files.items() if 'distribution' in entry})
+
+
+def _read_normalized(install_directory: pathlib.Path, rel_path: str) -> bytes | None:
+    """Content with the path of the installation replaced, or None if the file can't be compared"""
+    path = install_directory.joinpath(*rel_path.split('/'))
+    try:
+        if path.stat().st_size > bundle.MAX_TEXT_FILE_SIZE:
+            return None
+        content = path.read_bytes()
+    except OSError:
+        return None
+    if path.name in GENERATED_JSON_KEYS:
+        try:
+            data = json.loads(content)
+        except ValueError:
+            return None
+        for key in GENERATED_JSON_KEYS[path.name]:
+            data.pop(key, None)
+        content = json.dumps(data, sort_keys=True).encode('utf-8')
+    for variant in bundle.get_path_variants(install_directory.resolve()):
+        content = content.replace(variant.encode('utf-8'), b'<install_directory>')
+    return content
+
+
+def separate_path_only_files(result: DiffResult) -> None:
+    """Moves changed files that are the same when the paths of the installations are replaced"""
+    changed_files = []
+    for rel_path in result.changed_files:
+        old = _read_normalized(result.old_directory, rel_path)
+        if old is not None and old == _read_normalized(result.new_directory, rel_path):
+            result.path_only_files.append(rel_path)
+        else:
+            changed_files.append(rel_path)
+    result.changed_files = changed_files
+
+
+def diff_installs(old_directory: pathlib.Path | str, new_directory: pathlib.Path | str) -> DiffResult:
+    old_directory = pathlib.Path(old_directory)
+    new_directory = pathlib.Path(new_directory)
+    result = DiffResult(old_directory, new_directory)
+    diff_packages(_get_site_packages(old_directory), _get_site_packages(new_directory), result)
+    manifests = []
+    for directory in [old_directory, new_directory]:
+        try:
+            manifests.append(manifest.load_manifest(directory))
+        except FileNotFoundError:
+            result.missing_manifests.append(directory)
+    if not result.missing_manifests:
+        diff_files(manifests[0]['files'], manifests[1]['files'], result)
+        separate_path_only_files(result)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Jämför två SHARKtools-installationer')
+    parser.add_argument('old_directory', type=pathlib.Path)
+    parser.add_argument('new_directory', type=pathlib.Path)
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+    result = diff_installs(args.old_directory, args.new_directory)
+    if args.json:
+        print(json.dumps(result.to_dict(), indent=4))
+    else:
+        print('\n'.join(result.get_report()))
+    return 0 if result.identical else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
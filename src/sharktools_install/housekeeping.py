@@ -0,0 +1,183 @@
+"""
+Removes old dated installations under the install root.
+
+    python -m sharktools_install.housekeeping C:/sharktools_installs --keep 3
+    python -m sharktools_install.housekeeping C:/sharktools_installs --pin SHARKtools_20240619
+"""
+import argparse
+import concurrent.futures
+import logging
+import os
+import pathlib
+import re
+import stat
+import threading
+import uuid
+
+from sharktools_install import current
+
+logger = logging.getLogger(__name__)
+
+INSTALL_DIRECTORY_PATTERN = re.compile(r'^SHARKtools_\d{8}')
+TRASH_PREFIX = '.trash_'
+PINNED_FILE_NAME = 'pinned'
+
+_empty_trash_lock = threading.Lock()
+
+
+def list_installs(root_directory: pathlib.Path | str) -> list[pathlib.Path]:
+    """Returns installations, oldest first"""
+    root_directory = pathlib.Path(root_directory)
+    return sorted(path for path in root_directory.iterdir()
+                  if path.is_dir() and INSTALL_DIRECTORY_PATTERN.match(path.name))
+
+
+def _get_pinned_file_path(install_directory: pathlib.Path) -> pathlib.Path:
+    return install_directory / '_install' / PINNED_FILE_NAME
+
+
+def is_pinned(install_directory: pathlib.Path | str) -> bool:
+    return _get_pinned_file_path(pathlib.Path(install_directory)).exists()
+
+
+def pin(install_directory: pathlib.Path | str) -> None:
+    path = _get_pinned_file_path(pathlib.Path(install_directory))
+    path.parent.mkdir(exist_ok=True)
+    path.touch()
+
+
+def unpin(install_directory: pathlib.Path | str) -> None:
+    _get_pinned_file_path(pathlib.Path(install_directory)).unlink(missing_ok=True)
+
+
+def get_installs_to_remove(root_directory: pathlib.Path | str, keep: int = 3,
+                           protected: list[pathlib.Path] | None = None) -> list[pathlib.Path]:
+    """The keep newest installations are kept, as well as pinned, protected, current and previous ones"""
+    protected = list(protected or [])
+    protected.extend(path for path in [current.get_current(root_directory), current.get_previous(root_directory)]
+                     if path)
+    protected = [pathlib.Path(path).resolve() for path in protected]
+    installs = list_installs(root_directory)
+    candidates = installs[:-keep] if keep > 0 else installs
+    return [path for path in candidates if not is_pinned(path) and path.resolve() not in protected]
+
+
+def _remove_file(path: str) -> None:
+    try:
+        os.remove(path)
+    except PermissionError:
+        # Read only files, ex. in .git directories
+        os.chmod(path, stat.S_IWRITE)
+        os.remove(path)
+
+
+def _is_link(path: str) -> bool:
+    """Symlinks and, on windows, junctions"""
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    if stat.S_ISLNK(st.st_mode):
+        return True
+    return os.name == 'nt' and st.st_reparse_tag == stat.IO_REPARSE_TAG_MOUNT_POINT
+
+
+def _remove_link(path: str) -> None:
+    # Directory symlinks and junctions are directories to windows
+    if os.name == 'nt':
+        os.rmdir(path)
+    else:
+        os.remove(path)
+
+
+def delete_tree(path: pathlib.Path | str, workers: int = 8) -> None:
+    """
+    Deletes files on a thread pool and then the directories, deepest first. Links to directories
+    (ex. venv/lib64 -> lib) are removed without deleting what they point to.
+    """
+    directories = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = []
+        for root, dirs, files in os.walk(path):
+            directories.append(root)
+            futures.extend(executor.submit(_remove_file, os.path.join(root, name)) for name in files)
+            links = [name for name in dirs if _is_link(os.path.join(root, name))]
+            futures.extend(executor.submit(_remove_link, os.path.join(root, name)) for name in links)
+            # os.walk follows junctions
+            dirs[:] = [name for name in dirs if name not in links]
+        for future in futures:
+            try:
+                future.result()
+            except OSError as e:
+                logger.warning(f'Could not delete file: {e}')
+    for directory in reversed(directories):
+        try:
+            os.rmdir(directory)
+        except OSError as e:
+            logger.warning(f'Could not delete directory: {e}')
+
+
+def move_to_trash(install_directory: pathlib.Path) -> pathlib.Path:
+    """Renaming is instant, so the installation disappears at once for the user"""
+    trash_path = install_directory.parent / f'{TRASH_PREFIX}{install_directory.name}_{uuid.uuid4().hex[:8]}'
+    install_directory.rename(trash_path)
+    return trash_path
+
+
+def empty_trash(root_directory: pathlib.Path | str, workers: int = 8) -> None:
+    """
+    Also finishes deletions that were interrupted earlier. Only one call at a time deletes, a later call
+    waits and then deletes what is left.
+    """
+    with _empty_trash_lock:
+        for path in pathlib.Path(root_directory).iterdir():
+            if path.is_dir() and path.name.startswith(TRASH_PREFIX):
+                logger.info(f'Deleting {path}')
+                delete_tree(path, workers=workers)
+
+
+def remove_installs(installs: list[pathlib.Path], background: bool = True,
+                    workers: int = 8) -> threading.Thread | None:
+    """
+    Moves the installations aside and deletes them. With background=True the deletion runs in a thread
+    that is returned.
+    """
+    if not installs:
+        return
+    root_directory = installs[0].parent
+    for path in installs:
+        move_to_trash(path)
+        logger.info(f'Removed installation {path}')
+    if not background:
+        empty_trash(root_directory, workers=workers)
+        return
+    thread = threading.Thread(target=empty_trash, args=(root_directory,), kwargs=dict(workers=workers),
+                              daemon=True)
+    thread.start()
+    return thread
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ta bort gamla SHARKtools-installationer')
+    parser.add_argument('root_directory', type=pathlib.Path)
+    parser.add_argument('--keep', type=int, default=3, help='Antal nyaste installationer som behålls')
+    parser.add_argument('--pin', action='append', default=[], help='Installation som aldrig ska tas bort')
+    parser.add_argument('--unpin', action='append', default=[])
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    for name in args.pin:
+        pin(args.root_directory / name)
+    for name in args.unpin:
+        unpin(args.root_directory / name)
+
+    installs = get_installs_to_remove(args.root_directory, keep=args.keep)
+    for path in installs:
+        print(f'{"Skulle ta bort" if args.dry_run else "Tar bort"}: {path}')
+    if not args.dry_run:
+        remove_installs(installs, background=False)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,64 @@
+"""
+Creates a report from the output of python -X importtime.
+
+The report script is run by the venv python of each installation, from the _install directory it is
+written to by write_script. The source is kept as a string since a frozen installer has no .py files to
+copy. The script may only use the standard library.
+
+    python import_report.py importtime.log import_report.txt
+"""
+import pathlib
+
+SCRIPT = r'''
+import collections
+import re
+import sys
+
+LINE_PATTERN = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def parse_importtime(lines):
+    """Returns a list of (module, self_us, cumulative_us, level)"""
+    result = []
+    for line in lines:
+        match = LINE_PATTERN.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, module = match.groups()
+        result.append((module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return result
+
+
+def create_report(imports, nr_modules=50):
+    total = sum(self_us for _, self_us, _, _ in imports)
+    packages = collections.Counter()
+    for module, self_us, _, _ in imports:
+        packages[module.split('.')[0]] += self_us
+
+    lines = [f'Total importtid: {total / 1e6:.2f} s ({len(imports)} moduler)', '']
+    lines.append('Paket sorterade efter egen importtid (summa för alla moduler i paketet):')
+    for package, self_us in packages.most_common():
+        lines.append(f'{self_us / 1000:10.1f} ms  {self_us / total * 100 if total else 0:5.1f} %  {package}')
+    lines.append('')
+    lines.append(f'De {nr_modules} långsammaste modulerna (kumulativ tid):')
+    for module, self_us, cumulative_us, _ in sorted(imports, key=lambda item: item[2], reverse=True)[:nr_modules]:
+        lines.append(f'{cumulative_us / 1000:10.1f} ms  (egen {self_us / 1000:8.1f} ms)  {module}')
+    return lines
+
+
+def main(log_path, report_path):
+    with open(log_path, encoding='utf-8', errors='replace') as fid:
+        imports = parse_importtime(fid)
+    with open(report_path, 'w', encoding='utf-8') as fid:
+        fid.write('\n'.join(create_report(imports)))
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:3])
+'''
+
+
+def write_script(path: pathlib.Path | str) -> pathlib.Path:
+    path = pathlib.Path(path)
+    path.write_text(SCRIPT, encoding='utf-8')
+    return path
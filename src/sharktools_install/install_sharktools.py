@@ -1,12 +1,33 @@
 import datetime
+import json
 import logging.handlers
 import pathlib
 import re
 import subprocess
 import sys
+import threading
+import time
 
 import flet as ft
 
+from sharktools_install import bundle
+from sharktools_install import checkpoint
+from sharktools_install import current
+from sharktools_install import housekeeping
+from sharktools_install import import_report
+from sharktools_install import inventory
+from sharktools_install import log
+from sharktools_install import manifest
+from sharktools_install import priority
+from sharktools_install import requirements
+from sharktools_install import resolver
+from sharktools_install import slim
+from sharktools_install import staging
+from sharktools_install import wheel_metadata
+from sharktools_install.scheduler import StepScheduler
+from sharktools_install.selection import PluginSelection
+from sharktools_install.selection import version_key
+
 logger = logging.getLogger(__name__)
 
 if getattr(sys, 'frozen', False):
@@ -14,6 +35,13 @@ if getattr(sys, 'frozen', False):
 else:
     THIS_DIRECTORY = pathlib.Path(__file__).parent
 
+# Target python version when it can't be read from the chosen python installation
+DEFAULT_PYTHON_VERSION = '3.11'
+# Wheel metadata and resolved install sets are cached here between runs
+DEFAULT_CACHE_DIRECTORY = pathlib.Path.home() / '.sharktools_install'
+
+PYTHON_SEARCH_ROOTS = [pathlib.Path('C:/'), pathlib.Path('C:/python/')]
+
 COLORS = dict(
     processing='#453db3',
     pre_system='#953db3',
@@ -38,7 +66,11 @@ def get_banner_color(status='bad'):
 
 class InstallSHARKtools:
 
-    def __init__(self):
+    def __init__(self, wheel_directory: pathlib.Path | str | None = None,
+                 python_search_roots: list[pathlib.Path] | None = None, discover: bool = True,
+                 cache_directory: pathlib.Path | str | None = DEFAULT_CACHE_DIRECTORY):
+        self._wheel_directory = pathlib.Path(wheel_directory or THIS_DIRECTORY)
+        self._python_search_roots = python_search_roots or PYTHON_SEARCH_ROOTS
         self._wheel_paths = {}
         self._python_exe_path: pathlib.Path | None = None
         self._python_version: str | None = None
@@ -46,21 +78,212 @@ class InstallSHARKtools:
         self._install_directory: pathlib.Path | None = None
 
         self._install_info = []
+        # Summary of the latest install attempt. After a failed attempt it is in the resumable directory
+        self.last_summary_file_path: pathlib.Path | None = None
 
         self._selected_plugins = {}
 
+        self._scheduler: StepScheduler | None = None
+        # No cache_directory disables the caches
+        cache_directory = pathlib.Path(cache_directory) if cache_directory else None
+        self._wheel_metadata = wheel_metadata.WheelMetadataCache(
+            cache_directory / wheel_metadata.DEFAULT_CACHE_FILE_PATH.name if cache_directory else None)
+        self._install_set: dict[str, resolver.Candidate] | None = None
+        self._resolution_cache = resolver.ResolutionCache(
+            cache_directory / resolver.DEFAULT_CACHE_DIRECTORY.name if cache_directory else None)
+        self._resolved_from_cache = False
+
+        self._throttle = priority.Throttle()
+
+        self._slim_venv = False
+        self._slim_directory_patterns: list[str] | None = None
+        self._slim_file_patterns: list[str] | None = None
+
+        if discover:
+            self.discover()
+
+    def discover(self) -> None:
+        """Scans for wheels and python installations"""
         self._save_wheel_paths()
         self._try_to_find_python_exe()
 
-    def install(self):
-        self._install_info.append(f'Installerar i mapp: {self.install_directory}')
-        self._create_batch_environment_file()
+    def install(self, activate: bool = True):
+        """
+        The installation is built in a hidden staging directory under the install root and renamed to
+        SHARKtools_<date> when all steps have succeeded. A failed installation is kept hidden and resumed
+        by the next install with the same plugins and python, reusing the steps that completed.
+        With activate the new installation is started by the launcher in the install root.
+        """
+        self._install_info = []
+        self.last_summary_file_path = None
+        # Validated before a staging directory is created or claimed, so an invalid selection leaves nothing
+        problems = self.check_selection()
+        if problems:
+            raise ValueError('\n'.join(problems))
+        dependency_info = []
+        for plugin, version in self._selected_plugins.items():
+            # Only for the summary, it must never stop the installation
+            try:
+                dependencies = sorted(self.get_plugin_dependencies(plugin, version))
+            except (wheel_metadata.InvalidWheel, requirements.InvalidRequirement) as e:
+                logger.warning(f'Could not list dependencies of {plugin} {version}: {e}')
+                dependency_info.append(f'Kunde inte lista beroenden för {plugin} {version}: {e}')
+                continue
+            dependency_info.append(f'Beroenden för {plugin} {version}: {", ".join(dependencies)}')
+        if self._resume_staging_directory():
+            self._install_info.append('Återupptar tidigare avbruten installation')
+        else:
+            self.create_staging_directory()
+        self._throttle.throttled_time = 0.
+        checkpoints = self._checkpoints
+        checkpoints.install_key = self._install_key
         self._install_info.append(f'Använder pythonversion: {self._python_version} ({self._python_exe_path})')
-        self._run_batch_environment_file()
-        self._create_batch_install_plugins_file()
-        self._run_batch_install_plugins_file()
-        self._create_run_files()
+        self._install_info.extend(dependency_info)
+        self._scheduler = self._get_install_scheduler(checkpoints)
+        try:
+            self._scheduler.run()
+        except BaseException:
+            self._install_info.extend(self._scheduler.get_report())
+            self._install_info.extend(self._throttle.get_report())
+            logger.error('Installation failed:\n' + '\n'.join(self._install_info))
+            self._keep_for_resume()
+            raise
+        staging_directory = self._install_directory
+        try:
+            self._install_directory = staging.promote(staging_directory)
+        except OSError as e:
+            # All steps are checkpointed, so a retry only has to promote
+            self._install_info.append(f'Kunde inte byta namn på installationsmappen: {e}')
+            logger.error(f'Could not promote {staging_directory}: {e}')
+            self._keep_for_resume()
+            raise
+        self._install_info = [line.replace(str(staging_directory), str(self._install_directory))
+                              for line in self._install_info]
+        self._install_info.append(f'Installerad i mapp: {self._install_directory}')
+        self._install_info.extend(self._scheduler.get_report())
+        self._throttle.wait()
+        manifest_path = manifest.write_manifest(self.install_directory, wheel_directory=self._wheel_directory,
+                                                workers=self._throttle.get_workers(None))
+        self._install_info.extend(self._throttle.get_report())
+        self._install_info.append(f'Manifest över installerade filer: {manifest_path}')
+        if activate:
+            self.activate_install()
+        self._create_summary_file()
+
+    def _keep_for_resume(self) -> None:
+        """Writes the summary and renames the staging directory so the next installation can resume it"""
         self._create_summary_file()
+        summary_rel_path = self.last_summary_file_path.relative_to(self._install_directory)
+        try:
+            resumable = staging.mark_resumable(self._install_directory)
+        except OSError as e:
+            logger.warning(f'Could not keep {self._install_directory} to resume from: {e}')
+        else:
+            self.last_summary_file_path = resumable / summary_rel_path
+            logger.info(f'Kept {resumable} to resume from')
+        self._install_directory = None
+
+    @property
+    def launcher_path(self) -> pathlib.Path:
+        return self._install_root_directory / current.LAUNCHER_NAME
+
+    def activate_install(self, install_directory: pathlib.Path | str | None = None) -> None:
+        """Makes the installation (default the one just made) the one started by the launcher"""
+        install_directory = install_directory or self.install_directory
+        current.set_current(self._install_root_directory, install_directory)
+        current.write_launcher(self._install_root_directory)
+        self._install_info.append(f'Aktiv installation: {pathlib.Path(install_directory).name}. '
+                                  f'Starta med {self.launcher_path}')
+
+    def rollback_install(self) -> pathlib.Path:
+        """Makes the previously active installation active again"""
+        if not self._install_root_directory:
+            raise NotADirectoryError('Ingen rotkatalog vald!')
+        return current.rollback(self._install_root_directory)
+
+    def create_staging_directory(self) -> pathlib.Path:
+        """Creates a new unique directory to build the installation in"""
+        if not self._install_root_directory:
+            raise NotADirectoryError('Ingen rotkatalog vald!')
+        self._install_directory = staging.create_staging_directory(self._install_root_directory)
+        return self._install_directory
+
+    @property
+    def _install_key(self) -> str:
+        """Installations with the same key can resume each other"""
+        return checkpoint.get_fingerprint(sorted(self._selected_plugins.items()), self._python_exe_path)
+
+    @property
+    def _checkpoints(self) -> checkpoint.Checkpoints:
+        return checkpoint.Checkpoints(self._install_files_directory / checkpoint.CHECKPOINT_FILE_NAME)
+
+    def _resume_staging_directory(self) -> pathlib.Path | None:
+        if not self._install_root_directory:
+            raise NotADirectoryError('Ingen rotkatalog vald!')
+        key = self._install_key
+
+        def accept(path):
+            return checkpoint.read_install_key(path / '_install' / checkpoint.CHECKPOINT_FILE_NAME) == key
+
+        path = staging.claim_resumable(self._install_root_directory, accept)
+        if path:
+            self._install_directory = path
+        return path
+
+    def _get_venv_fingerprint(self) -> str:
+        return checkpoint.get_fingerprint(self._python_exe_path, self._python_version,
+                                          checkpoint.get_file_fingerprint(self._python_exe_path))
+
+    def _get_install_plugins_fingerprint(self) -> str:
+        if self._install_set:
+            paths = [candidate.path for candidate in self._install_set.values()]
+        else:
+            paths = [self._wheel_paths[plugin][version] for plugin, version in self._selected_plugins.items()]
+        return checkpoint.get_fingerprint(bool(self._install_set), checkpoint.get_file_fingerprint(*paths))
+
+    def _get_install_scheduler(self, checkpoints: checkpoint.Checkpoints | None = None) -> StepScheduler:
+        scheduler = StepScheduler(max_workers=self._throttle.get_workers(4), checkpoints=checkpoints)
+        scheduler.add_step('create_venv_file', self._create_batch_environment_file)
+        scheduler.add_step('create_venv', self._run_batch_environment_file, depends_on=['create_venv_file'],
+                           fingerprint=self._get_venv_fingerprint)
+        scheduler.add_step('resolve', self._resolve_install_set)
+        scheduler.add_step('create_install_plugins_file', self._create_batch_install_plugins_file,
+                           depends_on=['resolve'])
+        scheduler.add_step('install_plugins', self._run_batch_install_plugins_file,
+                           depends_on=['create_venv', 'create_install_plugins_file'],
+                           fingerprint=self._get_install_plugins_fingerprint)
+        scheduler.add_step('create_run_files', self._create_run_files)
+        scheduler.add_step('create_plugin_manifest', self._create_plugin_manifest)
+        if self._slim_venv:
+            scheduler.add_step('slim_venv', self._slim_site_packages, depends_on=['install_plugins'])
+        scheduler.add_step('package_inventory', self._write_package_inventory, depends_on=['install_plugins'])
+        return scheduler
+
+    def export_bundle(self, archive_path: pathlib.Path | str | None = None) -> pathlib.Path:
+        """Packs the finished installation into one archive that can be unpacked on other computers"""
+        if not archive_path:
+            archive_path = self.install_directory.parent / f'{self.install_directory.name}.zip'
+        return bundle.export_bundle(self.install_directory, archive_path)
+
+    def verify_install(self, repair: bool = False) -> manifest.VerifyResult:
+        """Checks the installation against the manifest written at install. Optionally repairs what differs"""
+        result = manifest.verify(self.install_directory)
+        if repair and not result.ok:
+            manifest.repair(self.install_directory, result)
+        return result
+
+    def remove_old_installs(self, keep: int = 3, background: bool = True) -> list[pathlib.Path]:
+        """
+        Removes all but the keep newest installations under the install root. Pinned ones are kept.
+        Stale staging directories are removed in the same pass, so one thread empties the trash.
+        """
+        if not self._install_root_directory:
+            raise NotADirectoryError('Ingen rotkatalog vald!')
+        protected = [self._install_directory] if self._install_directory else []
+        installs = housekeeping.get_installs_to_remove(self._install_root_directory, keep=keep, protected=protected)
+        installs.extend(staging.get_stale_staging_directories(self._install_root_directory))
+        housekeeping.remove_installs(installs, background=background)
+        return installs
 
     def set_install_root_directory(self, root_path: pathlib.Path | str) -> None:
         if not root_path:
@@ -69,11 +292,23 @@ class InstallSHARKtools:
         if not path.exists():
             raise NotADirectoryError(path)
         self._install_root_directory = path
-        path = self._install_root_directory / f"SHARKtools_{datetime.datetime.now().strftime('%Y%m%d')}"
-        # if path.exists():
-        #     raise FileExistsError(f'Installationsmappen finns redan: {path}')
-        path.mkdir(exist_ok=True)
-        self._install_directory = path
+        self._throttle.set_directory(path)
+        # Created at install, see install()
+        self._install_directory = None
+
+    def set_low_priority(self, low_priority: bool = True) -> None:
+        """
+        For computers doing other work during the installation. Child processes get low priority, fewer
+        steps run in parallel and new steps wait while the computer is busy.
+        """
+        self._throttle.enabled = low_priority
+
+    def set_slim_venv(self, slim_venv: bool = True, directory_patterns: list[str] | None = None,
+                      file_patterns: list[str] | None = None) -> None:
+        """Turns on removal of tests, examples, type stubs etc. from site-packages after installation"""
+        self._slim_venv = slim_venv
+        self._slim_directory_patterns = directory_patterns
+        self._slim_file_patterns = file_patterns
 
     @property
     def install_directory(self):
@@ -97,12 +332,89 @@ class InstallSHARKtools:
         return sorted(self._wheel_paths)
 
     def get_plugin_versions(self, plugin: str):
-        return sorted(self._wheel_paths[plugin])
+        return sorted(self._wheel_paths[plugin], key=version_key)
 
     def set_plugins(self, **kwargs: dict[str, list | str]) -> None:
         self._check_set_plugins(**kwargs)
         self._selected_plugins = kwargs
 
+    @property
+    def _marker_environment(self) -> dict:
+        return requirements.get_environment(self._python_version or DEFAULT_PYTHON_VERSION)
+
+    def _get_all_wheels_metadata(self) -> dict[pathlib.Path, dict]:
+        paths = [path for versions in self._wheel_paths.values() for path in versions.values()]
+        return self._wheel_metadata.get_many(paths)
+
+    def get_plugin_dependencies(self, plugin: str, version: str) -> dict[str, list[str]]:
+        """
+        Returns the dependency closure of the plugin wheel as far as the wheels in the wheel directory tell,
+        without installing anything
+        """
+        meta = self._wheel_metadata.get(self._wheel_paths[plugin][version])
+        environment = self._marker_environment
+        closure = wheel_metadata.get_dependency_closure(
+            [req.key for req in wheel_metadata.get_requirements(meta, environment)],
+            list(self._get_all_wheels_metadata().values()), environment)
+        closure[requirements.canonical_name(plugin)] = [
+            str(req) for req in wheel_metadata.get_requirements(meta, environment)]
+        return closure
+
+    def check_selection(self) -> list[str]:
+        """Returns problems with the selected plugins found in the wheel metadata"""
+        problems = []
+        python_version = self._python_version or DEFAULT_PYTHON_VERSION
+        for plugin, version in self._selected_plugins.items():
+            try:
+                meta = self._wheel_metadata.get(self._wheel_paths[plugin][version])
+            except wheel_metadata.InvalidWheel as e:
+                problems.append(str(e))
+                continue
+            if not wheel_metadata.supports_python(meta, python_version):
+                problems.append(f'{plugin} {version} kräver python {meta["requires_python"]} '
+                                f'(vald version: {python_version})')
+        self._wheel_metadata.save()
+        return problems
+
+    def resolve(self) -> dict[str, resolver.Candidate]:
+        """
+        Resolves the selected plugins and all their dependencies among the wheels in the wheel directory.
+        Raises resolver.ResolutionError if that is not possible.
+        """
+        python_version = self._python_version or DEFAULT_PYTHON_VERSION
+        requirements_list = [f'{plugin}=={version}' for plugin, version in self._selected_plugins.items()]
+        wheel_paths = [path for versions in self._wheel_paths.values() for path in versions.values()]
+        fingerprint = resolver.get_fingerprint(requirements_list, wheel_paths, python_version,
+                                               self._marker_environment)
+        cached_paths = self._resolution_cache.get(fingerprint)
+        self._resolved_from_cache = cached_paths is not None
+        if self._resolved_from_cache:
+            try:
+                candidates = [resolver.Candidate(path, self._wheel_metadata.get(path)) for path in cached_paths]
+                return {candidate.key: candidate for candidate in candidates}
+            except wheel_metadata.InvalidWheel as e:
+                logger.warning(f'Cached resolution not usable: {e}')
+                self._resolved_from_cache = False
+        # Wheels that can't be read are not candidates
+        res = resolver.Resolver(self._get_all_wheels_metadata(), python_version, self._marker_environment)
+        install_set = res.resolve(requirements_list)
+        self._resolution_cache.set(fingerprint, install_set)
+        return install_set
+
+    def _resolve_install_set(self):
+        """Falls back on letting pip resolve (and download) if the wheel directory is not enough"""
+        try:
+            self._install_set = self.resolve()
+        except resolver.ResolutionError as e:
+            self._install_set = None
+            logger.info(f'Could not resolve offline, pip will resolve: {e}')
+            self._install_info.append('Beroenden kunde inte lösas med enbart wheel-mappen, pip löser dem:')
+            self._install_info.extend(e.explanation)
+            return
+        source = 'sparad lösning' if self._resolved_from_cache else 'wheel-mappen'
+        self._install_info.append(f'Beroenden lösta från {source} ({len(self._install_set)} paket):')
+        self._install_info.extend(f'    {candidate}' for candidate in self._install_set.values())
+
     def _check_set_plugins(self, **kwargs: dict[str, str]) -> None:
         for plugin, version in kwargs.items():
             if plugin not in self._wheel_paths:
@@ -130,6 +442,26 @@ class InstallSHARKtools:
     def pip_freeze_file_path(self) -> pathlib.Path:
         return self._install_files_directory / 'python_packages.txt'
 
+    @property
+    def slim_file_path(self) -> pathlib.Path:
+        return self._install_files_directory / 'removed_files.txt'
+
+    @property
+    def import_report_file_path(self) -> pathlib.Path:
+        return self._install_files_directory / 'import_report.txt'
+
+    @property
+    def _import_time_file_path(self) -> pathlib.Path:
+        return self._install_files_directory / 'importtime.log'
+
+    @property
+    def _import_report_script_path(self) -> pathlib.Path:
+        return self._install_files_directory / 'import_report.py'
+
+    @property
+    def plugin_manifest_path(self) -> pathlib.Path:
+        return self._install_directory / 'plugins.json'
+
     @property
     def _main_python_file_path(self) -> pathlib.Path:
         return self._install_directory / 'main.py'
@@ -144,6 +476,16 @@ class InstallSHARKtools:
     def _venv_directory(self) -> pathlib.Path:
         return self.install_directory / 'venv'
 
+    @property
+    def _site_packages_directory(self) -> pathlib.Path:
+        return self._venv_directory / 'Lib' / 'site-packages'
+
+    @property
+    def _python_tag(self) -> str | None:
+        if not self._python_version:
+            return None
+        return 'cpython-' + ''.join(self._python_version.split('.')[:2])
+
     def _create_batch_environment_file(self):
 
         if not self.python_exe_path:
@@ -165,7 +507,7 @@ class InstallSHARKtools:
             fid.write('\n'.join(lines))
 
     def _run_batch_environment_file(self):
-        subprocess.run([str(self._batch_file_create_venv)])
+        self._run_batch_file(self._batch_file_create_venv)
 
     def _create_batch_install_plugins_file(self):
         lines = []
@@ -174,19 +516,56 @@ class InstallSHARKtools:
 
         lines.append(f'python.exe -m pip install --upgrade pip')
 
-        # Add plugins
+        # pip is run as a module since pip.exe holds the absolute path of the venv, which changes when the
+        # staging directory is renamed. The batch file stops at the first failing install.
         for plugin, version in self._selected_plugins.items():
             path = self._wheel_paths[plugin][version]
-            lines.append(f'pip install {path}')
+            if not self._install_set:
+                lines.append(f'python.exe -m pip install {path}')
+                lines.append('if errorlevel 1 exit /b %errorlevel%')
             self._install_info.append(f'Installerar plugin {path}')
 
-        lines.append(f'pip freeze > {self.pip_freeze_file_path}')
+        if self._install_set:
+            # Everything is already resolved, pip only has to unpack the wheels
+            paths = ' '.join(f'"{candidate.path}"' for candidate in self._install_set.values())
+            lines.append(f'python.exe -m pip install --no-index --no-deps {paths}')
 
         with open(self._batch_file_install_plugins, 'w') as fid:
             fid.write('\n'.join(lines))
 
     def _run_batch_install_plugins_file(self):
-        subprocess.run([str(self._batch_file_install_plugins)])
+        self._run_batch_file(self._batch_file_install_plugins)
+
+    def _run_batch_file(self, path: pathlib.Path) -> None:
+        """Runs the batch file and logs its output line by line"""
+        logger.info(f'Running file {path}', extra=dict(step=path.stem, event='run'))
+        self._throttle.wait()
+        with subprocess.Popen([*self._throttle.get_command_prefix(), str(path)], stdout=subprocess.PIPE,
+                              stderr=subprocess.STDOUT, text=True, errors='replace',
+                              **self._throttle.get_popen_kwargs()) as proc:
+            for line in proc.stdout:
+                logger.debug(line.rstrip())
+        logger.info(f'{path.name} finished with return code {proc.returncode}',
+                    extra=dict(step=path.stem, event='finished'))
+        if proc.returncode:
+            raise subprocess.CalledProcessError(proc.returncode, str(path))
+
+    def _write_package_inventory(self):
+        """Replaces pip freeze. Reads the dist-info directories in the venv instead of starting pip"""
+        distributions = inventory.write_inventory(self._site_packages_directory, self.pip_freeze_file_path)
+        total_size = sum(dist['size'] for dist in distributions)
+        self._install_info.append(f'{len(distributions)} pythonpaket installerade '
+                                  f'({total_size / 1024 / 1024:.1f} MB), se {self.pip_freeze_file_path}')
+
+    def _slim_site_packages(self):
+        result = slim.slim_site_packages(self._site_packages_directory,
+                                         directory_patterns=self._slim_directory_patterns,
+                                         file_patterns=self._slim_file_patterns,
+                                         python_tag=self._python_tag)
+        with open(self.slim_file_path, 'w') as fid:
+            fid.write('\n'.join(f'{path}\t{nr_files}\t{nr_bytes}' for path, nr_files, nr_bytes in result.removed))
+        self._install_info.extend(result.get_report())
+        self._install_info.append(f'Borttagna filer listas i {self.slim_file_path}')
 
     def _create_run_files(self):
         self._create_main_python_file()
@@ -200,23 +579,56 @@ class InstallSHARKtools:
             fid.write('\n'.join(lines))
 
     def _create_batch_run_file(self):
+        """
+        The venv python is called directly, without activating the venv.
+        Start with argument --profile-imports to write a report of import times to _install/import_report.txt
+        """
+        python = self._venv_directory / 'Scripts' / 'python.exe'
         lines = []
-        # Activate venv
-        lines.append(f'call {self._venv_directory}/Scripts/activate')
-
-        lines.append(f'python {self._main_python_file_path}')
+        lines.append('@echo off')
+        import_report.write_script(self._import_report_script_path)
+        lines.append('if "%~1"=="--profile-imports" (')
+        lines.append(f'    "{python}" -X importtime "{self._main_python_file_path}" 2> "{self._import_time_file_path}"')
+        lines.append(f'    "{python}" "{self._import_report_script_path}" "{self._import_time_file_path}" '
+                     f'"{self.import_report_file_path}"')
+        lines.append(f'    echo Rapport över importtider: {self.import_report_file_path}')
+        lines.append('    goto :eof')
+        lines.append(')')
+        lines.append(f'"{python}" "{self._main_python_file_path}" %*')
 
         with open(self.batch_file_run, 'w') as fid:
             fid.write('\n'.join(lines))
 
+    def _create_plugin_manifest(self):
+        """
+        Writes the installed plugins to plugins.json next to main.py so that SHARKtools can list them
+        without importing them
+        """
+        plugins = []
+        for plugin, version in self._selected_plugins.items():
+            path = self._wheel_paths[plugin][version]
+            meta = self._wheel_metadata.get(path)
+            plugins.append(dict(
+                name=plugin,
+                display_name=plugin.removeprefix('SHARKtools_').replace('_', ' '),
+                version=version,
+                entry_module=meta['top_level'][0] if meta['top_level'] else plugin,
+                requires=meta['requires_dist'],
+                wheel=path.name,
+            ))
+        manifest = dict(created=datetime.datetime.now().isoformat(timespec='seconds'), plugins=plugins)
+        with open(self.plugin_manifest_path, 'w') as fid:
+            json.dump(manifest, fid, indent=4)
+
     def _create_summary_file(self):
         with open(self.summary_file_path, 'w') as fid:
             fid.write('\n'.join(self._install_info))
+        self.last_summary_file_path = self.summary_file_path
 
     def _save_wheel_paths(self) -> None:
         """Looks in program directory and save all wheel paths"""
         self._wheel_paths = {}
-        for path in THIS_DIRECTORY.iterdir():
+        for path in self._wheel_directory.iterdir():
             if path.suffix != '.whl':
                 continue
             name, version, rest = path.stem.split('-', 2)
@@ -224,8 +636,7 @@ class InstallSHARKtools:
             self._wheel_paths[name][version] = path
 
     def _try_to_find_python_exe(self) -> None:
-        roots = [pathlib.Path('C:/'), pathlib.Path('C:/python/')]
-        for root in roots:
+        for root in self._python_search_roots:
             if not root.exists():
                 continue
             # Searching C: for python 3.11
@@ -253,15 +664,67 @@ class InstallSHARKtools:
                         return
 
 
+class BatchedUpdater:
+    """
+    Collects controls that need to be updated and sends them to the Flet client in one update after a short
+    delay, so that several changes made in quick succession only cost one round-trip.
+    """
+
+    def __init__(self, page: ft.Page, delay: float = 0.02):
+        self._page = page
+        self._delay = delay
+        self._lock = threading.Lock()
+        self._controls = []
+        self._update_page = False
+        self._timer: threading.Timer | None = None
+
+    def request(self, *controls) -> None:
+        """Requests an update of the given controls. Without controls the whole page is updated"""
+        with self._lock:
+            if not controls:
+                self._update_page = True
+            for control in controls:
+                if not any(control is c for c in self._controls):
+                    self._controls.append(control)
+            if self._timer:
+                return
+            self._timer = threading.Timer(self._delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+            controls = self._controls
+            update_page = self._update_page
+            self._controls = []
+            self._update_page = False
+        if update_page:
+            self._page.update()
+        elif controls:
+            self._page.update(*controls)
+
+
 class FletApp:
     def __init__(self, log_in_console=False):
         self._log_in_console = log_in_console
+        log.setup_logging(self._log_directory, log_in_console=log_in_console)
         self.page = None
         self.file_picker = None
+        self._updater: BatchedUpdater | None = None
 
-        self._install = InstallSHARKtools()
+        self._start_time = time.perf_counter()
+        self.time_to_first_paint: float | None = None
 
-        self._plugins_selection = {}
+        # Wheels and python are looked up in the background after the window is shown
+        self._install = InstallSHARKtools(discover=False)
+        self._install_discovered = threading.Event()
+        self._discovery_error: str | None = None
+
+        self._plugin_selection = PluginSelection()
+        self._plugin_rows = {}
         self._toggle_buttons = []
 
         self._dont_install_string = 'Installera inte'
@@ -276,18 +739,43 @@ class FletApp:
 
     def main(self, page: ft.Page):
         self.page = page
+        self._updater = BatchedUpdater(page)
         self.page.title = 'Installera SHARKtools'
         self.page.window_height = 600
         self.page.window_width = 1000
         self._initiate_pickers()
         self._build()
         self._initiate_banner()
+        self._updater.flush()
+        self.time_to_first_paint = time.perf_counter() - self._start_time
+        logger.info(f'Time to first paint: {self.time_to_first_paint:.3f} s')
 
-        self._set_default_python_version()
         self._set_default_install_root_directory()
+        threading.Thread(target=self._discover_install, daemon=True).start()
+
+    def _discover_install(self):
+        try:
+            self._install.discover()
+            self._plugin_selection.set_plugins({plugin: self._install.get_plugin_versions(plugin)
+                                                for plugin in self._install.plugins})
+            self._show_filtered_plugins()
+            self._set_default_python_version()
+        except Exception as e:
+            logger.exception('Could not find plugins and python')
+            self._discovery_error = f'Kunde inte läsa in plugins: {e}'
+            self._show_info(self._discovery_error)
+        else:
+            logger.info(f'Plugins and python found after {time.perf_counter() - self._start_time:.3f} s')
+        finally:
+            self._plugins_status.visible = False
+            self._install_discovered.set()
+            self.update_page()
 
     def update_page(self):
-        self.page.update()
+        self._updater.request()
+
+    def _request_update(self, *controls):
+        self._updater.request(*controls)
 
     def _initiate_pickers(self):
         self._python_exe_picker = ft.FilePicker(on_result=self._on_pick_python_exe)
@@ -309,39 +797,28 @@ class FletApp:
         )
 
     def _set_banner(self, color):
-        self.banner_content = ft.Column()
-
-        self.page.banner = ft.Banner(
-            # bgcolor=ft.colors.AMBER_100,
-            bgcolor=color,
-            leading=ft.Icon(ft.icons.WARNING_AMBER_ROUNDED, color=ft.colors.AMBER, size=40),
-            content=self.banner_content,
-            force_actions_below=True,
-            actions=[
-                ft.TextButton("OK!", on_click=self._close_banner),
-            ],
-        )
+        self.page.banner.bgcolor = color
 
     def _disable_toggle_buttons(self):
         for btn in self._toggle_buttons:
             btn.disabled = True
-            btn.update()
+        self._request_update(*self._toggle_buttons)
 
     def _enable_toggle_buttons(self):
         for btn in self._toggle_buttons:
             btn.disabled = False
-            btn.update()
+        self._request_update(*self._toggle_buttons)
 
     def _close_banner(self, e=None):
         if not self.page.banner.open:
             return
         self.page.banner.open = False
-        self.page.update()
+        self.update_page()
 
     # def _show_banner(self, e=None):
     def _show_banner(self):
         self.page.banner.open = True
-        self.page.update()
+        self.update_page()
 
     def _show_info(self, text, status='bad'):
         self._set_banner(get_banner_color(status))
@@ -358,6 +835,13 @@ class FletApp:
         root_layout.controls.append(self._get_install_directory_container())
         root_layout.controls.append(self._get_install_plugins_container())
 
+        self._slim_venv = ft.Checkbox(label='Ta bort tester, exempel och typfiler från installerade paket',
+                                      value=False)
+        root_layout.controls.append(self._slim_venv)
+        self._low_priority = ft.Checkbox(label='Installera med låg prioritet (datorn används till annat samtidigt)',
+                                         value=False)
+        root_layout.controls.append(self._low_priority)
+
         btn = ft.ElevatedButton(text='INSTALLERA', on_click=self._install_app)
         self._toggle_buttons.append(btn)
         root_layout.controls.append(btn)
@@ -415,53 +899,122 @@ class FletApp:
         return container
 
     def _get_install_plugins_container(self):
-        row = ft.Row()
-        for plugin in self._install.plugins:
-            row.controls.append(self._get_plugin_container(plugin))
-
-        container = ft.Container(content=row,
+        self._plugin_filter = ft.TextField(label='Sök plugin', dense=True, width=300,
+                                           on_change=self._on_plugin_filter_change)
+        self._plugins_status = ft.Row(controls=[ft.ProgressRing(width=16, height=16),
+                                                ft.Text('Letar efter plugins...')])
+        # ListView only renders the rows that are visible
+        self._plugins_list = ft.ListView(expand=True, spacing=5)
+
+        col = ft.Column(controls=[self._plugin_filter, self._plugins_status, self._plugins_list], expand=True)
+        container = ft.Container(content=col,
                                  bgcolor='#999999',
                                  border_radius=10,
                                  padding=10,
-                                 expand=False,
+                                 expand=True,
                                  )
 
         return container
 
-    def _get_plugin_container(self, plugin):
+    def _show_filtered_plugins(self):
+        plugins = self._plugin_selection.filter(self._plugin_filter.value or '')
+        self._plugins_list.controls = [self._get_plugin_row(plugin)['tile'] for plugin in plugins]
+
+    def _on_plugin_filter_change(self, e=None):
+        self._show_filtered_plugins()
+        self._request_update(self._plugins_list)
+
+    def _get_plugin_row(self, plugin):
+        """Rows are created the first time they are shown. Version history is created when expanded"""
+        if plugin in self._plugin_rows:
+            return self._plugin_rows[plugin]
+        checkbox = ft.Checkbox(value=False, on_change=lambda e, p=plugin: self._on_plugin_checked(p, e.control.value))
+        subtitle = ft.Text(self._get_plugin_subtitle(plugin))
+        tile = ft.ExpansionTile(title=ft.Text(plugin),
+                                subtitle=subtitle,
+                                leading=checkbox,
+                                bgcolor=get_plugin_color(plugin),
+                                collapsed_bgcolor=get_plugin_color(plugin),
+                                on_change=lambda e, p=plugin: self._on_plugin_expand(p))
+        self._plugin_rows[plugin] = dict(tile=tile, checkbox=checkbox, subtitle=subtitle, radio_group=None)
+        return self._plugin_rows[plugin]
+
+    def _get_plugin_subtitle(self, plugin):
+        version = self._plugin_selection.get_selected_version(plugin)
+        latest = self._plugin_selection.get_latest_version(plugin)
+        if not version:
+            return f'{self._dont_install_string} (senaste version: {latest})'
+        if version == latest:
+            return f'Installerar {version} (senaste)'
+        return f'Installerar {version}'
+
+    def _on_plugin_expand(self, plugin):
+        row = self._plugin_rows[plugin]
+        if row['radio_group']:
+            return
         radio_col = ft.Column()
-
-        col = ft.Column()
-        for version in self._install.get_plugin_versions(plugin):
+        for version in self._plugin_selection.get_versions(plugin):
             radio_col.controls.append(ft.Radio(value=version, label=version))
-        radio_col.controls.append(ft.Radio(value=self._dont_install_string, label=self._dont_install_string))
-        radio_group = ft.RadioGroup(content=radio_col)
-
-        self._plugins_selection[plugin] = radio_group
-
-        col.controls.append(ft.Text(plugin))
-        col.controls.append(radio_group)
-        container = ft.Container(content=col,
-                                 bgcolor=get_plugin_color(plugin),
-                                 border_radius=10,
-                                 padding=10,
-                                 expand=False
-                                 )
-
-        return container
+        row['radio_group'] = ft.RadioGroup(content=radio_col,
+                                           value=self._plugin_selection.get_selected_version(plugin),
+                                           on_change=lambda e, p=plugin: self._on_plugin_version(p, e.control.value))
+        row['tile'].controls = [row['radio_group'], ft.Text(self._get_plugin_dependencies_text(plugin), size=12)]
+        self._request_update(row['tile'])
+
+    def _get_plugin_dependencies_text(self, plugin):
+        version = self._plugin_selection.get_selected_version(plugin) or \
+                  self._plugin_selection.get_latest_version(plugin)
+        try:
+            dependencies = self._install.get_plugin_dependencies(plugin, version)
+        except Exception as e:
+            logger.warning(f'Could not read dependencies of {plugin} {version}: {e}')
+            return 'Kunde inte läsa beroenden'
+        dependencies.pop(requirements.canonical_name(plugin), None)
+        if not dependencies:
+            return f'{version} har inga beroenden'
+        return f'Beroenden för {version}: {", ".join(sorted(dependencies))}'
+
+    def _on_plugin_checked(self, plugin, checked):
+        if checked:
+            self._plugin_selection.select(plugin, latest=True)
+        else:
+            self._plugin_selection.select(plugin, None)
+        self._update_plugin_row(plugin)
+
+    def _on_plugin_version(self, plugin, version):
+        self._plugin_selection.select(plugin, version)
+        self._update_plugin_row(plugin)
+
+    def _update_plugin_row(self, plugin):
+        row = self._plugin_rows[plugin]
+        version = self._plugin_selection.get_selected_version(plugin)
+        row['checkbox'].value = bool(version)
+        row['subtitle'].value = self._get_plugin_subtitle(plugin)
+        if row['radio_group']:
+            row['radio_group'].value = version
+        self._request_update(row['tile'])
 
     def _set_default_python_version(self):
+        if self._python_path.value:
+            # Already picked by the user
+            return
         if self._install.python_exe_path:
             self._python_path.value = str(self._install.python_exe_path)
-            self._python_path.update()
+            self._request_update(self._python_path)
 
     def _set_default_install_root_directory(self):
         path = pathlib.Path(r'C:/sharktools_installs')
         path.mkdir(exist_ok=True)
         self._install_root_directory.value = str(path)
-        self._install_root_directory.update()
+        self._request_update(self._install_root_directory)
 
     def _install_app(self, *args):
+        if not self._install_discovered.is_set():
+            self._show_info('Letar fortfarande efter plugins, försök igen om en stund', status='working')
+            return
+        if self._discovery_error:
+            self._show_info(self._discovery_error)
+            return
         root_dir = self._install_root_directory.value
         if not root_dir:
             self._show_info('Ingen installationsmapp vald')
@@ -474,19 +1027,25 @@ class FletApp:
         self._show_info('Installerar...', status='working')
         self._install.set_install_root_directory(root_dir)
         self._install.set_plugins(**self._get_plugin_selection())
-        self._install.install()
+        self._install.set_slim_venv(bool(self._slim_venv.value))
+        self._install.set_low_priority(bool(self._low_priority.value))
+        try:
+            self._install.install()
+        except Exception as e:
+            logger.exception('Installation failed')
+            self._enable_toggle_buttons()
+            text = f'Installationen misslyckades: {e}'
+            if self._install.last_summary_file_path:
+                text += (f'\nInfo i fil {self._install.last_summary_file_path}. '
+                         f'\nInstallera igen för att fortsätta där installationen avbröts.')
+            self._show_info(text)
+            return
         self._enable_toggle_buttons()
-        self._show_info(f'Installation klar. \nInfo i fil {self._install.summary_file_path}. '
-                        f'\nKör program med {self._install.batch_file_run}', status='good')
+        self._show_info(f'Installation klar. \nInfo i fil {self._install.last_summary_file_path}. '
+                        f'\nKör program med {self._install.launcher_path}', status='good')
 
     def _get_plugin_selection(self) -> dict[str, str]:
-        plugins = {}
-        for plugin, wid in self._plugins_selection.items():
-            value = wid.value
-            if not value or value == self._dont_install_string:
-                continue
-            plugins[plugin] = value
-        return plugins
+        return self._plugin_selection.selected
 
     def _on_pick_python_exe(self, e: ft.FilePickerResultEvent):
         self._close_banner()
@@ -494,14 +1053,14 @@ class FletApp:
             return
         path = e.files[0].path
         self._python_path.value = path
-        self._python_path.update()
+        self._request_update(self._python_path)
 
     def _on_pick_install_root_dir(self, e: ft.FilePickerResultEvent):
         self._close_banner()
         if not e.path:
             return
         self._install_root_directory.value = e.path
-        self._install_root_directory.update()
+        self._request_update(self._install_root_directory)
 
 
 def run_flet_app(log_in_console):
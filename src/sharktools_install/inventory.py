@@ -0,0 +1,127 @@
+"""
+Lists the python packages installed in a venv by reading the .dist-info directories in site-packages,
+without starting pip or the venv python.
+
+    python -m sharktools_install.inventory C:/sharktools_installs/SHARKtools_20240619/venv/Lib/site-packages
+"""
+import argparse
+import csv
+import json
+import pathlib
+import urllib.parse
+import urllib.request
+
+from sharktools_install import wheel_metadata
+from sharktools_install.requirements import canonical_name
+
+
+def _read_text(path: pathlib.Path) -> str | None:
+    try:
+        return path.read_text(encoding='utf-8')
+    except FileNotFoundError:
+        return None
+
+
+def _read_record(path: pathlib.Path) -> tuple[int, int]:
+    """Returns number of files and their total size as installed"""
+    nr_files = 0
+    size = 0
+    text = _read_text(path)
+    if text is None:
+        return 0, 0
+    for row in csv.reader(text.splitlines()):
+        if not row:
+            continue
+        nr_files += 1
+        if len(row) > 2 and row[2]:
+            size += int(row[2])
+    return nr_files, size
+
+
+def read_distribution(dist_info: pathlib.Path) -> dict:
+    meta = wheel_metadata.parse_metadata(_read_text(dist_info / 'METADATA') or '')
+    nr_files, size = _read_record(dist_info / 'RECORD')
+    direct_url = json.loads(_read_text(dist_info / 'direct_url.json') or 'null')
+    wheel = None
+    if direct_url and direct_url.get('url', '').startswith('file:'):
+        local_path = urllib.request.url2pathname(urllib.parse.urlparse(direct_url['url']).path)
+        if local_path.endswith('.whl'):
+            wheel = pathlib.PurePath(local_path).name
+    return dict(
+        name=meta['name'] or dist_info.name[:-len('.dist-info')].rsplit('-', 1)[0],
+        version=meta['version'],
+        installer=(_read_text(dist_info / 'INSTALLER') or '').strip() or None,
+        requested=(dist_info / 'REQUESTED').exists(),
+        direct_url=direct_url,
+        wheel=wheel,
+        nr_files=nr_files,
+        size=size,
+        dist_info=dist_info.name,
+    )
+
+
+def read_distributions(site_packages: pathlib.Path | str) -> list[dict]:
+    """Returns the installed distributions sorted by name"""
+    site_packages = pathlib.Path(site_packages)
+    if not site_packages.exists():
+        return []
+    distributions = [read_distribution(path) for path in site_packages.glob('*.dist-info') if path.is_dir()]
+    return sorted(distributions, key=lambda dist: canonical_name(dist['name']))
+
+
+def get_requirement_line(distribution: dict) -> str:
+    """Same form as pip freeze"""
+    direct_url = distribution['direct_url']
+    if direct_url:
+        if direct_url.get('dir_info', {}).get('editable'):
+            return f'-e {direct_url["url"]}'
+        return f'{distribution["name"]} @ {direct_url["url"]}'
+    return f'{distribution["name"]}=={distribution["version"]}'
+
+
+def _format_size(size: int) -> str:
+    if size >= 1024 * 1024:
+        return f'{size / 1024 / 1024:.1f} MB'
+    return f'{size / 1024:.1f} kB'
+
+
+def get_inventory_lines(distributions: list[dict]) -> list[str]:
+    """
+    One line per package as from pip freeze, with the extra information as a comment so that the file
+    can still be used with pip install -r
+    """
+    lines = []
+    for dist in distributions:
+        info = [f'{dist["nr_files"]} filer', _format_size(dist['size'])]
+        if dist['direct_url']:
+            info.insert(0, dist['version'])
+        if dist['installer']:
+            info.append(f'installer={dist["installer"]}')
+        if dist['wheel']:
+            info.append(f'wheel={dist["wheel"]}')
+        lines.append(f'{get_requirement_line(dist)}  # {", ".join(info)}')
+    return lines
+
+
+def write_inventory(site_packages: pathlib.Path | str, path: pathlib.Path | str) -> list[dict]:
+    distributions = read_distributions(site_packages)
+    with open(path, 'w', encoding='utf-8') as fid:
+        fid.write('\n'.join(get_inventory_lines(distributions)))
+    return distributions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Lista installerade pythonpaket utan att starta pip')
+    parser.add_argument('site_packages', type=pathlib.Path)
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+    distributions = read_distributions(args.site_packages)
+    if args.json:
+        print(json.dumps(distributions, indent=4))
+    else:
+        print('\n'.join(get_inventory_lines(distributions)))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
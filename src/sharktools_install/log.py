@@ -0,0 +1,87 @@
+import atexit
+import datetime
+import json
+import logging
+import logging.handlers
+import pathlib
+import queue
+
+# __main__ is included for when install_sharktools is run as a script
+LOGGER_NAMES = ['sharktools_install', '__main__']
+LOG_FORMAT = '%(asctime)s [%(levelname)10s]    %(pathname)s [%(lineno)d] => %(funcName)s():    %(message)s'
+
+# Extra attributes that are written to the json lines log
+STRUCTURED_FIELDS = ['step', 'event', 'duration']
+
+_listener: logging.handlers.QueueListener | None = None
+
+
+class JsonLinesFormatter(logging.Formatter):
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = dict(
+            time=datetime.datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            level=record.levelname,
+            logger=record.name,
+            message=record.getMessage(),
+        )
+        for field in STRUCTURED_FIELDS:
+            if hasattr(record, field):
+                data[field] = getattr(record, field)
+        return json.dumps(data, ensure_ascii=False)
+
+
+class StructuredFilter(logging.Filter):
+    """Lets through records logged with extra=dict(step=...)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return hasattr(record, 'step')
+
+
+def setup_logging(log_directory: pathlib.Path | str, log_in_console: bool = False,
+                  level: int | str = logging.DEBUG) -> logging.handlers.QueueListener:
+    """
+    Logging from the installer and the GUI only puts records on a queue. A listener thread writes them to
+    a rotating log file, a json lines file with install step records and (optionally) the console.
+    """
+    global _listener
+    if _listener:
+        return _listener
+
+    log_directory = pathlib.Path(log_directory)
+    log_directory.mkdir(parents=True, exist_ok=True)
+
+    file_handler = logging.handlers.RotatingFileHandler(log_directory / 'sharktools_install.log',
+                                                        maxBytes=5_000_000, backupCount=5, encoding='utf-8')
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    steps_handler = logging.handlers.RotatingFileHandler(log_directory / 'sharktools_install_steps.jsonl',
+                                                         maxBytes=5_000_000, backupCount=5, encoding='utf-8')
+    steps_handler.setFormatter(JsonLinesFormatter())
+    steps_handler.addFilter(StructuredFilter())
+
+    handlers = [file_handler, steps_handler]
+    if log_in_console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        handlers.append(console_handler)
+
+    log_queue = queue.SimpleQueue()
+    for name in LOGGER_NAMES:
+        logger = logging.getLogger(name)
+        logger.setLevel(level)
+        logger.addHandler(logging.handlers.QueueHandler(log_queue))
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+
+def stop_logging() -> None:
+    """Writes all queued records and stops the listener thread"""
+    global _listener
+    if not _listener:
+        return
+    _listener.stop()
+    _listener = None
@@ -0,0 +1,252 @@
+"""
+Manifest of all files in an installation, used to verify and repair the installation afterwards.
+
+    python -m sharktools_install.manifest verify C:/sharktools_installs/SHARKtools_20240619 [--repair]
+"""
+import argparse
+import base64
+import concurrent.futures
+import csv
+import datetime
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import subprocess
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE_NAME = 'manifest.json'
+# Relative to the install directory. _install holds logs, reports and the manifest itself
+EXCLUDE_DIRECTORIES = ['_install', '__pycache__']
+# Small files outside the venv (run files, main.py etc.) are stored in the manifest to be restored on repair
+MAX_STORED_FILE_SIZE = 100_000
+
+
+def get_file_hash(path: pathlib.Path | str) -> str:
+    """Returns the hash on the same form as in the RECORD file of a wheel"""
+    sha = hashlib.sha256()
+    with open(path, 'rb') as fid:
+        for chunk in iter(lambda: fid.read(1024 * 1024), b''):
+            sha.update(chunk)
+    return 'sha256=' + base64.urlsafe_b64encode(sha.digest()).rstrip(b'=').decode('ascii')
+
+
+def _get_venv_site_packages(install_directory: pathlib.Path) -> pathlib.Path:
+    return install_directory / 'venv' / 'Lib' / 'site-packages'
+
+
+def read_record_hashes(site_packages: pathlib.Path) -> dict[str, tuple[str, int, str]]:
+    """Returns {path relative to site-packages: (hash, size, distribution)} from all RECORD files"""
+    records = {}
+    if not site_packages.exists():
+        return records
+    for dist_info in site_packages.glob('*.dist-info'):
+        record_path = dist_info / 'RECORD'
+        if not record_path.exists():
+            continue
+        distribution = dist_info.name[:-len('.dist-info')]
+        with open(record_path, newline='', encoding='utf-8') as fid:
+            for row in csv.reader(fid):
+                if len(row) < 3 or not row[1]:
+                    continue
+                path = os.path.normpath(row[0]).replace('\\', '/')
+                records[path] = (row[1], int(row[2] or -1), distribution)
+    return records
+
+
+def _iter_files(install_directory: pathlib.Path):
+    for root, dirs, files in os.walk(install_directory):
+        dirs[:] = [d for d in dirs if d not in EXCLUDE_DIRECTORIES]
+        for name in files:
+            yield pathlib.Path(root, name)
+
+
+def create_manifest(install_directory: pathlib.Path | str, workers: int | None = None,
+                    wheel_directory: pathlib.Path | str | None = None) -> dict:
+    """
+    Files listed with a matching size in a wheel RECORD reuse the hash from the RECORD.
+    All other files are hashed on a thread pool.
+    """
+    install_directory = pathlib.Path(install_directory)
+    site_packages = _get_venv_site_packages(install_directory)
+    records = read_record_hashes(site_packages)
+    files = {}
+    to_hash = []
+    for path in _iter_files(install_directory):
+        stat = path.stat()
+        rel_path = path.relative_to(install_directory).as_posix()
+        entry = dict(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+        record = None
+        if path.is_relative_to(site_packages):
+            record = records.get(path.relative_to(site_packages).as_posix())
+        if record and record[1] == stat.st_size:
+            entry['hash'] = record[0]
+            entry['distribution'] = record[2]
+        else:
+            to_hash.append((rel_path, path))
+        if not path.is_relative_to(install_directory / 'venv') and stat.st_size <= MAX_STORED_FILE_SIZE:
+            try:
+                entry['content'] = path.read_text(encoding='utf-8')
+            except UnicodeDecodeError:
+                pass
+        files[rel_path] = entry
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        for (rel_path, _), file_hash in zip(to_hash, executor.map(lambda item: get_file_hash(item[1]), to_hash)):
+            files[rel_path]['hash'] = file_hash
+
+    return dict(created=datetime.datetime.now().isoformat(timespec='seconds'),
+                wheel_directory=str(wheel_directory) if wheel_directory else None,
+                files=files)
+
+
+def write_manifest(install_directory: pathlib.Path | str, workers: int | None = None,
+                   wheel_directory: pathlib.Path | str | None = None) -> pathlib.Path:
+    install_directory = pathlib.Path(install_directory)
+    manifest = create_manifest(install_directory, workers=workers, wheel_directory=wheel_directory)
+    path = install_directory / '_install' / MANIFEST_FILE_NAME
+    path.parent.mkdir(exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as fid:
+        json.dump(manifest, fid)
+    return path
+
+
+def load_manifest(install_directory: pathlib.Path | str) -> dict:
+    path = pathlib.Path(install_directory) / '_install' / MANIFEST_FILE_NAME
+    if not path.exists():
+        raise FileNotFoundError(f'Ingen manifestfil: {path}')
+    with open(path, encoding='utf-8') as fid:
+        return json.load(fid)
+
+
+class VerifyResult:
+
+    def __init__(self):
+        self.missing: list[str] = []
+        self.changed: list[str] = []
+        self.added: list[str] = []
+        self.nr_checked = 0
+        self.nr_hashed = 0
+
+    @property
+    def ok(self) -> bool:
+        return not (self.missing or self.changed)
+
+    def get_report(self) -> list[str]:
+        lines = [f'Kontrollerade {self.nr_checked} filer ({self.nr_hashed} hashade)']
+        for title, paths in [('Saknas', self.missing), ('Ändrade', self.changed), ('Nya', self.added)]:
+            if paths:
+                lines.append(f'{title} ({len(paths)}):')
+                lines.extend(f'    {path}' for path in paths)
+        if self.ok:
+            lines.append('Installationen är oförändrad')
+        return lines
+
+
+def _check_file(install_directory: pathlib.Path, rel_path: str, entry: dict) -> tuple[str, bool]:
+    """Returns (status, hashed) where status is "ok", "missing" or "changed" """
+    path = install_directory / rel_path
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return 'missing', False
+    if stat.st_size != entry['size']:
+        return 'changed', False
+    if stat.st_mtime_ns == entry['mtime_ns']:
+        return 'ok', False
+    # Same size but touched, only the content can tell
+    if get_file_hash(path) != entry['hash']:
+        return 'changed', True
+    return 'ok', True
+
+
+def verify(install_directory: pathlib.Path | str, manifest: dict | None = None,
+           workers: int | None = None) -> VerifyResult:
+    install_directory = pathlib.Path(install_directory)
+    if manifest is None:
+        manifest = load_manifest(install_directory)
+    files = manifest['files']
+    result = VerifyResult()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        checks = executor.map(lambda item: (item[0], _check_file(install_directory, *item)), files.items())
+        for rel_path, (status, hashed) in checks:
+            result.nr_checked += 1
+            result.nr_hashed += hashed
+            if status == 'missing':
+                result.missing.append(rel_path)
+            elif status == 'changed':
+                result.changed.append(rel_path)
+    for path in _iter_files(install_directory):
+        rel_path = path.relative_to(install_directory).as_posix()
+        if rel_path not in files:
+            result.added.append(rel_path)
+    result.missing.sort()
+    result.changed.sort()
+    result.added.sort()
+    return result
+
+
+def repair(install_directory: pathlib.Path | str, result: VerifyResult, manifest: dict | None = None) -> list[str]:
+    """
+    Restores missing and changed files. Files stored in the manifest are written back and python packages
+    with damaged files are reinstalled with pip. Returns the paths that could not be repaired.
+    """
+    install_directory = pathlib.Path(install_directory)
+    if manifest is None:
+        manifest = load_manifest(install_directory)
+    files = manifest['files']
+    distributions = set()
+    not_repaired = []
+    for rel_path in result.missing + result.changed:
+        entry = files[rel_path]
+        if 'content' in entry:
+            path = install_directory / rel_path
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(entry['content'], encoding='utf-8')
+            logger.info(f'Restored {rel_path}')
+        elif 'distribution' in entry:
+            distributions.add(entry['distribution'])
+        else:
+            not_repaired.append(rel_path)
+
+    if distributions:
+        python = install_directory / 'venv' / 'Scripts' / 'python.exe'
+        requirements = ['=='.join(dist.rsplit('-', 1)) for dist in sorted(distributions)]
+        logger.info(f'Reinstalling {", ".join(requirements)}')
+        args = [str(python), '-m', 'pip', 'install', '--force-reinstall', '--no-deps']
+        if manifest.get('wheel_directory'):
+            args.extend(['--find-links', manifest['wheel_directory']])
+        subprocess.run([*args, *requirements], check=True)
+    return not_repaired
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Kontrollera en SHARKtools-installation mot dess manifest')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    create_parser = subparsers.add_parser('create')
+    create_parser.add_argument('install_directory', type=pathlib.Path)
+    verify_parser = subparsers.add_parser('verify')
+    verify_parser.add_argument('install_directory', type=pathlib.Path)
+    verify_parser.add_argument('--repair', action='store_true')
+    args = parser.parse_args()
+    if args.command == 'create':
+        print(write_manifest(args.install_directory))
+        return 0
+    result = verify(args.install_directory)
+    print('\n'.join(result.get_report()))
+    if result.ok:
+        return 0
+    if not args.repair:
+        return 1
+    not_repaired = repair(args.install_directory, result)
+    if not_repaired:
+        print('Kunde inte reparera:')
+        print('\n'.join(f'    {path}' for path in not_repaired))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,148 @@
+"""
+Low priority installation for computers that do other work at the same time, ex. logging CTD data.
+
+Child processes are started with low CPU priority (and low I/O priority where the platform lets us set it
+for a child), parallel work gets fewer workers and new work waits while the computer is busy.
+"""
+import ctypes
+import logging
+import os
+import pathlib
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Above these the computer is considered busy
+BUSY_CPU_LOAD = 0.75
+BUSY_DISK_LATENCY = 0.05
+# Longest time to wait for the computer to become less busy before each piece of work
+MAX_WAIT = 60.
+POLL_INTERVAL = 1.
+
+
+def get_cpu_load(interval: float = 0.2) -> float | None:
+    """Returns the share of the CPU capacity in use (0-1), or None if it can't be measured"""
+    if hasattr(os, 'getloadavg'):
+        return min(1., os.getloadavg()[0] / (os.cpu_count() or 1))
+    if os.name != 'nt':
+        return None
+
+    def get_times():
+        idle, kernel, user = ctypes.c_ulonglong(), ctypes.c_ulonglong(), ctypes.c_ulonglong()
+        ctypes.windll.kernel32.GetSystemTimes(ctypes.byref(idle), ctypes.byref(kernel), ctypes.byref(user))
+        # Kernel time includes idle time
+        return idle.value, kernel.value + user.value
+
+    idle_1, total_1 = get_times()
+    time.sleep(interval)
+    idle_2, total_2 = get_times()
+    if total_2 == total_1:
+        return None
+    return 1 - (idle_2 - idle_1) / (total_2 - total_1)
+
+
+def get_disk_latency(directory: pathlib.Path | str) -> float:
+    """Time in seconds to write and flush a small file to disk in directory"""
+    start = time.perf_counter()
+    with tempfile.TemporaryFile(dir=directory) as fid:
+        fid.write(b'0' * 4096)
+        fid.flush()
+        os.fsync(fid.fileno())
+    return time.perf_counter() - start
+
+
+def get_popen_kwargs() -> dict:
+    """Keyword arguments for subprocess.Popen to start a child process with low priority on Windows"""
+    if os.name == 'nt':
+        # Children of an idle priority process are also started with idle priority
+        return dict(creationflags=subprocess.IDLE_PRIORITY_CLASS)
+    return {}
+
+
+def get_command_prefix() -> list[str]:
+    """
+    nice gives low CPU priority and ionice idle I/O priority on Linux. They are used instead of preexec_fn,
+    which is not safe when other threads are running. Windows has no way to set I/O priority for a child
+    process.
+    """
+    if os.name == 'nt':
+        return []
+    prefix = []
+    if shutil.which('nice'):
+        prefix.extend(['nice', '-n', '10'])
+    if shutil.which('ionice'):
+        prefix.extend(['ionice', '-c', '3'])
+    return prefix
+
+
+class Throttle:
+    """
+    Decides the number of workers and makes work wait while the computer is busy. When not enabled
+    nothing is changed.
+    """
+
+    def __init__(self, enabled: bool = False, directory: pathlib.Path | str | None = None):
+        self.enabled = enabled
+        self._directory = directory
+        self._lock = threading.Lock()
+        self.throttled_time = 0.
+        self.cpu_load: float | None = None
+        self.disk_latency: float | None = None
+
+    def set_directory(self, directory: pathlib.Path | str) -> None:
+        self._directory = directory
+
+    def sample(self) -> None:
+        self.cpu_load = get_cpu_load()
+        if self._directory:
+            try:
+                self.disk_latency = get_disk_latency(self._directory)
+            except OSError:
+                self.disk_latency = None
+
+    @property
+    def busy(self) -> bool:
+        return (self.cpu_load is not None and self.cpu_load > BUSY_CPU_LOAD) or \
+            (self.disk_latency is not None and self.disk_latency > BUSY_DISK_LATENCY)
+
+    def get_workers(self, default: int | None) -> int | None:
+        """At most a quarter of the CPUs, and a single worker while the computer is busy"""
+        if not self.enabled:
+            return default
+        self.sample()
+        if self.busy:
+            return 1
+        workers = max(1, (os.cpu_count() or 1) // 4)
+        return min(default, workers) if default else workers
+
+    def wait(self) -> float:
+        """Waits until the computer is not busy, at most MAX_WAIT seconds. Returns the time waited"""
+        if not self.enabled:
+            return 0.
+        waited = 0.
+        self.sample()
+        while self.busy and waited < MAX_WAIT:
+            time.sleep(POLL_INTERVAL)
+            waited += POLL_INTERVAL
+            self.sample()
+        if waited:
+            logger.info(f'Waited {waited:.1f} s for the computer to be less busy')
+            with self._lock:
+                self.throttled_time += waited
+        return waited
+
+    def get_popen_kwargs(self) -> dict:
+        return get_popen_kwargs() if self.enabled else {}
+
+    def get_command_prefix(self) -> list[str]:
+        return get_command_prefix() if self.enabled else []
+
+    def get_report(self) -> list[str]:
+        if not self.enabled:
+            return []
+        return [f'Installerat med låg prioritet. Väntade {self.throttled_time:.1f} s på att datorn skulle '
+                f'bli mindre belastad']
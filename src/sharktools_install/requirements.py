@@ -0,0 +1,282 @@
+"""
+Minimal parsing of requirement strings, versions, specifiers and environment markers as used in wheel
+metadata (Requires-Dist, Requires-Python). Only the standard library is used since the installer is
+distributed as a frozen exe.
+"""
+import re
+
+_REQUIREMENT_PATTERN = re.compile(
+    r'^\s*(?P<name>[A-Za-z0-9][A-Za-z0-9._-]*)\s*'
+    r'(\[(?P<extras>[^\]]*)\])?\s*'
+    r'(\(?(?P<specifier>[^;()]*)\)?)?\s*'
+    r'(;\s*(?P<marker>.*))?$'
+)
+_SPECIFIER_PATTERN = re.compile(r'^\s*(~=|===|==|!=|<=|>=|<|>)\s*(\S+)\s*$')
+_RELEASE_PATTERN = re.compile(r'^v?(\d+(?:\.\d+)*)(?:[-_.]?(a|b|c|rc|alpha|beta|pre|preview)[-_.]?(\d*))?'
+                              r'(?:[-_.]?(post|rev|r)[-_.]?(\d*))?(?:[-_.]?(dev)[-_.]?(\d*))?(?:\+.*)?$',
+                              re.IGNORECASE)
+_PRE_RELEASE = dict(a='a', alpha='a', b='b', beta='b', c='rc', rc='rc', pre='rc', preview='rc')
+
+
+class InvalidRequirement(ValueError):
+    pass
+
+
+def canonical_name(name: str) -> str:
+    return re.sub(r'[-_.]+', '-', name).lower()
+
+
+class Version:
+    """Orderable version following the main rules of PEP 440"""
+
+    def __init__(self, version: str):
+        self.text = version.strip()
+        match = _RELEASE_PATTERN.match(self.text)
+        if not match:
+            raise InvalidRequirement(f'Ogiltig version: {version}')
+        release, pre_label, pre_nr, post_label, post_nr, dev_label, dev_nr = match.groups()
+        self.release = tuple(int(part) for part in release.split('.'))
+        self.pre = (_PRE_RELEASE[pre_label.lower()], int(pre_nr or 0)) if pre_label else None
+        self.post = int(post_nr or 0) if post_label else None
+        self.dev = int(dev_nr or 0) if dev_label else None
+
+    @property
+    def is_prerelease(self) -> bool:
+        return self.pre is not None or self.dev is not None
+
+    def _key(self) -> tuple:
+        release = list(self.release)
+        while len(release) > 1 and release[-1] == 0:
+            release.pop()
+        if self.pre is None and self.post is None and self.dev is not None:
+            pre = ('', -1)
+        elif self.pre is None:
+            pre = ('z', 0)
+        else:
+            pre = self.pre
+        post = -1 if self.post is None else self.post
+        dev = float('inf') if self.dev is None else self.dev
+        return tuple(release), pre, post, dev
+
+    def __eq__(self, other):
+        return self._key() == other._key()
+
+    def __lt__(self, other):
+        return self._key() < other._key()
+
+    def __le__(self, other):
+        return self._key() <= other._key()
+
+    def __gt__(self, other):
+        return self._key() > other._key()
+
+    def __ge__(self, other):
+        return self._key() >= other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __str__(self):
+        return self.text
+
+    def __repr__(self):
+        return f'Version({self.text!r})'
+
+
+class SpecifierSet:
+
+    def __init__(self, text: str = ''):
+        self.text = (text or '').strip()
+        self._specifiers = []
+        for part in self.text.split(','):
+            if not part.strip():
+                continue
+            match = _SPECIFIER_PATTERN.match(part)
+            if not match:
+                raise InvalidRequirement(f'Ogiltig versionsangivelse: {part}')
+            self._specifiers.append(match.groups())
+
+    def __str__(self):
+        return self.text
+
+    def __bool__(self):
+        return bool(self._specifiers)
+
+    def contains(self, version: str | Version, prereleases: bool = False) -> bool:
+        if isinstance(version, str):
+            version = Version(version)
+        if version.is_prerelease and not prereleases and not any(
+                Version(value.rstrip('.*')).is_prerelease for _, value in self._specifiers if value != '*'):
+            return False
+        return all(self._match(operator, value, version) for operator, value in self._specifiers)
+
+    @staticmethod
+    def _match(operator: str, value: str, version: Version) -> bool:
+        if value.endswith('.*'):
+            prefix = tuple(int(part) for part in value[:-2].split('.'))
+            matches = version.release[:len(prefix)] == prefix or (
+                len(version.release) < len(prefix) and version.release + (0,) * (len(prefix) - len(version.release)) == prefix)
+            return matches if operator == '==' else not matches
+        if operator == '===':
+            return version.text == value
+        other = Version(value)
+        if operator == '==':
+            return version == other
+        if operator == '!=':
+            return version != other
+        if operator == '<=':
+            return version <= other
+        if operator == '>=':
+            return version >= other
+        if operator == '<':
+            return version < other and not (version.release[:len(other.release)] == other.release and version.is_prerelease and not other.is_prerelease)
+        if operator == '>':
+            return version > other and (version.post is None or version.release != other.release)
+        if operator == '~=':
+            upper = list(other.release[:-1])
+            upper[-1] += 1
+            return version >= other and version < Version('.'.join(str(part) for part in upper))
+        raise InvalidRequirement(f'Okänd operator: {operator}')
+
+
+class Requirement:
+
+    def __init__(self, text: str):
+        self.text = text.strip()
+        match = _REQUIREMENT_PATTERN.match(self.text)
+        if not match:
+            raise InvalidRequirement(f'Ogiltigt beroende: {text}')
+        self.name = match.group('name')
+        self.key = canonical_name(self.name)
+        self.extras = [extra.strip() for extra in (match.group('extras') or '').split(',') if extra.strip()]
+        specifier = (match.group('specifier') or '').strip()
+        if specifier.startswith('@'):
+            raise InvalidRequirement(f'Beroenden med URL stöds inte: {text}')
+        self.specifier = SpecifierSet(specifier)
+        self.marker = (match.group('marker') or '').strip() or None
+
+    def applies_to(self, environment: dict, extras: list[str] | tuple[str, ...] = ()) -> bool:
+        if not self.marker:
+            return True
+        if 'extra' not in self.marker:
+            return evaluate_marker(self.marker, environment)
+        return any(evaluate_marker(self.marker, dict(environment, extra=extra)) for extra in extras or [''])
+
+    def __str__(self):
+        return self.text
+
+    def __repr__(self):
+        return f'Requirement({self.text!r})'
+
+
+def get_environment(python_version: str, sys_platform: str = 'win32', platform_machine: str = 'AMD64',
+                    platform_release: str = '', platform_version: str = '') -> dict:
+    """
+    Marker environment for the target interpreter (not the one running the installer). All variables of
+    PEP 508 are included. platform_release and platform_version of the target computer are not known
+    at install time and are empty unless given.
+    """
+    major_minor = '.'.join(python_version.split('.')[:2])
+    platform_system = dict(win32='Windows', linux='Linux', darwin='Darwin').get(sys_platform, sys_platform)
+    return dict(
+        python_version=major_minor,
+        python_full_version=python_version,
+        sys_platform=sys_platform,
+        platform_system=platform_system,
+        platform_machine=platform_machine,
+        platform_release=platform_release,
+        platform_version=platform_version,
+        os_name='nt' if sys_platform == 'win32' else 'posix',
+        implementation_name='cpython',
+        implementation_version=python_version,
+        platform_python_implementation='CPython',
+        extra='',
+    )
+
+
+_MARKER_TOKEN = re.compile(r'\s*(\(|\)|===|==|!=|<=|>=|~=|<|>|not in|in|and|or|"[^"]*"|\'[^\']*\'|[A-Za-z_.]+)')
+_VERSION_VARIABLES = ['python_version', 'python_full_version', 'implementation_version']
+
+
+def evaluate_marker(marker: str, environment: dict) -> bool:
+    tokens = []
+    position = 0
+    while position < len(marker):
+        match = _MARKER_TOKEN.match(marker, position)
+        if not match:
+            if not marker[position:].strip():
+                break
+            raise InvalidRequirement(f'Ogiltig markör: {marker}')
+        tokens.append(match.group(1))
+        position = match.end()
+    result, index = _parse_or(tokens, 0, environment)
+    if index != len(tokens):
+        raise InvalidRequirement(f'Ogiltig markör: {marker}')
+    return result
+
+
+def _parse_or(tokens, index, environment):
+    result, index = _parse_and(tokens, index, environment)
+    while index < len(tokens) and tokens[index] == 'or':
+        other, index = _parse_and(tokens, index + 1, environment)
+        result = result or other
+    return result, index
+
+
+def _parse_and(tokens, index, environment):
+    result, index = _parse_atom(tokens, index, environment)
+    while index < len(tokens) and tokens[index] == 'and':
+        other, index = _parse_atom(tokens, index + 1, environment)
+        result = result and other
+    return result, index
+
+
+def _parse_atom(tokens, index, environment):
+    if index < len(tokens) and tokens[index] == '(':
+        result, index = _parse_or(tokens, index + 1, environment)
+        if index >= len(tokens) or tokens[index] != ')':
+            raise InvalidRequirement(f'Parentes saknas i markör: {" ".join(tokens)}')
+        return result, index + 1
+    if len(tokens) < index + 3:
+        raise InvalidRequirement(f'Ofullständig markör: {" ".join(tokens)}')
+    left, operator, right = tokens[index:index + 3]
+    return _compare(left, operator, right, environment), index + 3
+
+
+def _get_value(token, environment):
+    if token[0] in '"\'':
+        return token[1:-1], None
+    if token not in environment:
+        raise InvalidRequirement(f'Okänd markörvariabel: {token}')
+    return environment[token], token
+
+
+def _compare(left, operator, right, environment):
+    left_value, left_name = _get_value(left, environment)
+    right_value, right_name = _get_value(right, environment)
+    if operator == 'in':
+        return left_value in right_value
+    if operator == 'not in':
+        return left_value not in right_value
+    if left_name == 'extra' or right_name == 'extra':
+        left_value, right_value = canonical_name(left_value), canonical_name(right_value)
+    if left_name in _VERSION_VARIABLES or right_name in _VERSION_VARIABLES:
+        # As in PEP 508 the right side is the specifier also when the variable is on the right, so
+        # "3.8" < python_version is true for python 3.11
+        try:
+            return SpecifierSet(f'{operator}{right_value}').contains(left_value, prereleases=True)
+        except InvalidRequirement:
+            pass
+    if operator == '==':
+        return left_value == right_value
+    if operator == '!=':
+        return left_value != right_value
+    if operator == '<':
+        return left_value < right_value
+    if operator == '<=':
+        return left_value <= right_value
+    if operator == '>':
+        return left_value > right_value
+    if operator == '>=':
+        return left_value >= right_value
+    raise InvalidRequirement(f'Operatorn {operator} stöds inte för {left} och {right}')
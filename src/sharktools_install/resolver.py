@@ -0,0 +1,243 @@
+"""
+Resolves a complete, pinned install set from the wheels in a local directory, without pip and without
+network access. Only wheel metadata is used (see wheel_metadata.py) and markers are evaluated for the
+target interpreter.
+
+The search picks the most constrained package first and tries its versions newest first. A set of pins
+that has failed once is remembered, so the backtracking never explores the same state twice.
+
+Results are cached on disk by ResolutionCache, keyed by a fingerprint of the requirements, the wheels in
+the directory and the target interpreter. Any change in these gives a new fingerprint.
+"""
+import hashlib
+import json
+import logging
+import os
+import pathlib
+
+from sharktools_install import wheel_metadata
+from sharktools_install.requirements import InvalidRequirement
+from sharktools_install.requirements import Requirement
+from sharktools_install.requirements import Version
+from sharktools_install.requirements import canonical_name
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIRECTORY = pathlib.Path.home() / '.sharktools_install' / 'resolutions'
+
+
+class ResolutionError(Exception):
+
+    def __init__(self, explanation: list[str]):
+        self.explanation = explanation
+        super().__init__('\n'.join(explanation))
+
+
+class Candidate:
+
+    def __init__(self, path: pathlib.Path, metadata: dict):
+        self.path = path
+        self.metadata = metadata
+        self.name = metadata['name']
+        self.key = canonical_name(self.name)
+        self.version = Version(metadata['version'])
+
+    def __repr__(self):
+        return f'Candidate({self.name} {self.version})'
+
+    def __str__(self):
+        return f'{self.name} {self.version}'
+
+
+class Resolver:
+
+    def __init__(self, wheels_metadata: dict[pathlib.Path, dict], python_version: str, environment: dict,
+                 platform_tag: str = 'win_amd64'):
+        self._environment = environment
+        self._candidates: dict[str, list[Candidate]] = {}
+        for path, meta in wheels_metadata.items():
+            if not wheel_metadata.is_compatible_wheel(meta, python_version, platform_tag=platform_tag):
+                continue
+            if not wheel_metadata.supports_python(meta, python_version):
+                continue
+            candidate = Candidate(pathlib.Path(path), meta)
+            self._candidates.setdefault(candidate.key, []).append(candidate)
+        for candidates in self._candidates.values():
+            candidates.sort(key=lambda c: c.version, reverse=True)
+
+        self._dependencies: dict[tuple[pathlib.Path, str], list[Requirement]] = {}
+        self._matching: dict[tuple[str, frozenset], list[Candidate]] = {}
+        self._failed: set[frozenset] = set()
+        self._roots: list[Requirement] = []
+        self._conflict: tuple[int, list[str]] = (-1, [])
+        self.nr_states = 0
+
+    def resolve(self, requirements: list[Requirement | str]) -> dict[str, Candidate]:
+        """Returns {canonical name: candidate}. Raises ResolutionError with an explanation"""
+        try:
+            self._roots = [Requirement(req) if isinstance(req, str) else req for req in requirements]
+        except InvalidRequirement as e:
+            raise ResolutionError([str(e)]) from e
+        self._failed = set()
+        self._conflict = (-1, [])
+        self.nr_states = 0
+        result = self._resolve({})
+        if result is None:
+            raise ResolutionError(self._conflict[1] or ['Kunde inte lösa beroenden'])
+        logger.debug(f'Resolved {len(result)} packages in {self.nr_states} states')
+        return result
+
+    def _get_dependencies(self, candidate: Candidate, extra: str) -> list[Requirement]:
+        key = (candidate.path, extra)
+        if key not in self._dependencies:
+            try:
+                self._dependencies[key] = wheel_metadata.get_requirements(
+                    candidate.metadata, self._environment, extras=[extra] if extra else (), strict=True)
+            except InvalidRequirement as e:
+                # Skipping the requirement would leave a dependency out of the install set
+                raise ResolutionError([f'Kan inte hantera ett beroende för {candidate}: {e}']) from e
+        return self._dependencies[key]
+
+    def _get_constraints(self, pins: dict[str, Candidate]) -> dict[str, list[tuple[Requirement, Candidate | None]]]:
+        """All requirements given by the roots and the pinned candidates, including requested extras"""
+        constraints = {}
+        handled = set()
+        work = [(req, None) for req in self._roots]
+        while work:
+            req, parent = work.pop()
+            constraints.setdefault(req.key, []).append((req, parent))
+            candidate = pins.get(req.key)
+            if not candidate:
+                continue
+            for extra in ['', *req.extras]:
+                if (req.key, extra) in handled:
+                    continue
+                handled.add((req.key, extra))
+                work.extend((dep, candidate) for dep in self._get_dependencies(candidate, extra))
+        return constraints
+
+    @staticmethod
+    def _satisfies(candidate: Candidate, constraints: list[tuple[Requirement, Candidate | None]]) -> bool:
+        return all(req.specifier.contains(candidate.version, prereleases=True) for req, _ in constraints)
+
+    def _get_matching(self, key: str, constraints: list[tuple[Requirement, Candidate | None]]) -> list[Candidate]:
+        memo_key = (key, frozenset(str(req.specifier) for req, _ in constraints))
+        if memo_key not in self._matching:
+            matching = [c for c in self._candidates.get(key, []) if self._satisfies(c, constraints)]
+            # Pre-releases only when nothing else matches, as pip does
+            self._matching[memo_key] = [c for c in matching if not c.version.is_prerelease] or matching
+        return self._matching[memo_key]
+
+    def _record_conflict(self, depth: int, key: str, constraints: list[tuple[Requirement, Candidate | None]],
+                         pinned: Candidate | None = None) -> None:
+        # The conflict found closest to a full solution is the most telling one
+        if depth <= self._conflict[0]:
+            return
+        lines = []
+        if pinned:
+            lines.append(f'{pinned} (vald) uppfyller inte alla krav:')
+        elif key not in self._candidates:
+            lines.append(f'{key} saknas i wheel-mappen (eller passar inte pythonversionen). Krävs av:')
+        else:
+            lines.append(f'Ingen version av {key} uppfyller alla krav:')
+        for req, parent in constraints:
+            lines.append(f'    {req} (från {parent or "valda plugins"})')
+        if key in self._candidates:
+            lines.append(f'    Tillgängliga versioner: {", ".join(str(c.version) for c in self._candidates[key])}')
+        self._conflict = (depth, lines)
+
+    def _resolve(self, pins: dict[str, Candidate]) -> dict[str, Candidate] | None:
+        state = frozenset((key, str(c.version)) for key, c in pins.items())
+        if state in self._failed:
+            return None
+        self.nr_states += 1
+        constraints = self._get_constraints(pins)
+        for key, candidate in pins.items():
+            if candidate not in self._get_matching(key, constraints[key]) \
+                    and not self._satisfies(candidate, constraints[key]):
+                self._record_conflict(len(pins), key, constraints[key], pinned=candidate)
+                self._failed.add(state)
+                return None
+
+        unpinned = [key for key in constraints if key not in pins]
+        if not unpinned:
+            return pins
+        options = {key: self._get_matching(key, constraints[key]) for key in unpinned}
+        key = min(unpinned, key=lambda k: (len(options[k]), k))
+        if not options[key]:
+            self._record_conflict(len(pins), key, constraints[key])
+            self._failed.add(state)
+            return None
+        for candidate in options[key]:
+            result = self._resolve({**pins, key: candidate})
+            if result is not None:
+                return result
+        self._failed.add(state)
+        return None
+
+
+def get_fingerprint(requirements: list[str], wheel_paths: list[pathlib.Path], python_version: str,
+                    environment: dict, platform_tag: str = 'win_amd64') -> str:
+    """
+    The wheels are identified by name, size and modification time (as in the wheel metadata cache),
+    so no wheel is opened to compute the fingerprint
+    """
+    wheels = []
+    for path in wheel_paths:
+        stat = os.stat(path)
+        wheels.append([str(path), stat.st_size, stat.st_mtime_ns])
+    data = dict(
+        requirements=sorted(requirements),
+        wheels=sorted(wheels),
+        python_version=python_version,
+        platform_tag=platform_tag,
+        environment=environment,
+    )
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class ResolutionCache:
+    """Resolved install sets stored as one json file per fingerprint. The oldest files are removed"""
+
+    def __init__(self, cache_directory: pathlib.Path | str | None = DEFAULT_CACHE_DIRECTORY, max_entries: int = 50):
+        self._cache_directory = pathlib.Path(cache_directory) if cache_directory else None
+        self._max_entries = max_entries
+
+    def _get_path(self, fingerprint: str) -> pathlib.Path:
+        return self._cache_directory / f'{fingerprint}.json'
+
+    def get(self, fingerprint: str) -> list[pathlib.Path] | None:
+        """Returns the wheel paths of the install set or None if not cached"""
+        if not self._cache_directory:
+            return None
+        path = self._get_path(fingerprint)
+        try:
+            data = json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+        paths = [pathlib.Path(item['path']) for item in data['install_set']]
+        if not all(path.exists() for path in paths):
+            return None
+        # Used entries are kept longest
+        os.utime(path)
+        return paths
+
+    def set(self, fingerprint: str, install_set: dict[str, Candidate]) -> None:
+        if not self._cache_directory:
+            return
+        data = dict(install_set=[dict(name=c.name, version=str(c.version), path=str(c.path))
+                                 for c in install_set.values()])
+        try:
+            self._cache_directory.mkdir(parents=True, exist_ok=True)
+            path = self._get_path(fingerprint)
+            tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+            tmp_path.write_text(json.dumps(data, indent=4), encoding='utf-8')
+            tmp_path.replace(path)
+            self._prune()
+        except OSError as e:
+            logger.warning(f'Could not save resolution: {e}')
+
+    def _prune(self) -> None:
+        paths = sorted(self._cache_directory.glob('*.json'), key=lambda p: p.stat().st_mtime)
+        for path in paths[:-self._max_entries]:
+            path.unlink(missing_ok=True)
@@ -0,0 +1,184 @@
+import concurrent.futures
+import logging
+import time
+from typing import Callable
+
+from sharktools_install.checkpoint import Checkpoints
+from sharktools_install.checkpoint import get_fingerprint
+
+logger = logging.getLogger(__name__)
+
+
+class StepError(Exception):
+    def __init__(self, step: str, exception: Exception):
+        self.step = step
+        self.exception = exception
+        super().__init__(f'Steget "{step}" misslyckades: {exception}')
+
+
+class Step:
+
+    def __init__(self, name: str, func: Callable, depends_on: list[str] | tuple[str, ...] = (),
+                 fingerprint: Callable[[], str] | None = None):
+        self.name = name
+        self.func = func
+        self.depends_on = tuple(depends_on)
+        self.fingerprint = fingerprint
+        self.checkpoint_key: str | None = None
+        self.reused = False
+        self.start_time: float | None = None
+        self.end_time: float | None = None
+
+    def __repr__(self):
+        return f'Step({self.name!r}, depends_on={self.depends_on})'
+
+    @property
+    def duration(self) -> float:
+        if self.start_time is None or self.end_time is None:
+            return 0.
+        return self.end_time - self.start_time
+
+    def run(self):
+        self.start_time = time.perf_counter()
+        try:
+            return self.func()
+        finally:
+            self.end_time = time.perf_counter()
+
+
+class StepScheduler:
+    """
+    Runs steps on a worker pool as soon as all the steps they depend on are done.
+
+    With checkpoints, steps given a fingerprint function are skipped if they completed earlier with the
+    same fingerprint. The fingerprint of a step includes the fingerprints of the steps it depends on,
+    so a step that reruns makes the steps depending on it rerun too.
+    """
+
+    def __init__(self, max_workers: int = 4, checkpoints: Checkpoints | None = None):
+        self._max_workers = max_workers
+        self._checkpoints = checkpoints
+        self._steps: dict[str, Step] = {}
+        self._start_time: float | None = None
+        self._end_time: float | None = None
+
+    def add_step(self, name: str, func: Callable, depends_on: list[str] | tuple[str, ...] = (),
+                 fingerprint: Callable[[], str] | None = None) -> None:
+        if name in self._steps:
+            raise KeyError(f'Steget finns redan: {name}')
+        self._steps[name] = Step(name, func, depends_on=depends_on, fingerprint=fingerprint)
+
+    @property
+    def steps(self) -> list[Step]:
+        return list(self._steps.values())
+
+    @property
+    def duration(self) -> float:
+        if self._start_time is None or self._end_time is None:
+            return 0.
+        return self._end_time - self._start_time
+
+    @property
+    def reused_steps(self) -> list[Step]:
+        return [step for step in self._steps.values() if step.reused]
+
+    def _run_step(self, step: Step):
+        """Called when all dependencies are done, so their checkpoint keys are known"""
+        if self._checkpoints and step.fingerprint:
+            step.checkpoint_key = get_fingerprint(
+                step.fingerprint(),
+                [self._steps[dep].checkpoint_key for dep in step.depends_on])
+            if self._checkpoints.is_valid(step.name, step.checkpoint_key):
+                step.reused = True
+                return
+        result = step.run()
+        if self._checkpoints and step.checkpoint_key:
+            self._checkpoints.save(step.name, step.checkpoint_key)
+        return result
+
+    def run(self) -> None:
+        self._check_dependencies()
+        remaining = {name: set(step.depends_on) for name, step in self._steps.items()}
+        running = {}
+        self._start_time = time.perf_counter()
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+                while remaining or running:
+                    for name in [name for name, deps in remaining.items() if not deps]:
+                        remaining.pop(name)
+                        logger.info(f'Starting step: {name}', extra=dict(step=name, event='start'))
+                        running[executor.submit(self._run_step, self._steps[name])] = name
+                    done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in done:
+                        name = running.pop(future)
+                        exception = future.exception()
+                        if exception:
+                            logger.error(f'Step failed: {name}: {exception}',
+                                         extra=dict(step=name, event='failed',
+                                                    duration=self._steps[name].duration))
+                            # Let already started steps finish but don't start any new ones
+                            remaining.clear()
+                            concurrent.futures.wait(running)
+                            raise StepError(name, exception) from exception
+                        if self._steps[name].reused:
+                            logger.info(f'Step reused from checkpoint: {name}', extra=dict(step=name, event='reused'))
+                        else:
+                            logger.info(f'Step done: {name} ({self._steps[name].duration:.2f} s)',
+                                        extra=dict(step=name, event='done', duration=self._steps[name].duration))
+                        for deps in remaining.values():
+                            deps.discard(name)
+        finally:
+            self._end_time = time.perf_counter()
+
+    def get_critical_path(self) -> list[Step]:
+        """Returns the chain of dependent steps with the longest total duration"""
+        longest: dict[str, tuple[float, list[str]]] = {}
+        for name in self._get_topological_order():
+            step = self._steps[name]
+            best = (0., [])
+            for dep in step.depends_on:
+                if longest[dep][0] > best[0]:
+                    best = longest[dep]
+            longest[name] = (best[0] + step.duration, best[1] + [name])
+        if not longest:
+            return []
+        _, path = max(longest.values(), key=lambda item: item[0])
+        return [self._steps[name] for name in path]
+
+    def get_report(self) -> list[str]:
+        lines = [f'Total tid för installationen: {self.duration:.1f} s']
+        for step in self.steps:
+            if step.reused:
+                lines.append(f'    {step.name}: återanvänt från tidigare försök')
+            elif step.start_time is None:
+                # A step before it failed
+                lines.append(f'    {step.name}: kördes inte')
+            else:
+                lines.append(f'    {step.name}: {step.duration:.1f} s')
+        if self.reused_steps:
+            lines.append(f'Återanvända steg: {", ".join(step.name for step in self.reused_steps)}')
+        critical_path = self.get_critical_path()
+        total = sum(step.duration for step in critical_path)
+        lines.append(f'Kritisk väg ({total:.1f} s): {" -> ".join(step.name for step in critical_path)}')
+        return lines
+
+    def _check_dependencies(self) -> None:
+        for step in self._steps.values():
+            for dep in step.depends_on:
+                if dep not in self._steps:
+                    raise KeyError(f'Steget "{step.name}" beror på okänt steg: {dep}')
+        self._get_topological_order()
+
+    def _get_topological_order(self) -> list[str]:
+        order = []
+        remaining = {name: set(step.depends_on) for name, step in self._steps.items()}
+        while remaining:
+            ready = [name for name, deps in remaining.items() if not deps]
+            if not ready:
+                raise ValueError(f'Cirkulärt beroende mellan stegen: {", ".join(remaining)}')
+            for name in ready:
+                remaining.pop(name)
+                order.append(name)
+                for deps in remaining.values():
+                    deps.discard(name)
+        return order
@@ -0,0 +1,56 @@
+import re
+
+
+def version_key(version: str) -> tuple:
+    """Sort key that puts 1.10 after 1.9"""
+    return tuple((0, int(part), '') if part.isdigit() else (1, 0, part) for part in re.split(r'[.\-_+]', version))
+
+
+class PluginSelection:
+    """Plugins with available versions and the version selected for installation (None = don't install)"""
+
+    def __init__(self):
+        self._versions: dict[str, list[str]] = {}
+        self._selected: dict[str, str | None] = {}
+
+    def set_plugins(self, versions: dict[str, list[str]]) -> None:
+        self._versions = {plugin: sorted(vers, key=version_key, reverse=True) for plugin, vers in versions.items()}
+        self._selected = {plugin: self._selected.get(plugin) for plugin in self._versions
+                          if self._selected.get(plugin) in self._versions[plugin]}
+
+    @property
+    def plugins(self) -> list[str]:
+        return sorted(self._versions)
+
+    def get_versions(self, plugin: str) -> list[str]:
+        """Returns available versions, newest first"""
+        return list(self._versions[plugin])
+
+    def get_latest_version(self, plugin: str) -> str | None:
+        versions = self._versions[plugin]
+        return versions[0] if versions else None
+
+    def get_selected_version(self, plugin: str) -> str | None:
+        return self._selected.get(plugin)
+
+    def select(self, plugin: str, version: str | None = None, latest: bool = False) -> None:
+        if plugin not in self._versions:
+            raise KeyError(f'Ogilltig plugin: {plugin}')
+        if latest:
+            version = self.get_latest_version(plugin)
+        if version is None:
+            self._selected.pop(plugin, None)
+            return
+        if version not in self._versions[plugin]:
+            raise KeyError(f'Ogilltig version för {plugin}: {version}')
+        self._selected[plugin] = version
+
+    def filter(self, text: str = '') -> list[str]:
+        text = text.strip().lower()
+        if not text:
+            return self.plugins
+        return [plugin for plugin in self.plugins if text in plugin.lower()]
+
+    @property
+    def selected(self) -> dict[str, str]:
+        return {plugin: version for plugin, version in self._selected.items() if version}
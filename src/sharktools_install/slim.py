@@ -0,0 +1,115 @@
+import fnmatch
+import logging
+import os
+import pathlib
+import shutil
+
+logger = logging.getLogger(__name__)
+
+# Matched against paths relative to site-packages, using / as separator
+DEFAULT_DIRECTORY_PATTERNS = [
+    '*/tests',
+    '*/test',
+    '*/examples',
+    '*/docs',
+]
+
+DEFAULT_FILE_PATTERNS = [
+    '*.pyi',
+    '*/py.typed',
+]
+
+
+class SlimResult:
+
+    def __init__(self):
+        self.removed: list[tuple[str, int, int]] = []
+        self.files_before = 0
+        self.bytes_before = 0
+
+    @property
+    def files_removed(self) -> int:
+        return sum(nr_files for _, nr_files, _ in self.removed)
+
+    @property
+    def bytes_removed(self) -> int:
+        return sum(nr_bytes for _, _, nr_bytes in self.removed)
+
+    def get_report(self) -> list[str]:
+        if not self.files_before:
+            return ['Bantning av venv: inga filer hittades']
+        file_share = self.files_removed / self.files_before * 100
+        byte_share = self.bytes_removed / self.bytes_before * 100 if self.bytes_before else 0
+        return [f'Bantning av venv: {self.files_removed} av {self.files_before} filer borttagna ({file_share:.0f} %), '
+                f'{self.bytes_removed / 1e6:.1f} av {self.bytes_before / 1e6:.1f} MB ({byte_share:.0f} %)']
+
+
+def _get_tree_size(path: pathlib.Path) -> tuple[int, int]:
+    nr_files = 0
+    nr_bytes = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            nr_files += 1
+            try:
+                nr_bytes += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return nr_files, nr_bytes
+
+
+def slim_site_packages(site_packages: pathlib.Path | str,
+                       directory_patterns: list[str] | None = None,
+                       file_patterns: list[str] | None = None,
+                       python_tag: str | None = None) -> SlimResult:
+    """
+    Removes directories and files in site_packages matching the given patterns.
+    If python_tag is given (ex. "cpython-311") compiled files for other python versions are removed as well.
+    pip and the .dist-info directories are never touched so that packages still can be uninstalled.
+    """
+    site_packages = pathlib.Path(site_packages)
+    if directory_patterns is None:
+        directory_patterns = DEFAULT_DIRECTORY_PATTERNS
+    if file_patterns is None:
+        file_patterns = DEFAULT_FILE_PATTERNS
+
+    result = SlimResult()
+    result.files_before, result.bytes_before = _get_tree_size(site_packages)
+
+    for root, dirs, files in os.walk(site_packages):
+        root_path = pathlib.Path(root)
+        rel_root = root_path.relative_to(site_packages).as_posix()
+        if rel_root == 'pip' or rel_root.startswith('pip/'):
+            dirs[:] = []
+            continue
+        for name in list(dirs):
+            if name.endswith('.dist-info'):
+                dirs.remove(name)
+                continue
+            rel_path = f'{rel_root}/{name}'
+            if not any(fnmatch.fnmatch(rel_path, pattern) for pattern in directory_patterns):
+                continue
+            path = root_path / name
+            nr_files, nr_bytes = _get_tree_size(path)
+            shutil.rmtree(path, ignore_errors=True)
+            result.removed.append((rel_path, nr_files, nr_bytes))
+            dirs.remove(name)
+        for name in files:
+            rel_path = f'{rel_root}/{name}'
+            if not (any(fnmatch.fnmatch(rel_path, pattern) for pattern in file_patterns)
+                    or _is_pyc_for_other_python(root_path, name, python_tag)):
+                continue
+            path = root_path / name
+            try:
+                nr_bytes = path.stat().st_size
+                path.unlink()
+            except OSError:
+                logger.warning(f'Kunde inte ta bort fil: {path}')
+                continue
+            result.removed.append((rel_path, 1, nr_bytes))
+    return result
+
+
+def _is_pyc_for_other_python(directory: pathlib.Path, name: str, python_tag: str | None) -> bool:
+    if not python_tag or directory.name != '__pycache__' or not name.endswith('.pyc'):
+        return False
+    return f'.{python_tag}.' not in name
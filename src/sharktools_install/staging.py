@@ -0,0 +1,139 @@
+"""
+Installations are built in a hidden staging directory under the install root and renamed to their dated
+name only when the installation has succeeded. A failed or cancelled installation never shows up as an
+installation and an installation that is in use is never written to.
+
+A failed installation is renamed to .resumable_* and can be claimed by the next installation to reuse its
+completed steps. Claiming is a rename, so two installations can never claim the same directory.
+"""
+import datetime
+import errno
+import logging
+import pathlib
+import tempfile
+import time
+import uuid
+from typing import Callable
+
+from sharktools_install import bundle
+from sharktools_install import housekeeping
+
+logger = logging.getLogger(__name__)
+
+STAGING_PREFIX = '.staging_'
+RESUMABLE_PREFIX = '.resumable_'
+# Text files that may hold the absolute path of the directory they were created in
+RELOCATE_PATTERNS = ['*', '_install/*', 'venv/*', 'venv/Scripts/*', 'venv/Lib/site-packages/*.pth']
+# Staging and resumable directories older than this are left from crashed or abandoned installations
+STALE_AGE = datetime.timedelta(days=1)
+# Files in a new venv can be held open for a while (ex. by an antivirus scan) so the rename is retried
+RENAME_ATTEMPTS = 5
+RENAME_RETRY_DELAY = 1.
+
+
+def create_staging_directory(root_directory: pathlib.Path | str) -> pathlib.Path:
+    """mkdtemp gives a unique directory also when several installations run at once"""
+    return pathlib.Path(tempfile.mkdtemp(prefix=STAGING_PREFIX, dir=root_directory))
+
+
+def get_install_names(date: datetime.datetime) -> list[str]:
+    """
+    Names to try in order. The first installation of the day gets the plain dated name. The numbers are
+    zero padded so the names sort in the order they were created
+    """
+    name = f"SHARKtools_{date.strftime('%Y%m%d')}"
+    return [name, f"{name}_{date.strftime('%H%M%S')}", *(f"{name}_{date.strftime('%H%M%S')}_{nr:02d}"
+                                                        for nr in range(2, 100))]
+
+
+def _is_name_taken(error: OSError) -> bool:
+    # Renaming to an existing non-empty directory gives ENOTEMPTY on linux
+    return isinstance(error, (FileExistsError, IsADirectoryError)) or error.errno in (errno.EEXIST, errno.ENOTEMPTY)
+
+
+def _rename(source: pathlib.Path, target: pathlib.Path) -> None:
+    """Renames source to target. Errors other than that target is taken are retried"""
+    for attempt in range(1, RENAME_ATTEMPTS + 1):
+        try:
+            source.rename(target)
+            return
+        except OSError as e:
+            if _is_name_taken(e) or attempt == RENAME_ATTEMPTS:
+                raise
+            logger.warning(f'Could not rename {source} to {target.name} (attempt {attempt}): {e}')
+            time.sleep(RENAME_RETRY_DELAY * attempt)
+
+
+def promote(staging_directory: pathlib.Path, date: datetime.datetime | None = None) -> pathlib.Path:
+    """
+    Renames the staging directory to a free dated name in the same directory and fixes absolute paths.
+    The rename is atomic, so an existing directory is never overwritten even if another installation
+    finishes at the same time. Other rename errors are retried and then raised, the staging directory is
+    left as it is.
+    """
+    date = date or datetime.datetime.now()
+    for name in get_install_names(date):
+        target = staging_directory.parent / name
+        if target.exists():
+            continue
+        try:
+            _rename(staging_directory, target)
+        except OSError as e:
+            if _is_name_taken(e):
+                # Taken between the check and the rename
+                continue
+            raise
+        rewritten = bundle.relocate(target, staging_directory, RELOCATE_PATTERNS)
+        logger.info(f'Promoted {staging_directory.name} to {target} ({len(rewritten)} files relocated)')
+        return target
+    raise FileExistsError(f'Hittade inget ledigt namn för installationen i {staging_directory.parent}')
+
+
+def mark_resumable(staging_directory: pathlib.Path) -> pathlib.Path:
+    target = staging_directory.parent / f'{RESUMABLE_PREFIX}{staging_directory.name.removeprefix(STAGING_PREFIX)}'
+    staging_directory.rename(target)
+    return target
+
+
+def _get_staging_name(resumable_directory: pathlib.Path) -> pathlib.Path:
+    """The staging directory that mark_resumable renamed to resumable_directory"""
+    return resumable_directory.parent / f'{STAGING_PREFIX}{resumable_directory.name.removeprefix(RESUMABLE_PREFIX)}'
+
+
+def claim_resumable(root_directory: pathlib.Path | str,
+                    accept: Callable[[pathlib.Path], bool]) -> pathlib.Path | None:
+    """
+    Renames the newest resumable directory accepted by accept to a new staging directory and returns it.
+    Returns None if there is nothing to resume.
+    """
+    root_directory = pathlib.Path(root_directory)
+    candidates = [path for path in root_directory.iterdir()
+                  if path.is_dir() and path.name.startswith(RESUMABLE_PREFIX)]
+    for path in sorted(candidates, key=lambda p: p.stat().st_mtime, reverse=True):
+        if not accept(path):
+            continue
+        target = root_directory / f'{STAGING_PREFIX}{uuid.uuid4().hex[:8]}'
+        try:
+            path.rename(target)
+        except OSError:
+            # Claimed by another installation
+            continue
+        # Paths in the files still point to the staging directory the installation failed in
+        bundle.relocate(target, _get_staging_name(path), RELOCATE_PATTERNS)
+        logger.info(f'Resuming installation in {path.name}')
+        return target
+    return None
+
+
+def get_stale_staging_directories(root_directory: pathlib.Path | str) -> list[pathlib.Path]:
+    """Staging directories left from installations that crashed or were never resumed"""
+    limit = time.time() - STALE_AGE.total_seconds()
+    return [path for path in pathlib.Path(root_directory).iterdir()
+            if path.is_dir() and path.name.startswith((STAGING_PREFIX, RESUMABLE_PREFIX))
+            and path.stat().st_mtime < limit]
+
+
+def remove_stale_staging_directories(root_directory: pathlib.Path | str, background: bool = True) -> list[pathlib.Path]:
+    stale = get_stale_staging_directories(root_directory)
+    housekeeping.remove_installs(stale, background=background)
+    return stale
@@ -0,0 +1,233 @@
+import email.parser
+import json
+import logging
+import os
+import pathlib
+import threading
+import zipfile
+
+from sharktools_install.requirements import InvalidRequirement
+from sharktools_install.requirements import Requirement
+from sharktools_install.requirements import SpecifierSet
+from sharktools_install.requirements import Version
+from sharktools_install.requirements import canonical_name
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_FILE_PATH = pathlib.Path.home() / '.sharktools_install' / 'wheel_metadata.json'
+
+
+class InvalidWheel(ValueError):
+    """The file can't be read as a wheel, ex. a partial download"""
+
+
+def parse_wheel_file_name(path: pathlib.Path | str) -> dict:
+    """name-version(-build)?-python-abi-platform.whl"""
+    parts = pathlib.Path(path).stem.split('-')
+    if len(parts) not in (5, 6):
+        raise ValueError(f'Ogiltigt namn på wheel-fil: {path}')
+    return dict(name=parts[0], version=parts[1], python_tag=parts[-3], abi_tag=parts[-2], platform_tag=parts[-1])
+
+
+def _get_dist_info_directory(names: list[str], path) -> str:
+    for name in names:
+        top = name.split('/')[0]
+        if top.endswith('.dist-info'):
+            return top
+    raise ValueError(f'Ingen .dist-info i {path}')
+
+
+def _get_top_level_from_names(names: list[str]) -> list[str]:
+    modules = []
+    for name in names:
+        top = name.split('/')[0]
+        if top.endswith(('.dist-info', '.data')):
+            continue
+        if '/' not in name:
+            if not name.endswith('.py'):
+                continue
+            top = name[:-3]
+        if top not in modules:
+            modules.append(top)
+    return modules
+
+
+def parse_metadata(text: str) -> dict:
+    message = email.parser.HeaderParser().parsestr(text)
+    return dict(
+        name=message.get('Name'),
+        version=message.get('Version'),
+        summary=message.get('Summary') or '',
+        requires_python=message.get('Requires-Python'),
+        requires_dist=message.get_all('Requires-Dist') or [],
+    )
+
+
+def read_wheel_metadata(path: pathlib.Path | str) -> dict:
+    """
+    Reads METADATA and top_level.txt of the wheel. zipfile only reads the central directory at the end of
+    the file and then seeks to the members asked for, so nothing is extracted.
+    """
+    try:
+        with zipfile.ZipFile(path) as zf:
+            names = zf.namelist()
+            dist_info = _get_dist_info_directory(names, path)
+            data = parse_metadata(zf.read(f'{dist_info}/METADATA').decode('utf-8'))
+            try:
+                top_level = zf.read(f'{dist_info}/top_level.txt').decode('utf-8')
+                data['top_level'] = [line.strip() for line in top_level.splitlines() if line.strip()]
+            except KeyError:
+                data['top_level'] = _get_top_level_from_names(names)
+        data.update({f'wheel_{key}': value for key, value in parse_wheel_file_name(path).items()
+                     if key in ('python_tag', 'abi_tag', 'platform_tag')})
+    except (zipfile.BadZipFile, ValueError, KeyError, OSError) as e:
+        raise InvalidWheel(f'Kan inte läsa wheel-filen {pathlib.Path(path).name}: {e}') from e
+    return data
+
+
+class WheelMetadataCache:
+    """
+    Metadata of wheels cached in a json file. A wheel file is identified by name, size and modification time,
+    so a cached wheel is looked up without opening it. The entries are kept in order of use and the least
+    recently used are dropped when there are more than max_entries.
+    """
+
+    def __init__(self, cache_file_path: pathlib.Path | str | None = DEFAULT_CACHE_FILE_PATH,
+                 max_entries: int = 5000):
+        self._cache_file_path = pathlib.Path(cache_file_path) if cache_file_path else None
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._data: dict[str, dict] = {}
+        self._changed = False
+        self._load()
+
+    @staticmethod
+    def _get_key(path: pathlib.Path) -> str:
+        stat = path.stat()
+        return f'{path.name}:{stat.st_size}:{stat.st_mtime_ns}'
+
+    def get(self, path: pathlib.Path | str) -> dict:
+        """Raises InvalidWheel if the wheel can't be read"""
+        path = pathlib.Path(path)
+        try:
+            key = self._get_key(path)
+        except OSError as e:
+            raise InvalidWheel(f'Kan inte läsa wheel-filen {path.name}: {e}') from e
+        with self._lock:
+            if key in self._data:
+                # Moved last as the most recently used
+                data = self._data[key] = self._data.pop(key)
+                return data
+        data = read_wheel_metadata(path)
+        with self._lock:
+            self._data[key] = data
+            self._changed = True
+        return data
+
+    def get_many(self, paths: list[pathlib.Path]) -> dict[pathlib.Path, dict]:
+        """Wheels that can't be read are logged and left out"""
+        result = {}
+        for path in paths:
+            try:
+                result[path] = self.get(path)
+            except InvalidWheel as e:
+                logger.warning(str(e))
+        self.save()
+        return result
+
+    def save(self) -> None:
+        if not self._cache_file_path or not self._changed:
+            return
+        with self._lock:
+            for key in list(self._data)[:-self._max_entries]:
+                del self._data[key]
+            content = json.dumps(self._data)
+            self._changed = False
+        try:
+            self._cache_file_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self._cache_file_path.with_suffix(f'.{os.getpid()}.tmp')
+            tmp_path.write_text(content, encoding='utf-8')
+            tmp_path.replace(self._cache_file_path)
+        except OSError as e:
+            logger.warning(f'Could not save wheel metadata cache: {e}')
+
+    def _load(self) -> None:
+        if not self._cache_file_path or not self._cache_file_path.exists():
+            return
+        try:
+            self._data = json.loads(self._cache_file_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            logger.warning(f'Could not read wheel metadata cache: {self._cache_file_path}')
+
+
+def get_wheel_metadata(path: pathlib.Path | str, cache: WheelMetadataCache | None = None) -> dict:
+    if cache:
+        return cache.get(path)
+    return read_wheel_metadata(path)
+
+
+def get_requirements(metadata: dict, environment: dict, extras: list[str] | tuple[str, ...] = (),
+                     strict: bool = False) -> list[Requirement]:
+    """
+    Returns the requirements of the wheel that apply to the given marker environment. Requirements that
+    can't be handled (ex. URL requirements or unknown markers) are skipped with a warning, or raise
+    InvalidRequirement if strict.
+    """
+    requirements = []
+    for text in metadata['requires_dist']:
+        try:
+            requirement = Requirement(text)
+            applies = requirement.applies_to(environment, extras=extras)
+        except InvalidRequirement as e:
+            if strict:
+                raise
+            logger.warning(f'{metadata["name"]}: {e}')
+            continue
+        if applies:
+            requirements.append(requirement)
+    return requirements
+
+
+def supports_python(metadata: dict, python_version: str) -> bool:
+    if not metadata.get('requires_python'):
+        return True
+    return SpecifierSet(metadata['requires_python']).contains(python_version, prereleases=True)
+
+
+def get_dependency_closure(names: list[str], wheels_metadata: list[dict], environment: dict) -> dict[str, list[str]]:
+    """
+    Returns {package: requirement strings} for the given packages and everything they depend on, as far as
+    the metadata of the given wheels tells. For packages with several wheels the newest version is used.
+    Packages without a wheel are included with an empty list.
+    """
+    newest = {}
+    for meta in wheels_metadata:
+        key = canonical_name(meta['name'])
+        if key not in newest or Version(meta['version']) > Version(newest[key]['version']):
+            newest[key] = meta
+    closure = {}
+    to_visit = [canonical_name(name) for name in names]
+    while to_visit:
+        key = to_visit.pop()
+        if key in closure:
+            continue
+        meta = newest.get(key)
+        requirements = get_requirements(meta, environment) if meta else []
+        closure[key] = [str(requirement) for requirement in requirements]
+        to_visit.extend(requirement.key for requirement in requirements)
+    return closure
+
+
+def is_compatible_wheel(metadata: dict, python_version: str, platform_tag: str = 'win_amd64') -> bool:
+    """Checks the tags in the wheel file name against the target interpreter"""
+    major, minor = python_version.split('.')[:2]
+    python_tags = {f'py{major}', f'py{major}{minor}', f'cp{major}{minor}'}
+    abi_tags = {'none', f'cp{major}{minor}'}
+    for tag in metadata['wheel_abi_tag'].split('.'):
+        # abi3 wheels work for all later python versions
+        if tag == 'abi3':
+            abi_tags.add(tag)
+            python_tags.update(f'cp{major}{nr}' for nr in range(2, int(minor) + 1))
+    return (bool(python_tags & set(metadata['wheel_python_tag'].split('.')))
+            and bool(abi_tags & set(metadata['wheel_abi_tag'].split('.')))
+            and bool({'any', platform_tag} & set(metadata['wheel_platform_tag'].split('.'))))
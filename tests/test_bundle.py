@@ -0,0 +1,85 @@
+import io
+import json
+import zipfile
+
+import pytest
+
+from sharktools_install import bundle
+
+
+def create_install(directory):
+    scripts = directory / 'venv' / 'Scripts'
+    scripts.mkdir(parents=True)
+    (scripts / 'activate').write_bytes(f'VIRTUAL_ENV="{directory}/venv"\nexport VIRTUAL_ENV\n'.encode())
+    (scripts / 'activate.bat').write_bytes(f'set VIRTUAL_ENV={directory}\\venv\r\n'.encode())
+    (directory / 'data.bin').write_bytes(b'\x00\x01')
+    return directory
+
+
+def test_export_and_unpack(tmp_path):
+    source = create_install(tmp_path / 'source')
+    archive = bundle.export_bundle(source, tmp_path / 'bundle.zip')
+    target = bundle.unpack_bundle(archive, tmp_path / 'target', workers=2)
+    assert (target / 'data.bin').read_bytes() == b'\x00\x01'
+    assert (target / 'venv' / 'Scripts' / 'activate').read_bytes() == \
+        f'VIRTUAL_ENV="{target.as_posix()}/venv"\nexport VIRTUAL_ENV\n'.encode()
+
+
+def test_relocate_keeps_line_endings(tmp_path):
+    old = create_install(tmp_path / 'old')
+    new = tmp_path / 'new'
+    old.rename(new)
+    rewritten = bundle.relocate(new, old, ['venv/Scripts/*'])
+    assert len(rewritten) == 2
+    assert (new / 'venv' / 'Scripts' / 'activate').read_bytes() == \
+        f'VIRTUAL_ENV="{new}/venv"\nexport VIRTUAL_ENV\n'.encode()
+    assert (new / 'venv' / 'Scripts' / 'activate.bat').read_bytes().endswith(b'\\venv\r\n')
+
+
+@pytest.mark.parametrize('name', ['../outside.txt', 'venv/../../outside.txt', '/outside.txt', '..\\outside.txt',
+                                  'C:/outside.txt', 'C:outside.txt'])
+def test_unpack_rejects_paths_outside_the_target(tmp_path, name):
+    archive = tmp_path / 'bundle.zip'
+    with zipfile.ZipFile(archive, 'w') as zf:
+        zf.writestr(name, 'x')
+        zf.writestr(bundle.MANIFEST_NAME, json.dumps(dict(source_variants=[], fixup_files=[])))
+    with pytest.raises(ValueError):
+        bundle.unpack_bundle(archive, tmp_path / 'target')
+    assert not (tmp_path / 'outside.txt').exists()
+
+
+def test_unpack_rejects_fixup_files_outside_the_target(tmp_path):
+    archive = tmp_path / 'bundle.zip'
+    with zipfile.ZipFile(archive, 'w') as zf:
+        zf.writestr('file.txt', 'x')
+        zf.writestr(bundle.MANIFEST_NAME, json.dumps(dict(source_variants=['/old'], fixup_files=['../outside.txt'])))
+    with pytest.raises(ValueError):
+        bundle.unpack_bundle(archive, tmp_path / 'target')
+
+
+def create_launcher(path, python_path):
+    """Written as distlib writes the .exe launchers of pip and console scripts"""
+    stream = io.BytesIO()
+    with zipfile.ZipFile(stream, 'w') as zf:
+        zf.writestr('__main__.py', 'import sys\nfrom pip._internal.cli.main import main\nsys.exit(main())\n')
+    path.write_bytes(b'MZ launcher #! stub\x00' + f'#!{python_path}\n'.encode() + stream.getvalue())
+    return path
+
+
+def test_relocate_rewrites_launcher_shebang(tmp_path):
+    old = create_install(tmp_path / '.staging_abc')
+    create_launcher(old / 'venv' / 'Scripts' / 'pip.exe', f'{old}\\venv\\Scripts\\python.exe')
+    new = tmp_path / 'SHARKtools_20240612'
+    old.rename(new)
+    bundle.relocate(new, old, ['venv/Scripts/*'])
+    data = (new / 'venv' / 'Scripts' / 'pip.exe').read_bytes()
+    assert data.startswith(b'MZ launcher #! stub\x00' + f'#!{new}\\venv\\Scripts\\python.exe\n'.encode())
+    assert str(old).encode() not in data
+    with zipfile.ZipFile(new / 'venv' / 'Scripts' / 'pip.exe') as zf:
+        assert zf.read('__main__.py').startswith(b'import sys')
+
+
+def test_exe_without_shebang_is_left_as_it_is(tmp_path):
+    path = tmp_path / 'other.exe'
+    path.write_bytes(f'MZ {tmp_path}'.encode())
+    assert not bundle._contains_path(path, [str(tmp_path)])
@@ -0,0 +1,47 @@
+from sharktools_install import checkpoint
+
+
+def test_checkpoints_are_kept_for_the_same_install_key(tmp_path):
+    path = tmp_path / checkpoint.CHECKPOINT_FILE_NAME
+    checkpoints = checkpoint.Checkpoints(path)
+    checkpoints.install_key = 'a'
+    checkpoints.save('venv', 'fingerprint')
+
+    checkpoints = checkpoint.Checkpoints(path)
+    checkpoints.install_key = 'a'
+    assert checkpoints.is_valid('venv', 'fingerprint')
+    assert not checkpoints.is_valid('venv', 'other')
+    assert not checkpoints.is_valid('install', 'fingerprint')
+
+
+def test_changed_install_key_clears_checkpoints(tmp_path):
+    path = tmp_path / checkpoint.CHECKPOINT_FILE_NAME
+    checkpoints = checkpoint.Checkpoints(path)
+    checkpoints.install_key = 'a'
+    checkpoints.save('venv', 'fingerprint')
+
+    checkpoints = checkpoint.Checkpoints(path)
+    checkpoints.install_key = 'b'
+    assert not checkpoints.is_valid('venv', 'fingerprint')
+    assert checkpoint.read_install_key(path) == 'b'
+    assert not checkpoint.Checkpoints(path).is_valid('venv', 'fingerprint')
+
+
+def test_unreadable_checkpoints_are_ignored(tmp_path):
+    path = tmp_path / checkpoint.CHECKPOINT_FILE_NAME
+    path.write_text('{', encoding='utf-8')
+    checkpoints = checkpoint.Checkpoints(path)
+    assert checkpoints.install_key is None
+    assert not checkpoints.is_valid('venv', 'fingerprint')
+    assert checkpoint.read_install_key(path) is None
+    assert checkpoint.read_install_key(tmp_path / 'missing.json') is None
+
+
+def test_file_fingerprint_changes_with_the_file(tmp_path):
+    path = tmp_path / 'requirements.txt'
+    missing = checkpoint.get_file_fingerprint(path)
+    path.write_text('numpy')
+    written = checkpoint.get_file_fingerprint(path)
+    assert written != missing
+    path.write_text('pandas')
+    assert checkpoint.get_file_fingerprint(path) != written
@@ -0,0 +1,45 @@
+import pytest
+
+from sharktools_install import current
+
+
+def create_install(root, name):
+    path = root / name
+    path.mkdir(parents=True)
+    (path / current.LAUNCHER_NAME).write_text('')
+    return path
+
+
+def test_switch_and_rollback(tmp_path):
+    first = create_install(tmp_path, 'SHARKtools_20240610')
+    second = create_install(tmp_path, 'SHARKtools_20240612')
+    current.set_current(tmp_path, first)
+    # A name is enough, as on the command line
+    current.set_current(tmp_path, second.name)
+    assert current.get_current(tmp_path) == second
+    assert current.get_previous(tmp_path) == first
+    assert current.rollback(tmp_path) == first
+    assert current.get_current(tmp_path) == first
+    assert current.get_previous(tmp_path) == second
+
+
+@pytest.mark.parametrize('rel_path', ['../other/SHARKtools_20240610', '..', 'SHARKtools_20240610/..'])
+def test_installation_outside_root_is_rejected(tmp_path, rel_path):
+    root = tmp_path / 'root'
+    create_install(root, 'SHARKtools_20240610')
+    create_install(tmp_path / 'other', 'SHARKtools_20240610')
+    (tmp_path / current.LAUNCHER_NAME).write_text('')
+    with pytest.raises(ValueError):
+        current.set_current(root, root / rel_path)
+    assert current.get_current(root) is None
+
+
+def test_directory_without_installation_is_rejected(tmp_path):
+    (tmp_path / 'SHARKtools_20240610').mkdir()
+    with pytest.raises(NotADirectoryError):
+        current.set_current(tmp_path, 'SHARKtools_20240610')
+
+
+def test_rollback_without_previous_installation(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        current.rollback(tmp_path)
@@ -0,0 +1,44 @@
+import json
+
+from sharktools_install import diff
+from sharktools_install import manifest
+
+
+def create_install(directory, created, plugin_version='1.0'):
+    site_packages = directory / 'venv' / 'Lib' / 'site-packages'
+    dist_info = site_packages / 'plug-1.0.dist-info'
+    dist_info.mkdir(parents=True)
+    (site_packages / 'plug.py').write_text(f'VERSION = "{plugin_version}"\n')
+    (dist_info / 'METADATA').write_text('Metadata-Version: 2.1\nName: plug\nVersion: 1.0\n')
+    (dist_info / 'RECORD').write_text('plug.py,,\nplug-1.0.dist-info/METADATA,,\n')
+    (directory / 'venv' / 'pyvenv.cfg').write_text(f'home = C:\\Python311\ncommand = python -m venv {directory}\\venv\n')
+    (directory / 'start_sharktools.bat').write_text(f'call "{directory}\\venv\\Scripts\\activate.bat"\r\n')
+    (directory / 'plugins.json').write_text(json.dumps(dict(created=created, plugins=[dict(name='plug')])))
+    manifest.write_manifest(directory)
+    return directory
+
+
+def test_same_selection_is_identical(tmp_path):
+    old = create_install(tmp_path / 'SHARKtools_20240612', '2024-06-12T10:00:00')
+    new = create_install(tmp_path / 'SHARKtools_20240619_101112', '2024-06-19T10:11:12')
+    result = diff.diff_installs(old, new)
+    assert result.identical
+    assert sorted(result.path_only_files) == ['plugins.json', 'start_sharktools.bat', 'venv/pyvenv.cfg']
+    assert result.changed_files == []
+
+
+def test_changed_file(tmp_path):
+    old = create_install(tmp_path / 'SHARKtools_20240612', '2024-06-12T10:00:00')
+    new = create_install(tmp_path / 'SHARKtools_20240619', '2024-06-19T10:11:12', plugin_version='1.1')
+    result = diff.diff_installs(old, new)
+    assert not result.identical
+    assert result.changed_files == ['venv/Lib/site-packages/plug.py']
+    assert 'Ändrade filer (1):' in result.get_report()
+
+
+def test_missing_manifest(tmp_path):
+    old = create_install(tmp_path / 'SHARKtools_20240612', '2024-06-12T10:00:00')
+    new = create_install(tmp_path / 'SHARKtools_20240619', '2024-06-19T10:11:12')
+    (new / '_install' / manifest.MANIFEST_FILE_NAME).unlink()
+    result = diff.diff_installs(old, new)
+    assert result.missing_manifests == [new]
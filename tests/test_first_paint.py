@@ -0,0 +1,71 @@
+import threading
+
+import pytest
+
+pytest.importorskip('flet')
+
+from sharktools_install import install_sharktools  # noqa: E402
+
+
+class StubPage:
+    """The parts of ft.Page used by FletApp. Updates are recorded instead of sent to a client"""
+
+    def __init__(self):
+        self.controls = []
+        self.overlay = []
+        self.banner = None
+        self.title = None
+        self.window_height = None
+        self.window_width = None
+        self.updates = []
+
+    def update(self, *controls):
+        self.updates.append(controls)
+
+
+@pytest.fixture
+def app(monkeypatch, tmp_path):
+    monkeypatch.setattr(install_sharktools.log, 'setup_logging', lambda *args, **kwargs: None)
+    # The window is not opened, main is called by the test
+    monkeypatch.setattr(install_sharktools.ft, 'app', lambda *args, **kwargs: None)
+    monkeypatch.setattr(install_sharktools.FletApp, '_set_default_install_root_directory', lambda self: None)
+    return install_sharktools.FletApp()
+
+
+def test_first_paint_before_discovery(app):
+    release_discovery = threading.Event()
+    discovery_started = threading.Event()
+
+    def discover():
+        discovery_started.set()
+        release_discovery.wait(10)
+
+    app._install.discover = discover
+    page = StubPage()
+    app.main(page)
+    try:
+        assert discovery_started.wait(10)
+        assert app.time_to_first_paint is not None
+        assert app.time_to_first_paint > 0
+        assert page.updates, 'Nothing was sent to the page before the plugins were found'
+        assert not app._install_discovered.is_set()
+    finally:
+        release_discovery.set()
+    assert app._install_discovered.wait(10)
+
+
+def test_failed_discovery_is_shown(app):
+    def discover():
+        raise ValueError('Ogiltigt wheel-namn: sharktools.whl')
+
+    app._install.discover = discover
+    page = StubPage()
+    app.main(page)
+    assert app._install_discovered.wait(10)
+    assert not app._plugins_status.visible
+    assert page.banner.open
+    assert 'Ogiltigt wheel-namn' in app._discovery_error
+
+    page.banner.open = False
+    app._install_app()
+    assert page.banner.open
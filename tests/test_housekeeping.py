@@ -0,0 +1,63 @@
+import os
+import threading
+import time
+
+import pytest
+
+from sharktools_install import housekeeping
+from sharktools_install import staging
+
+
+def create_install(root, name):
+    path = root / name
+    (path / 'venv').mkdir(parents=True)
+    (path / 'venv' / 'file.txt').write_text('x')
+    return path
+
+
+def test_get_installs_to_remove(tmp_path):
+    installs = [create_install(tmp_path, f'SHARKtools_2024061{nr}') for nr in range(5)]
+    housekeeping.pin(installs[0])
+    assert housekeeping.get_installs_to_remove(tmp_path, keep=2, protected=[installs[1]]) == [installs[2]]
+
+
+def test_installs_and_stale_staging_directories_are_removed_by_one_thread(tmp_path, monkeypatch):
+    installs = [create_install(tmp_path, f'SHARKtools_2024061{nr}') for nr in range(3)]
+    stale = create_install(tmp_path, f'{staging.RESUMABLE_PREFIX}abc')
+    old = time.time() - staging.STALE_AGE.total_seconds() - 60
+    os.utime(stale, (old, old))
+    create_install(tmp_path, f'{staging.STAGING_PREFIX}new')
+
+    trash_threads = []
+    thread_class = threading.Thread
+
+    def create_thread(*args, **kwargs):
+        thread = thread_class(*args, **kwargs)
+        if kwargs.get('target') is housekeeping.empty_trash:
+            trash_threads.append(thread)
+        return thread
+
+    monkeypatch.setattr(housekeeping.threading, 'Thread', create_thread)
+    to_remove = housekeeping.get_installs_to_remove(tmp_path, keep=1)
+    to_remove.extend(staging.get_stale_staging_directories(tmp_path))
+    assert to_remove == [installs[0], installs[1], stale]
+    housekeeping.remove_installs(to_remove).join(10)
+    assert len(trash_threads) == 1
+    assert sorted(path.name for path in tmp_path.iterdir()) == [f'{staging.STAGING_PREFIX}new', installs[2].name]
+
+
+def test_delete_tree_removes_directory_links_without_following_them(tmp_path):
+    outside = tmp_path / 'outside'
+    outside.mkdir()
+    (outside / 'keep.txt').write_text('x')
+    install = create_install(tmp_path, 'SHARKtools_20240610')
+    (install / 'venv' / 'lib').mkdir()
+    (install / 'venv' / 'lib' / 'module.py').write_text('x')
+    try:
+        (install / 'venv' / 'lib64').symlink_to('lib', target_is_directory=True)
+        (install / 'venv' / 'outside').symlink_to(outside, target_is_directory=True)
+    except OSError:
+        pytest.skip('Symlinks are not available')
+    housekeeping.delete_tree(install)
+    assert not install.exists()
+    assert (outside / 'keep.txt').exists()
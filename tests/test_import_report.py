@@ -0,0 +1,26 @@
+import subprocess
+import sys
+
+from sharktools_install import import_report
+
+IMPORTTIME_LOG = """\
+import time: self [us] | cumulative | imported package
+import time:       100 |        100 |   _io
+import time:       200 |        300 | io
+import time:      1000 |       1000 |     numpy.core
+import time:      3000 |       4000 |   numpy
+import time:       500 |       4500 | sharktools
+"""
+
+
+def test_script_runs_in_a_plain_python(tmp_path):
+    script_path = import_report.write_script(tmp_path / 'import_report.py')
+    log_path = tmp_path / 'importtime.log'
+    log_path.write_text(IMPORTTIME_LOG, encoding='utf-8')
+    report_path = tmp_path / 'import_report.txt'
+    subprocess.run([sys.executable, '-I', str(script_path), str(log_path), str(report_path)], check=True)
+    lines = report_path.read_text(encoding='utf-8').splitlines()
+    assert lines[0] == 'Total importtid: 0.00 s (5 moduler)'
+    package_lines = lines[lines.index('Paket sorterade efter egen importtid (summa för alla moduler i paketet):') + 1:]
+    assert package_lines[0].endswith('numpy')
+    assert any(line.endswith('(egen      0.5 ms)  sharktools') for line in lines)
@@ -0,0 +1,105 @@
+import importlib.util
+import json
+import os
+import pathlib
+import sys
+import threading
+import time
+
+import pytest
+
+pytest.importorskip('tkinter')
+pytest.importorskip('screeninfo')
+
+PREVIOUS_VERSIONS = pathlib.Path(__file__).parents[1] / 'previous_versions'
+sys.path.append(str(PREVIOUS_VERSIONS))
+
+# The script has the same name as the install_from_config package next to it
+_spec = importlib.util.spec_from_file_location('install_from_config_script',
+                                               PREVIOUS_VERSIONS / 'install_from_config.py')
+install_from_config = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(install_from_config)
+
+
+@pytest.fixture
+def create_saves(monkeypatch, tmp_path):
+    monkeypatch.setattr(install_from_config, 'DIRECTORY', tmp_path)
+    created = []
+
+    def create(flush_delay=0.05):
+        saves = install_from_config.Saves()
+        saves.flush_delay = flush_delay
+        created.append(saves)
+        return saves
+
+    yield create
+    for saves in created:
+        saves.flush()
+
+
+def read(saves):
+    return json.loads(saves.file_path.read_text())
+
+
+def test_changes_are_written_together_after_the_last_change(create_saves):
+    saves = create_saves(flush_delay=0.2)
+    saves.set('python', 'C:/Python311/python.exe')
+    saves.set('root', 'C:/sharktools_installs')
+    assert not saves.file_path.exists()
+    time.sleep(0.5)
+    assert read(saves) == {'python': 'C:/Python311/python.exe', 'root': 'C:/sharktools_installs'}
+
+
+def test_changes_from_two_windows_are_merged(create_saves):
+    first = create_saves()
+    second = create_saves()
+    first.set_item('selection', 'config_a.yaml', ['plugin_a'])
+    second.set_item('selection', 'config_b.yaml', ['plugin_b'])
+    second.set('root', 'D:/installs')
+    first.flush()
+    second.flush()
+    expected = {'config_a.yaml': ['plugin_a'], 'config_b.yaml': ['plugin_b']}
+    assert read(first) == {'selection': expected, 'root': 'D:/installs'}
+    # The window saving last also gets the changes of the other window
+    assert second.get('selection') == expected
+
+
+def test_flush_waits_for_a_save_started_by_the_timer(create_saves):
+    saves = create_saves(flush_delay=0.01)
+    timer_save_started = threading.Event()
+    read_file = saves._read_file
+
+    def slow_read_file():
+        timer_save_started.set()
+        time.sleep(0.2)
+        return read_file()
+
+    saves._read_file = slow_read_file
+    saves.set('python', 'C:/Python311/python.exe')
+    assert timer_save_started.wait(5)
+    saves.flush()
+    assert read(saves) == {'python': 'C:/Python311/python.exe'}
+
+
+def test_stale_lock_file_is_removed(create_saves):
+    saves = create_saves()
+    saves._lock_file_path.touch()
+    old = time.time() - saves.stale_lock_age - 10
+    os.utime(saves._lock_file_path, (old, old))
+    saves.set('root', 'D:/installs')
+    start = time.time()
+    saves.flush()
+    assert time.time() - start < saves.lock_timeout
+    assert read(saves) == {'root': 'D:/installs'}
+    assert not saves._lock_file_path.exists()
+
+
+def test_lock_held_by_another_window_is_left(create_saves):
+    saves = create_saves()
+    saves.lock_timeout = 0.1
+    saves._lock_file_path.touch()
+    saves.set('root', 'D:/installs')
+    saves.flush()
+    # Saved anyway after the timeout, but the lock of the other window is not removed
+    assert read(saves) == {'root': 'D:/installs'}
+    assert saves._lock_file_path.exists()
@@ -0,0 +1,90 @@
+import os
+import subprocess
+
+import pytest
+
+from sharktools_install import manifest
+
+
+@pytest.fixture
+def install(tmp_path):
+    path = tmp_path / 'SHARKtools_20240619'
+    (path / '_install').mkdir(parents=True)
+    (path / 'start_sharktools.bat').write_text('call venv\\Scripts\\activate\n', encoding='utf-8')
+    (path / 'venv').mkdir()
+    (path / 'venv' / 'pyvenv.cfg').write_text('home = C:\\Python311\n', encoding='utf-8')
+    site_packages = path / 'venv' / 'Lib' / 'site-packages'
+    (site_packages / 'mypackage').mkdir(parents=True)
+    module_path = site_packages / 'mypackage' / '__init__.py'
+    module_path.write_text('VALUE = 1\n', encoding='utf-8')
+    dist_info = site_packages / 'mypackage-1.0.dist-info'
+    dist_info.mkdir()
+    (dist_info / 'RECORD').write_text(
+        f'mypackage/__init__.py,{manifest.get_file_hash(module_path)},{module_path.stat().st_size}\n'
+        f'mypackage-1.0.dist-info/RECORD,,\n', encoding='utf-8')
+    manifest.write_manifest(path)
+    return path
+
+
+def touch(path):
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10_000_000_000))
+
+
+def test_manifest_reuses_record_hashes_and_stores_run_files(install):
+    files = manifest.load_manifest(install)['files']
+    assert files['venv/Lib/site-packages/mypackage/__init__.py']['distribution'] == 'mypackage-1.0'
+    assert files['start_sharktools.bat']['content'] == 'call venv\\Scripts\\activate\n'
+    assert 'content' not in files['venv/pyvenv.cfg']
+    assert not any(rel_path.startswith('_install/') for rel_path in files)
+
+
+def test_unchanged_files_are_not_hashed(install):
+    result = manifest.verify(install)
+    assert result.ok
+    assert result.nr_checked == 4
+    assert result.nr_hashed == 0
+    assert result.get_report()[-1] == 'Installationen är oförändrad'
+
+
+def test_touched_files_of_the_same_size_are_hashed(install):
+    unchanged = install / 'venv' / 'pyvenv.cfg'
+    touch(unchanged)
+    changed = install / 'venv' / 'Lib' / 'site-packages' / 'mypackage' / '__init__.py'
+    changed.write_text('VALUE = 2\n', encoding='utf-8')
+    touch(changed)
+    result = manifest.verify(install)
+    assert result.nr_hashed == 2
+    assert result.changed == ['venv/Lib/site-packages/mypackage/__init__.py']
+    assert not result.ok
+
+
+def test_missing_and_added_files(install):
+    (install / 'venv' / 'pyvenv.cfg').unlink()
+    (install / 'venv' / 'new.txt').write_text('x')
+    # Not part of the installation
+    (install / '_install' / 'install.log').write_text('x')
+    result = manifest.verify(install)
+    assert result.missing == ['venv/pyvenv.cfg']
+    assert result.added == ['venv/new.txt']
+    assert not result.ok
+    # Added files alone are not an error
+    (install / 'venv' / 'pyvenv.cfg').write_text('home = C:\\Python311\n', encoding='utf-8')
+    assert manifest.verify(install).ok
+
+
+def test_repair_restores_stored_files_and_reinstalls_packages(install, monkeypatch):
+    calls = []
+    monkeypatch.setattr(subprocess, 'run', lambda args, **kwargs: calls.append(args))
+    run_file = install / 'start_sharktools.bat'
+    run_file.unlink()
+    (install / 'venv' / 'Lib' / 'site-packages' / 'mypackage' / '__init__.py').write_text('broken')
+    (install / 'venv' / 'pyvenv.cfg').write_text('broken')
+
+    result = manifest.verify(install)
+    not_repaired = manifest.repair(install, result)
+    assert run_file.read_text(encoding='utf-8') == 'call venv\\Scripts\\activate\n'
+    assert not_repaired == ['venv/pyvenv.cfg']
+    assert len(calls) == 1
+    assert calls[0][-1] == 'mypackage==1.0'
+    assert calls[0][1:6] == ['-m', 'pip', 'install', '--force-reinstall', '--no-deps']
@@ -0,0 +1,60 @@
+import pathlib
+import subprocess
+import sys
+
+sys.path.append(str(pathlib.Path(__file__).parents[1] / 'previous_versions'))
+
+import module_index  # noqa: E402
+
+CHECK_STARTUP = """
+import site
+import sys
+before = set(sys.modules)
+site.addsitedir(sys.argv[1])
+import mypackage
+import mymodule
+import json
+print(mypackage.__file__)
+print(mymodule.__file__)
+print(json.__file__ != sys.argv[2])
+print(' '.join(sorted(set(sys.modules) - before)))
+"""
+
+
+def create_checkout(directory):
+    (directory / 'mypackage').mkdir(parents=True)
+    (directory / 'mypackage' / '__init__.py').write_text('')
+    (directory / 'mymodule.py').write_text('')
+    # Must not shadow the standard library
+    (directory / 'json.py').write_text('')
+    return directory
+
+
+def test_index_excludes_site_packages_and_stdlib(tmp_path):
+    checkout = create_checkout(tmp_path / 'checkout')
+    site_packages = tmp_path / 'site-packages'
+    (site_packages / 'mymodule').mkdir(parents=True)
+    index = module_index.write_import_accelerator(site_packages, [checkout])
+    assert index == {'mypackage': str(checkout / 'mypackage')}
+    assert (site_packages / f'{module_index.INDEX_MODULE_NAME}.py').exists()
+    assert (site_packages / module_index.PTH_FILE_NAME).read_text().splitlines()[0] == str(checkout)
+
+
+def test_finder_is_installed_at_startup_without_heavy_imports(tmp_path):
+    checkout = create_checkout(tmp_path / 'checkout')
+    site_packages = tmp_path / 'site-packages'
+    site_packages.mkdir()
+    (site_packages / f'{module_index.OLD_INDEX_FILE_NAME}').write_text('{}')
+    module_index.write_import_accelerator(site_packages, [checkout])
+    assert not (site_packages / module_index.OLD_INDEX_FILE_NAME).exists()
+
+    result = subprocess.run([sys.executable, '-I', '-S', '-c', CHECK_STARTUP, str(site_packages),
+                             str(checkout / 'json.py')],
+                            capture_output=True, text=True, check=True)
+    package_file, module_file, json_from_stdlib, imported = result.stdout.splitlines()
+    assert package_file == str(checkout / 'mypackage' / '__init__.py')
+    assert module_file == str(checkout / 'mymodule.py')
+    assert json_from_stdlib == 'True'
+    imported = set(imported.split())
+    assert module_index.FINDER_MODULE_NAME in imported
+    assert not imported & {'shutil', 'sysconfig', 'module_index'}
@@ -0,0 +1,156 @@
+import http.server
+import json
+import pathlib
+import sys
+import threading
+
+import pytest
+
+sys.path.append(str(pathlib.Path(__file__).parents[1] / 'previous_versions'))
+
+from plugin_catalogue import PluginCatalogue  # noqa: E402
+
+
+class GitHubStandIn(http.server.ThreadingHTTPServer):
+    """Serves the repository list and releases of the organisation with ETags, as the GitHub API does"""
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), Handler)
+        self.repos = []
+        self.releases = {}
+        self.requests = []
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+    def add_release(self, plugin, version):
+        if plugin not in self.repos:
+            self.repos.append(plugin)
+        self.releases.setdefault(plugin, []).insert(0, dict(
+            tag_name=f'v{version}',
+            assets=[dict(name=f'{plugin}-{version}-py3-none-any.whl', size=100,
+                         browser_download_url=f'{self.url}/{plugin}-{version}-py3-none-any.whl')]))
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.startswith('/orgs/sharksmhi/repos'):
+            data = [dict(name=name) for name in self.server.repos]
+        elif self.path.startswith('/repos/sharksmhi/') and self.path.endswith('/releases'):
+            data = self.server.releases.get(self.path.split('/')[3], [])
+        else:
+            self.send_error(404)
+            return
+        content = json.dumps(data).encode('utf-8')
+        etag = f'"{hash(content)}"'
+        not_modified = self.headers.get('If-None-Match') == etag
+        self.server.requests.append((self.path, 304 if not_modified else 200))
+        if not_modified:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = GitHubStandIn()
+    thread = threading.Thread(target=server.serve_forever, kwargs=dict(poll_interval=0.05), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def get_catalogue(server, tmp_path):
+    return PluginCatalogue(cache_file_path=tmp_path / 'plugin_catalogue.json',
+                           fallback_file_path=tmp_path / 'plugins', api_url=server.url, timeout=5)
+
+
+def test_refresh(server, tmp_path):
+    server.add_release('SHARKtools_ctd', '1.0')
+    server.add_release('SHARKtools_ctd', '1.1')
+    server.add_release('SHARKtools_install', '1.0')
+    server.repos.append('other_repo')
+    catalogue = get_catalogue(server, tmp_path)
+    catalogue.refresh()
+    assert catalogue.plugins == ['SHARKtools_ctd']
+    metadata = catalogue.get_metadata('SHARKtools_ctd')
+    assert metadata['versions'] == ['1.1', '1.0']
+    assert metadata['wheels']['1.1'][0]['name'] == 'SHARKtools_ctd-1.1-py3-none-any.whl'
+    assert (tmp_path / 'plugins').read_text() == 'SHARKtools_ctd'
+
+
+def test_new_release_is_found_when_the_repository_list_is_not_modified(server, tmp_path):
+    server.add_release('SHARKtools_ctd', '1.0')
+    server.add_release('SHARKtools_qc', '1.0')
+    catalogue = get_catalogue(server, tmp_path)
+    catalogue.refresh()
+    server.add_release('SHARKtools_ctd', '1.1')
+    server.requests.clear()
+    catalogue.refresh()
+    assert ('/orgs/sharksmhi/repos?per_page=100', 304) in server.requests
+    assert ('/repos/sharksmhi/SHARKtools_ctd/releases', 200) in server.requests
+    assert ('/repos/sharksmhi/SHARKtools_qc/releases', 304) in server.requests
+    assert catalogue.get_metadata('SHARKtools_ctd')['versions'] == ['1.1', '1.0']
+    assert catalogue.get_metadata('SHARKtools_qc')['versions'] == ['1.0']
+
+
+def test_not_modified_keeps_the_cache(server, tmp_path):
+    server.add_release('SHARKtools_ctd', '1.0')
+    get_catalogue(server, tmp_path).refresh()
+    # A new catalogue reads the ETags from the cache file
+    catalogue = get_catalogue(server, tmp_path)
+    server.requests.clear()
+    catalogue.refresh()
+    assert all(status == 304 for _, status in server.requests)
+    assert catalogue.get_metadata('SHARKtools_ctd')['versions'] == ['1.0']
+    assert not catalogue.is_stale
+
+
+def test_removed_repository(server, tmp_path):
+    server.add_release('SHARKtools_ctd', '1.0')
+    server.add_release('SHARKtools_qc', '1.0')
+    catalogue = get_catalogue(server, tmp_path)
+    catalogue.refresh()
+    server.repos.remove('SHARKtools_qc')
+    catalogue.refresh()
+    assert catalogue.plugins == ['SHARKtools_ctd']
+
+
+def test_unreachable_server_keeps_the_cache(server, tmp_path):
+    server.add_release('SHARKtools_ctd', '1.0')
+    catalogue = get_catalogue(server, tmp_path)
+    catalogue.refresh()
+    catalogue.api_url = 'http://127.0.0.1:1'
+    catalogue.refresh()
+    assert catalogue.get_metadata('SHARKtools_ctd')['versions'] == ['1.0']
+
+
+def test_fallback_before_the_first_refresh(tmp_path):
+    (tmp_path / 'plugins').write_text('SHARKtools_ctd\nSHARKtools_qc\n')
+    catalogue = PluginCatalogue(cache_file_path=tmp_path / 'plugin_catalogue.json',
+                                fallback_file_path=tmp_path / 'plugins')
+    assert catalogue.plugins == ['SHARKtools_ctd', 'SHARKtools_qc']
+    assert catalogue.is_stale
+
+
+def test_refresh_in_background(server, tmp_path):
+    server.add_release('SHARKtools_ctd', '1.0')
+    catalogue = get_catalogue(server, tmp_path)
+    done = threading.Event()
+    thread = catalogue.refresh_in_background(on_done=lambda c: done.set())
+    thread.join(5)
+    assert done.is_set()
+    assert catalogue.refresh_in_background() is None
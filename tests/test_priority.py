@@ -0,0 +1,37 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from sharktools_install import priority
+
+
+def test_disabled_throttle_changes_nothing():
+    throttle = priority.Throttle(enabled=False)
+    assert throttle.get_workers(4) == 4
+    assert throttle.wait() == 0.
+    assert throttle.get_popen_kwargs() == {}
+    assert throttle.get_command_prefix() == []
+    assert throttle.get_report() == []
+
+
+def test_enabled_throttle_uses_fewer_workers(tmp_path):
+    throttle = priority.Throttle(enabled=True, directory=tmp_path)
+    assert 1 <= throttle.get_workers(None) <= max(1, (os.cpu_count() or 1) // 4)
+    assert throttle.get_workers(1) == 1
+
+
+def test_no_preexec_fn():
+    # preexec_fn is not safe when other threads are running
+    assert 'preexec_fn' not in priority.get_popen_kwargs()
+
+
+@pytest.mark.skipif(os.name == 'nt', reason='nice is not available on Windows')
+def test_child_process_gets_low_priority():
+    prefix = priority.get_command_prefix()
+    if 'nice' not in prefix:
+        pytest.skip('nice not found')
+    result = subprocess.run([*prefix, sys.executable, '-c', 'import os; print(os.nice(0))'],
+                            capture_output=True, text=True, check=True, **priority.get_popen_kwargs())
+    assert int(result.stdout) >= os.nice(0) + 10 or int(result.stdout) == 19
@@ -0,0 +1,171 @@
+import pytest
+
+from sharktools_install.requirements import InvalidRequirement
+from sharktools_install.requirements import Requirement
+from sharktools_install.requirements import SpecifierSet
+from sharktools_install.requirements import Version
+from sharktools_install.requirements import canonical_name
+from sharktools_install.requirements import evaluate_marker
+from sharktools_install.requirements import get_environment
+
+# Expected results are those of PEP 440 and PEP 508 (the same as given by packaging)
+
+
+@pytest.mark.parametrize('smaller, larger', [
+    ('1.0.dev1', '1.0a1'),
+    ('1.0a1', '1.0a2'),
+    ('1.0a2', '1.0b1'),
+    ('1.0b1', '1.0rc1'),
+    ('1.0rc1', '1.0'),
+    ('1.0', '1.0.post1'),
+    ('1.0.post1', '1.0.1'),
+    ('1.0a1.dev1', '1.0a1'),
+    ('1.0.post1.dev1', '1.0.post1'),
+    ('1.9', '1.10'),
+    ('0.9.9', '1'),
+])
+def test_version_order(smaller, larger):
+    assert Version(smaller) < Version(larger)
+    assert Version(larger) > Version(smaller)
+
+
+@pytest.mark.parametrize('first, second', [
+    ('1.0', '1'),
+    ('1.0.0', '1'),
+    ('1.0c1', '1.0rc1'),
+    ('1.0alpha1', '1.0a1'),
+    ('1.0-r1', '1.0.post1'),
+    ('v1.0', '1.0'),
+])
+def test_version_equal(first, second):
+    assert Version(first) == Version(second)
+    assert hash(Version(first)) == hash(Version(second))
+
+
+@pytest.mark.parametrize('version, is_prerelease', [
+    ('1.0', False),
+    ('1.0.post1', False),
+    ('1.0a1', True),
+    ('1.0rc2', True),
+    ('1.0.dev0', True),
+])
+def test_version_is_prerelease(version, is_prerelease):
+    assert Version(version).is_prerelease is is_prerelease
+
+
+def test_invalid_version():
+    with pytest.raises(InvalidRequirement):
+        Version('not a version')
+
+
+@pytest.mark.parametrize('specifier, version, expected', [
+    ('>=1.0', '1.0', True),
+    ('>=1.0', '0.9', False),
+    ('>=1.0,<2', '1.5', True),
+    ('>=1.0,<2', '2.0', False),
+    ('==1.4.*', '1.4.5', True),
+    ('==1.4.*', '1.5', False),
+    ('!=1.4.*', '1.4.5', False),
+    ('~=1.4.2', '1.4.9', True),
+    ('~=1.4.2', '1.5', False),
+    ('~=1.4', '1.9', True),
+    ('~=1.4', '2.0', False),
+    ('<2', '2.0a1', False),
+    ('>1.0', '1.0.post1', False),
+    ('>1.0', '1.0.1', True),
+    ('==1.0', '1.0.0', True),
+    ('!=1.0', '1.0.1', True),
+    ('>=1.0', '2.0a1', False),
+    ('>=2.0a1', '2.0a2', True),
+    ('', '1.0', True),
+])
+def test_specifier_contains(specifier, version, expected):
+    assert SpecifierSet(specifier).contains(version) is expected
+
+
+def test_specifier_contains_prereleases():
+    assert SpecifierSet('>=1.0').contains('2.0a1', prereleases=True)
+
+
+@pytest.mark.parametrize('marker, expected', [
+    ('python_version >= "3.8"', True),
+    ('python_version < "3.10"', False),
+    ('python_version >= "3.9" and python_version < "3.12"', True),
+    ('python_full_version >= "3.11.4"', True),
+    ('sys_platform == "win32"', True),
+    ('sys_platform == "linux" or os_name == "nt"', True),
+    ('platform_system == "Windows" and platform_machine == "AMD64"', True),
+    ('(sys_platform == "darwin" or sys_platform == "linux") and python_version > "3"', False),
+    ('implementation_name == "cpython"', True),
+    ('implementation_version >= "3.11"', True),
+    ('platform_python_implementation != "PyPy"', True),
+    ('platform_release == ""', True),
+    ('platform_version == ""', True),
+    ('"win" in sys_platform', True),
+    ('"linux" not in sys_platform', True),
+    ('"3.8" < python_version', True),
+    ('"3.12" <= python_version', False),
+    ('"3.11" == python_version', True),
+    ('"3.9" >= python_version', False),
+    ('python_version > "3.10" and ("win32" == sys_platform or os_name == "posix")', True),
+])
+def test_evaluate_marker(marker, expected):
+    assert evaluate_marker(marker, get_environment('3.11.4')) is expected
+
+
+@pytest.mark.parametrize('marker', [
+    'python_version',
+    'python_version >=',
+    'python_version == "3.11" and',
+    'python_version == "3.11" or',
+    '(python_version == "3.11"',
+    '()',
+    'unknown == "1"',
+])
+def test_invalid_marker(marker):
+    with pytest.raises(InvalidRequirement):
+        evaluate_marker(marker, get_environment('3.11.4'))
+
+
+def test_environment_has_all_pep_508_variables():
+    environment = get_environment('3.11.4')
+    for name in ['os_name', 'sys_platform', 'platform_machine', 'platform_python_implementation',
+                 'platform_release', 'platform_system', 'platform_version', 'python_version',
+                 'python_full_version', 'implementation_name', 'implementation_version']:
+        assert name in environment
+
+
+def test_canonical_name():
+    assert canonical_name('Foo.Bar_baz') == 'foo-bar-baz'
+    assert canonical_name('foo--bar') == 'foo-bar'
+
+
+def test_requirement():
+    requirement = Requirement('Foo_Bar[extra1, extra2] >=1.0,<2 ; python_version >= "3.8"')
+    assert requirement.name == 'Foo_Bar'
+    assert requirement.key == 'foo-bar'
+    assert requirement.extras == ['extra1', 'extra2']
+    assert requirement.specifier.contains('1.5')
+    assert not requirement.specifier.contains('2.0')
+    assert requirement.marker == 'python_version >= "3.8"'
+
+
+def test_requirement_with_parenthesized_specifier():
+    assert Requirement('foo (>=1.0)').specifier.contains('1.0')
+
+
+def test_requirement_applies_to_extra():
+    requirement = Requirement('foo; extra == "test"')
+    environment = get_environment('3.11')
+    assert not requirement.applies_to(environment)
+    assert requirement.applies_to(environment, extras=['test'])
+
+
+def test_url_requirement_is_invalid():
+    with pytest.raises(InvalidRequirement):
+        Requirement('helper @ https://example.com/helper-1.0-py3-none-any.whl')
+
+
+def test_unknown_marker_variable_is_invalid():
+    with pytest.raises(InvalidRequirement):
+        Requirement('foo; unknown_variable == "1"').applies_to(get_environment('3.11'))
@@ -0,0 +1,153 @@
+import pathlib
+import zipfile
+
+import pytest
+
+from sharktools_install import resolver
+from sharktools_install import wheel_metadata
+from sharktools_install.requirements import get_environment
+
+PYTHON_VERSION = '3.11'
+
+
+def create_wheel(directory: pathlib.Path, name: str, version: str, requires: list[str] = (),
+                 tag: str = 'py3-none-any') -> pathlib.Path:
+    path = directory / f'{name}-{version}-{tag}.whl'
+    lines = ['Metadata-Version: 2.1', f'Name: {name}', f'Version: {version}']
+    lines.extend(f'Requires-Dist: {req}' for req in requires)
+    with zipfile.ZipFile(path, 'w') as zf:
+        zf.writestr(f'{name}/__init__.py', '')
+        zf.writestr(f'{name}-{version}.dist-info/METADATA', '\n'.join(lines) + '\n')
+    return path
+
+
+def resolve(directory: pathlib.Path, requirements: list[str]) -> dict[str, str]:
+    wheels_metadata = {path: wheel_metadata.read_wheel_metadata(path) for path in directory.glob('*.whl')}
+    result = resolver.Resolver(wheels_metadata, PYTHON_VERSION, get_environment(PYTHON_VERSION)).resolve(requirements)
+    return {key: str(candidate.version) for key, candidate in result.items()}
+
+
+def test_newest_versions(tmp_path):
+    create_wheel(tmp_path, 'plug', '1.0', ['dep>=1.0'])
+    create_wheel(tmp_path, 'dep', '1.0')
+    create_wheel(tmp_path, 'dep', '2.0')
+    assert resolve(tmp_path, ['plug']) == dict(plug='1.0', dep='2.0')
+
+
+def test_backtracking(tmp_path):
+    # The newest plug needs a dep that conflicts with other, so the older plug has to be used
+    create_wheel(tmp_path, 'plug', '2.0', ['dep>=2'])
+    create_wheel(tmp_path, 'plug', '1.0', ['dep<2'])
+    create_wheel(tmp_path, 'other', '1.0', ['dep<2'])
+    create_wheel(tmp_path, 'dep', '1.0')
+    create_wheel(tmp_path, 'dep', '2.0')
+    assert resolve(tmp_path, ['plug', 'other']) == dict(plug='1.0', other='1.0', dep='1.0')
+
+
+def test_markers_and_extras(tmp_path):
+    create_wheel(tmp_path, 'plug', '1.0', ['win-only; sys_platform == "win32"',
+                                           'linux-only; sys_platform == "linux"',
+                                           'extra-dep; extra == "plot"'])
+    create_wheel(tmp_path, 'win_only', '1.0')
+    create_wheel(tmp_path, 'linux_only', '1.0')
+    create_wheel(tmp_path, 'extra_dep', '1.0')
+    assert resolve(tmp_path, ['plug']) == {'plug': '1.0', 'win-only': '1.0'}
+    assert resolve(tmp_path, ['plug[plot]']) == {'plug': '1.0', 'win-only': '1.0', 'extra-dep': '1.0'}
+
+
+def test_prereleases_only_when_nothing_else_matches(tmp_path):
+    create_wheel(tmp_path, 'dep', '1.0')
+    create_wheel(tmp_path, 'dep', '2.0a1')
+    assert resolve(tmp_path, ['dep']) == dict(dep='1.0')
+    assert resolve(tmp_path, ['dep>1.0']) == dict(dep='2.0a1')
+
+
+def test_incompatible_wheels_are_ignored(tmp_path):
+    create_wheel(tmp_path, 'dep', '1.0')
+    create_wheel(tmp_path, 'dep', '2.0', tag='cp311-cp311-manylinux_2_17_x86_64')
+    create_wheel(tmp_path, 'dep', '3.0', tag='cp312-cp312-win_amd64')
+    assert resolve(tmp_path, ['dep']) == dict(dep='1.0')
+
+
+def test_conflict(tmp_path):
+    create_wheel(tmp_path, 'plug', '1.0', ['dep>=2'])
+    create_wheel(tmp_path, 'dep', '1.0')
+    with pytest.raises(resolver.ResolutionError) as info:
+        resolve(tmp_path, ['plug'])
+    assert 'dep' in str(info.value)
+
+
+def test_missing_dependency(tmp_path):
+    create_wheel(tmp_path, 'plug', '1.0', ['missing'])
+    with pytest.raises(resolver.ResolutionError):
+        resolve(tmp_path, ['plug'])
+
+
+def test_url_dependency_is_a_resolution_error(tmp_path):
+    # Leaving it out would give an install set without it
+    create_wheel(tmp_path, 'plug', '1.0', ['helper @ https://example.com/helper-1.0-py3-none-any.whl'])
+    with pytest.raises(resolver.ResolutionError):
+        resolve(tmp_path, ['plug'])
+
+
+def test_unknown_marker_is_a_resolution_error(tmp_path):
+    create_wheel(tmp_path, 'plug', '1.0', ['dep; unknown_variable == "1"'])
+    create_wheel(tmp_path, 'dep', '1.0')
+    with pytest.raises(resolver.ResolutionError):
+        resolve(tmp_path, ['plug'])
+
+
+def test_all_pep_508_markers_are_evaluated(tmp_path):
+    create_wheel(tmp_path, 'plug', '1.0', ['dep; platform_release != "" or implementation_version >= "3"'])
+    create_wheel(tmp_path, 'dep', '1.0')
+    assert resolve(tmp_path, ['plug']) == dict(plug='1.0', dep='1.0')
+
+
+def test_corrupt_wheel_is_not_a_candidate(tmp_path):
+    create_wheel(tmp_path, 'plug', '1.0', ['dep'])
+    create_wheel(tmp_path, 'dep', '1.0')
+    (tmp_path / 'dep-2.0-py3-none-any.whl').write_bytes(b'partial download')
+    (tmp_path / 'broken-1.0-py3-none-any.whl').write_bytes(b'')
+    wheels_metadata = wheel_metadata.WheelMetadataCache(None).get_many(list(tmp_path.glob('*.whl')))
+    result = resolver.Resolver(wheels_metadata, PYTHON_VERSION, get_environment(PYTHON_VERSION)).resolve(['plug'])
+    assert {key: str(candidate.version) for key, candidate in result.items()} == dict(plug='1.0', dep='1.0')
+
+
+def test_only_corrupt_wheel_is_a_resolution_error(tmp_path):
+    create_wheel(tmp_path, 'plug', '1.0', ['dep'])
+    (tmp_path / 'dep-1.0-py3-none-any.whl').write_bytes(b'partial download')
+    wheels_metadata = wheel_metadata.WheelMetadataCache(None).get_many(list(tmp_path.glob('*.whl')))
+    with pytest.raises(resolver.ResolutionError):
+        resolver.Resolver(wheels_metadata, PYTHON_VERSION, get_environment(PYTHON_VERSION)).resolve(['plug'])
+
+
+def test_get_requirements_skips_what_it_cannot_handle():
+    metadata = dict(name='plug', requires_dist=['dep', 'helper @ https://example.com/helper.whl',
+                                                'other; unknown_variable == "1"'])
+    requirements = wheel_metadata.get_requirements(metadata, get_environment(PYTHON_VERSION))
+    assert [req.key for req in requirements] == ['dep']
+
+
+def test_resolution_cache(tmp_path):
+    wheel_directory = tmp_path / 'wheels'
+    wheel_directory.mkdir()
+    path = create_wheel(wheel_directory, 'dep', '1.0')
+    cache = resolver.ResolutionCache(tmp_path / 'cache', max_entries=2)
+    wheels_metadata = {path: wheel_metadata.read_wheel_metadata(path)}
+    install_set = resolver.Resolver(wheels_metadata, PYTHON_VERSION, get_environment(PYTHON_VERSION)).resolve(['dep'])
+    for nr in range(3):
+        cache.set(f'fingerprint_{nr}', install_set)
+    assert cache.get('fingerprint_2') == [path]
+    assert len(list((tmp_path / 'cache').glob('*.json'))) == 2
+    path.unlink()
+    assert cache.get('fingerprint_2') is None
+
+
+def test_fingerprint_changes_with_wheels(tmp_path):
+    path = create_wheel(tmp_path, 'dep', '1.0')
+    environment = get_environment(PYTHON_VERSION)
+    fingerprint = resolver.get_fingerprint(['dep'], [path], PYTHON_VERSION, environment)
+    assert fingerprint == resolver.get_fingerprint(['dep'], [path], PYTHON_VERSION, environment)
+    other = create_wheel(tmp_path, 'dep', '2.0')
+    assert fingerprint != resolver.get_fingerprint(['dep'], [path, other], PYTHON_VERSION, environment)
+    assert fingerprint != resolver.get_fingerprint(['dep'], [path], '3.12', get_environment('3.12'))
@@ -0,0 +1,144 @@
+import threading
+import time
+
+import pytest
+
+from sharktools_install.checkpoint import Checkpoints
+from sharktools_install.scheduler import StepError
+from sharktools_install.scheduler import StepScheduler
+
+
+def test_steps_run_after_their_dependencies():
+    order = []
+    scheduler = StepScheduler()
+    scheduler.add_step('install', lambda: order.append('install'), depends_on=['venv', 'download'])
+    scheduler.add_step('venv', lambda: order.append('venv'))
+    scheduler.add_step('download', lambda: order.append('download'))
+    scheduler.add_step('run_files', lambda: order.append('run_files'), depends_on=['install'])
+    scheduler.run()
+    assert sorted(order[:2]) == ['download', 'venv']
+    assert order[2:] == ['install', 'run_files']
+
+
+def test_independent_steps_overlap():
+    # Both steps must be running at the same time to pass the barrier
+    barrier = threading.Barrier(2, timeout=5)
+    scheduler = StepScheduler(max_workers=2)
+    scheduler.add_step('venv', barrier.wait)
+    scheduler.add_step('download', barrier.wait)
+    scheduler.run()
+    venv, download = scheduler.steps
+    assert venv.start_time < download.end_time
+    assert download.start_time < venv.end_time
+
+
+def test_failure_stops_later_steps():
+    started = []
+
+    def fail():
+        raise OSError('Disken är full')
+
+    def slow():
+        time.sleep(0.1)
+        started.append('slow')
+
+    scheduler = StepScheduler(max_workers=2)
+    scheduler.add_step('download', fail)
+    scheduler.add_step('venv', slow)
+    scheduler.add_step('install', lambda: started.append('install'), depends_on=['download', 'venv'])
+    with pytest.raises(StepError) as exc_info:
+        scheduler.run()
+    assert exc_info.value.step == 'download'
+    assert isinstance(exc_info.value.exception, OSError)
+    # The step already running is allowed to finish
+    assert started == ['slow']
+
+    report = scheduler.get_report()
+    assert '    install: kördes inte' in report
+    assert any(line.startswith('    venv: ') and line.endswith(' s') for line in report)
+
+
+def test_circular_dependencies_are_rejected_before_running():
+    started = []
+    scheduler = StepScheduler()
+    scheduler.add_step('first', lambda: started.append('first'))
+    scheduler.add_step('a', lambda: started.append('a'), depends_on=['b'])
+    scheduler.add_step('b', lambda: started.append('b'), depends_on=['a'])
+    with pytest.raises(ValueError, match='Cirkulärt beroende'):
+        scheduler.run()
+    assert not started
+
+
+def test_unknown_dependency_is_rejected():
+    scheduler = StepScheduler()
+    scheduler.add_step('install', lambda: None, depends_on=['venv'])
+    with pytest.raises(KeyError):
+        scheduler.run()
+
+
+def test_duplicate_step_is_rejected():
+    scheduler = StepScheduler()
+    scheduler.add_step('venv', lambda: None)
+    with pytest.raises(KeyError):
+        scheduler.add_step('venv', lambda: None)
+
+
+def test_critical_path_is_the_longest_chain():
+    scheduler = StepScheduler(max_workers=3)
+    scheduler.add_step('download', lambda: time.sleep(0.15))
+    scheduler.add_step('venv', lambda: time.sleep(0.05))
+    scheduler.add_step('install', lambda: time.sleep(0.05), depends_on=['download', 'venv'])
+    scheduler.add_step('run_files', lambda: None, depends_on=['venv'])
+    scheduler.run()
+    assert [step.name for step in scheduler.get_critical_path()] == ['download', 'install']
+    assert scheduler.get_report()[-1].endswith('download -> install')
+
+
+def test_critical_path_of_empty_scheduler():
+    assert StepScheduler().get_critical_path() == []
+
+
+def run_with_checkpoints(path, fingerprints):
+    ran = []
+    checkpoints = Checkpoints(path)
+    checkpoints.install_key = 'key'
+    scheduler = StepScheduler(checkpoints=checkpoints)
+    scheduler.add_step('venv', lambda: ran.append('venv'), fingerprint=lambda: fingerprints['venv'])
+    scheduler.add_step('download', lambda: ran.append('download'), fingerprint=lambda: fingerprints['download'])
+    scheduler.add_step('install', lambda: ran.append('install'), depends_on=['venv', 'download'],
+                       fingerprint=lambda: 'install')
+    scheduler.add_step('run_files', lambda: ran.append('run_files'), depends_on=['install'])
+    scheduler.run()
+    return sorted(ran), sorted(step.name for step in scheduler.reused_steps)
+
+
+def test_completed_steps_are_reused(tmp_path):
+    path = tmp_path / 'checkpoints.json'
+    fingerprints = dict(venv='python 3.11', download='wheels')
+    assert run_with_checkpoints(path, fingerprints) == (['download', 'install', 'run_files', 'venv'], [])
+    # Steps without a fingerprint always run
+    assert run_with_checkpoints(path, fingerprints) == (['run_files'], ['download', 'install', 'venv'])
+
+
+def test_changed_fingerprint_reruns_the_step_and_the_steps_after_it(tmp_path):
+    path = tmp_path / 'checkpoints.json'
+    fingerprints = dict(venv='python 3.11', download='wheels')
+    run_with_checkpoints(path, fingerprints)
+    fingerprints['download'] = 'other wheels'
+    assert run_with_checkpoints(path, fingerprints) == (['download', 'install', 'run_files'], ['venv'])
+    assert run_with_checkpoints(path, fingerprints) == (['run_files'], ['download', 'install', 'venv'])
+
+
+def test_failed_step_is_not_checkpointed(tmp_path):
+    path = tmp_path / 'checkpoints.json'
+    checkpoints = Checkpoints(path)
+    checkpoints.install_key = 'key'
+    scheduler = StepScheduler(checkpoints=checkpoints)
+
+    def fail():
+        raise OSError('Disken är full')
+
+    scheduler.add_step('venv', fail, fingerprint=lambda: 'python 3.11')
+    with pytest.raises(StepError):
+        scheduler.run()
+    assert not Checkpoints(path).is_valid('venv', scheduler.steps[0].checkpoint_key)
@@ -0,0 +1,97 @@
+import datetime
+
+import pytest
+
+from sharktools_install import checkpoint
+from sharktools_install import housekeeping
+from sharktools_install import staging
+
+DATE = datetime.datetime(2024, 6, 12, 10, 11, 12)
+
+
+@pytest.fixture(autouse=True)
+def no_retry_delay(monkeypatch):
+    monkeypatch.setattr(staging, 'RENAME_RETRY_DELAY', 0.)
+
+
+def create_staging_directory(root):
+    path = staging.create_staging_directory(root)
+    (path / 'start_sharktools.bat').write_text(f'cd {path}\n')
+    return path
+
+
+def test_install_names_sort_in_creation_order():
+    names = staging.get_install_names(DATE)
+    assert names[0] == 'SHARKtools_20240612'
+    assert names[1] == 'SHARKtools_20240612_101112'
+    assert names[2] == 'SHARKtools_20240612_101112_02'
+    assert sorted(names) == names
+
+
+def test_promote(tmp_path):
+    first = staging.promote(create_staging_directory(tmp_path), DATE)
+    second = staging.promote(create_staging_directory(tmp_path), DATE)
+    third = staging.promote(create_staging_directory(tmp_path), DATE)
+    assert [first.name, second.name, third.name] == [
+        'SHARKtools_20240612', 'SHARKtools_20240612_101112', 'SHARKtools_20240612_101112_02']
+    assert (third / 'start_sharktools.bat').read_text() == f'cd {third}\n'
+    assert housekeeping.list_installs(tmp_path) == [first, second, third]
+
+
+def test_promote_retries_permission_errors(tmp_path, monkeypatch):
+    path = create_staging_directory(tmp_path)
+    rename = type(path).rename
+    errors = [PermissionError(13, 'Access is denied')] * 2
+
+    def flaky_rename(self, target):
+        if errors:
+            raise errors.pop()
+        return rename(self, target)
+
+    monkeypatch.setattr(type(path), 'rename', flaky_rename)
+    assert staging.promote(path, DATE).name == 'SHARKtools_20240612'
+
+
+def test_promote_raises_persistent_errors(tmp_path, monkeypatch):
+    path = create_staging_directory(tmp_path)
+    attempts = []
+
+    def failing_rename(self, target):
+        attempts.append(target)
+        raise PermissionError(13, 'Access is denied')
+
+    monkeypatch.setattr(type(path), 'rename', failing_rename)
+    with pytest.raises(PermissionError):
+        staging.promote(path, DATE)
+    # The same name is retried, not every free name
+    assert len(attempts) == staging.RENAME_ATTEMPTS
+    assert len(set(attempts)) == 1
+    assert path.exists()
+
+
+def test_resume(tmp_path):
+    path = create_staging_directory(tmp_path)
+    resumable = staging.mark_resumable(path)
+    assert resumable.name.startswith(staging.RESUMABLE_PREFIX)
+    assert staging.claim_resumable(tmp_path, lambda p: False) is None
+    claimed = staging.claim_resumable(tmp_path, lambda p: True)
+    assert claimed.name.startswith(staging.STAGING_PREFIX)
+    assert (claimed / 'start_sharktools.bat').read_text() == f'cd {claimed}\n'
+    assert staging.claim_resumable(tmp_path, lambda p: True) is None
+
+
+def test_resume_only_with_matching_install_key(tmp_path):
+    path = create_staging_directory(tmp_path)
+    checkpoints = checkpoint.Checkpoints(path / '_install' / checkpoint.CHECKPOINT_FILE_NAME)
+    checkpoints.install_key = 'a'
+    resumable = staging.mark_resumable(path)
+
+    def accept_key(key):
+        return lambda p: checkpoint.read_install_key(p / '_install' / checkpoint.CHECKPOINT_FILE_NAME) == key
+
+    assert staging.claim_resumable(tmp_path, accept_key('b')) is None
+    assert resumable.exists()
+    claimed = staging.claim_resumable(tmp_path, accept_key('a'))
+    assert claimed is not None
+    assert not resumable.exists()
+    assert checkpoint.read_install_key(claimed / '_install' / checkpoint.CHECKPOINT_FILE_NAME) == 'a'
@@ -0,0 +1,46 @@
+import json
+
+import pytest
+
+from sharktools_install import wheel_metadata
+
+from tests.test_resolver import create_wheel
+
+
+def test_read_wheel_metadata(tmp_path):
+    path = create_wheel(tmp_path, 'plug', '1.0', ['dep>=1.0'])
+    metadata = wheel_metadata.read_wheel_metadata(path)
+    assert metadata['name'] == 'plug'
+    assert metadata['version'] == '1.0'
+    assert metadata['requires_dist'] == ['dep>=1.0']
+    assert metadata['top_level'] == ['plug']
+    assert metadata['wheel_platform_tag'] == 'any'
+
+
+def test_cache(tmp_path):
+    cache_file_path = tmp_path / 'wheel_metadata.json'
+    path = create_wheel(tmp_path, 'plug', '1.0')
+    wheel_metadata.WheelMetadataCache(cache_file_path).get_many([path])
+    cache = wheel_metadata.WheelMetadataCache(cache_file_path)
+    assert cache.get(path)['name'] == 'plug'
+
+
+def test_cache_drops_least_recently_used(tmp_path):
+    cache_file_path = tmp_path / 'wheel_metadata.json'
+    paths = [create_wheel(tmp_path, f'plug_{nr}', '1.0') for nr in range(4)]
+    cache = wheel_metadata.WheelMetadataCache(cache_file_path, max_entries=3)
+    cache.get_many(paths[:3])
+    cache.get(paths[0])
+    cache.get_many(paths[3:])
+    names = [key.split(':')[0] for key in json.loads(cache_file_path.read_text())]
+    assert names == [paths[2].name, paths[0].name, paths[3].name]
+
+
+def test_unreadable_wheels_are_left_out(tmp_path):
+    path = create_wheel(tmp_path, 'plug', '1.0')
+    broken = tmp_path / 'broken_dep-1.0-py3-none-any.whl'
+    broken.write_bytes(b'partial download')
+    cache = wheel_metadata.WheelMetadataCache(None)
+    with pytest.raises(wheel_metadata.InvalidWheel):
+        cache.get(broken)
+    assert list(cache.get_many([path, broken, tmp_path / 'missing-1.0-py3-none-any.whl'])) == [path]